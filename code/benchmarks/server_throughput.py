@@ -0,0 +1,125 @@
+"""Throughput of the multi-process server mode for a growing number of workers.
+
+Sends ``--requests`` part1 requests from ``--clients`` concurrent sessions
+through a ``WorkerPool`` (``iac_agent/core/worker_pool.py``), once for every
+worker count in ``--workers``, and reports requests per second and the speedup
+over the first worker count. Requests use the model and terraform stand-ins of
+the soak test inside a scratch directory, so only the agent's own CPU work,
+the shared SQLite stores and the terraform subprocesses are measured. Every
+message is unique, so the shared caches do not answer them.
+
+Each worker is warmed up with one request before the timed run. The speedup is
+bounded by the number of cores: compare against ``os.cpu_count()``.
+
+Usage:
+    cd code && python benchmarks/server_throughput.py --workers 1 2 4 --requests 200 --clients 16
+"""
+
+import argparse
+import functools
+import os
+import stat
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CODE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CODE_DIR))
+
+from soak_test import FAIL_MARKER, TERRAFORM_STAND_IN, SoakChatModel  # noqa: E402
+
+
+def create_chat(log_level: str):
+    """Worker factory: the part1 agent answering with the soak test's stand-in model."""
+    from iac_agent.agents.factory import ProjectIteration, create_chat_implementation
+    from iac_agent.core.logger_configuration import get_logger
+
+    get_logger().setLevel(log_level)
+
+    chat = create_chat_implementation(ProjectIteration.IAC_AGENT)
+    chat.llm = SoakChatModel()
+    return chat
+
+
+def send(pool, session_id: str, message: str) -> bool:
+    reply = ""
+    for reply in pool.process_message(message, None, session_id=session_id):
+        pass
+    return "validated successfully" in reply
+
+
+def measure(workers: int, requests: int, clients: int, concurrency: int, log_level: str) -> float:
+    """Requests per second of a pool with ``workers`` processes."""
+    from iac_agent.core.worker_pool import WorkerPool
+
+    pool = WorkerPool(functools.partial(create_chat, log_level), workers, concurrency=concurrency)
+    pool.start()
+    try:
+        # one session per worker so every worker has loaded its models before timing
+        warmup_sessions = {}
+        candidate = 0
+        while len(warmup_sessions) < workers:
+            session_id = f"warmup-{workers}-{candidate}"
+            warmup_sessions.setdefault(pool.worker_for(session_id), session_id)
+            candidate += 1
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(lambda s: send(pool, s, f"Deploy a VPC for session {s}"), warmup_sessions.values()))
+
+        def client(index: int) -> int:
+            succeeded = 0
+            for number in range(index, requests, clients):
+                session_id = f"w{workers}-client{index}"
+                succeeded += send(pool, session_id, f"Deploy a VPC for session w{workers}-{number}")
+            return succeeded
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            succeeded = sum(executor.map(client, range(clients)))
+        elapsed = time.perf_counter() - started_at
+    finally:
+        pool.drain(timeout=30)
+    if succeeded != requests:
+        print(f"  warning: {requests - succeeded} of {requests} requests did not validate")
+    return requests / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per worker count")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client sessions")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent requests per worker")
+    parser.add_argument("--provider-kb", type=int, default=256, help="size of the fake provider install")
+    parser.add_argument("--workdir", help="scratch directory, a temporary one by default")
+    parser.add_argument("--log-level", default="ERROR", help="level of the agent logger")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="iac-agent-throughput-")).resolve()
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    terraform = bin_dir / "terraform"
+    terraform.write_text(TERRAFORM_STAND_IN.format(provider_bytes=args.provider_kb * 1024, fail_marker=FAIL_MARKER))
+    terraform.chmod(terraform.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    # the spawned workers inherit the environment and working directory
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    os.environ.setdefault("OPIK_TRACK_DISABLE", "true")
+    os.environ.setdefault("OPENAI_API_KEY", "throughput-benchmark")
+    os.chdir(workdir)
+
+    from iac_agent.core.logger_configuration import get_logger
+
+    get_logger().setLevel(args.log_level)
+    print(f"Server throughput: {args.requests} requests, {args.clients} clients, {os.cpu_count()} cores, in {workdir}")
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>10}")
+    baseline = None
+    for workers in args.workers:
+        throughput = measure(workers, args.requests, args.clients, args.concurrency, args.log_level)
+        baseline = baseline or throughput
+        print(f"{workers:>8}{throughput:>10.1f}{throughput / baseline:>9.2f}x", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Soak test: resource growth over thousands of chat sessions in one process.
+
+Drives simulated chat sessions through the ``respond`` callback the Gradio
+demo uses (``app.make_respond``), with local stand-ins for the model and the
+terraform CLI, all inside a scratch working directory. Every ``--sample-every``
+sessions it samples, from /proc:
+
+* ``rss_kb``: resident memory of the process (after a GC pass)
+* ``fds``: open file descriptors
+* ``threads``: OS threads
+* ``disk_kb``: disk used by the working directory (generated files,
+  checkpoints, blobs, provider installs)
+
+After a warm-up it fits a line through the samples of each metric and fails
+(exit code 1) when the growth per session exceeds the metric's limit, i.e.
+when the metric keeps growing instead of levelling off. It also fails when
+more than ``--max-failures`` requests raised.
+
+The stand-in terraform installs a fake provider of ``--provider-kb`` on init
+(through ``TF_PLUGIN_CACHE_DIR`` when it is set, like terraform), and fails ``validate`` once for every
+``--fail-every``-th session so the fix loop is exercised too.
+
+Usage:
+    cd code && python benchmarks/soak_test.py --sessions 2000 --csv soak.csv
+    cd code && python benchmarks/soak_test.py --mode part3 --sessions 1000
+"""
+
+import argparse
+import csv
+import gc
+import os
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+CODE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CODE_DIR))
+
+import numpy as np  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+
+FAIL_MARKER = "soak-fail-once"
+METRICS = ("rss_kb", "fds", "threads", "disk_kb")
+
+TERRAFORM_STAND_IN = """#!/bin/sh
+if [ "$1" = "init" ]; then
+  provider=registry.terraform.io/hashicorp/aws/5.0.0/linux_amd64
+  mkdir -p ".terraform/providers/$provider"
+  if [ -n "$TF_PLUGIN_CACHE_DIR" ]; then
+    # like terraform: install into the shared cache once and link it into the workspace
+    if [ ! -f "$TF_PLUGIN_CACHE_DIR/$provider/terraform-provider-aws" ]; then
+      mkdir -p "$TF_PLUGIN_CACHE_DIR/$provider"
+      head -c {provider_bytes} /dev/zero > "$TF_PLUGIN_CACHE_DIR/$provider/terraform-provider-aws"
+    fi
+    ln -sf "$TF_PLUGIN_CACHE_DIR/$provider/terraform-provider-aws" ".terraform/providers/$provider/terraform-provider-aws"
+  else
+    head -c {provider_bytes} /dev/zero > ".terraform/providers/$provider/terraform-provider-aws"
+  fi
+  echo "Terraform has been successfully initialized!"
+  exit 0
+fi
+if [ "$1" = "validate" ] && grep -q "{fail_marker}" *.tf 2>/dev/null; then
+  echo 'Error: Soak test failure' >&2
+  echo '  on main.tf line 1:' >&2
+  exit 1
+fi
+echo "Success! The configuration is valid."
+"""
+
+
+class SoakChatModel(BaseChatModel):
+    """Answers the part1 prompts: requirements are valid, stacks are a VPC and a subnet."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "soak-stand-in"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        system = " ".join(str(message.content) for message in messages if isinstance(message, SystemMessage))
+        text = "\n".join(str(message.content) for message in messages if not isinstance(message, SystemMessage))
+        if "validate user requirements" in system:
+            content = '"validation_result": "VALID",\n"terraform_errors": []'
+        else:
+            # the fix prompt gets the same stack without the failure marker
+            session = text.split("session ", 1)[-1].split()[0] if "session " in text else "0"
+            fail = FAIL_MARKER in text and "Fix the validation errors" not in system
+            content = (
+                f'# main.tf\n```hcl\nresource "aws_vpc" "main" {{\n  cidr_block = "10.0.0.0/16"\n'
+                f'  tags = {{ Name = "soak-{session}" }}\n}}\n{"# " + FAIL_MARKER if fail else ""}\n```\n'
+                f'# network.tf\n```hcl\nresource "aws_subnet" "main" {{\n  vpc_id     = aws_vpc.main.id\n'
+                f'  cidr_block = "10.0.1.0/24"\n}}\n```'
+            )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def read_proc_status(field: str) -> int:
+    with open("/proc/self/status", encoding="utf-8") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def disk_usage_kb(path: Path) -> int:
+    """Allocated size of everything under ``path``, like ``du -sk``."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total // 1024
+
+
+def sample(sessions: int, started_at: float, workdir: Path) -> Dict[str, float]:
+    gc.collect()
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(time.monotonic() - started_at, 2),
+        "rss_kb": read_proc_status("VmRSS"),
+        "fds": len(os.listdir("/proc/self/fd")),
+        "threads": read_proc_status("Threads"),
+        "disk_kb": disk_usage_kb(workdir),
+    }
+
+
+def growth_per_session(samples: List[Dict[str, float]], metric: str, warmup: float) -> float:
+    """Slope of a linear fit of ``metric`` over the sessions after the warm-up."""
+    steady = samples[int(len(samples) * warmup):]
+    if len(steady) < 3:
+        return 0.0
+    sessions = np.array([row["sessions"] for row in steady], dtype=np.float64)
+    values = np.array([row[metric] for row in steady], dtype=np.float64)
+    return float(np.polyfit(sessions, values, 1)[0])
+
+
+def create_chat(mode: str):
+    from iac_agent.agents.factory import ProjectIteration, create_chat_implementation
+
+    if mode == "part3":
+        return create_chat_implementation(ProjectIteration.DEEP_RESEARCH)
+    chat = create_chat_implementation(ProjectIteration.IAC_AGENT)
+    chat.llm = SoakChatModel()
+    return chat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("part1", "part3"), default="part1")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=1, help="messages per session")
+    parser.add_argument("--sample-every", type=int, default=50, help="sessions between samples")
+    parser.add_argument("--fail-every", type=int, default=5, help="every n-th session needs one fix (0: never)")
+    parser.add_argument("--provider-kb", type=int, default=256, help="size of the fake provider install")
+    parser.add_argument("--warmup", type=float, default=0.2, help="fraction of samples ignored by the fit")
+    parser.add_argument("--workdir", help="scratch directory, a temporary one by default")
+    parser.add_argument("--csv", help="write the samples to this CSV file")
+    parser.add_argument("--log-level", default="ERROR", help="level of the agent logger")
+    parser.add_argument("--tracemalloc", action="store_true", help="report the top allocation growth after the warm-up")
+    parser.add_argument("--max-rss-kb", type=float, default=8.0, help="allowed RSS growth per session")
+    parser.add_argument("--max-fds", type=float, default=0.002, help="allowed fd growth per session")
+    parser.add_argument("--max-threads", type=float, default=0.002, help="allowed thread growth per session")
+    parser.add_argument("--max-disk-kb", type=float, default=8.0, help="allowed disk growth per session")
+    parser.add_argument("--max-failures", type=int, default=0, help="allowed requests that raised")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="iac-agent-soak-")).resolve()
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    terraform = bin_dir / "terraform"
+    terraform.write_text(TERRAFORM_STAND_IN.format(provider_bytes=args.provider_kb * 1024, fail_marker=FAIL_MARKER))
+    terraform.chmod(terraform.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    os.environ.setdefault("OPIK_TRACK_DISABLE", "true")
+    os.environ.setdefault("OPENAI_API_KEY", "soak-test")
+    os.environ["IAC_AGENT_OFFLINE_RESEARCH"] = "1"
+    # tight artifact retention so its steady state is reached within the run
+    os.environ.setdefault("IAC_AGENT_ARTIFACT_MAX_RUNS", "100")
+    os.environ.setdefault("IAC_AGENT_ARTIFACT_GRACE_SECONDS", "5")
+    os.environ.setdefault("IAC_AGENT_ARTIFACT_GC_INTERVAL", "2")
+    # every soak message is unique, keep the shared response and validation cache small
+    os.environ.setdefault("IAC_AGENT_CACHE_MAX_ENTRIES", "200")
+    # relative defaults (generated_tf/, .iac_agent/) land in the scratch directory
+    os.chdir(workdir)
+
+    from iac_agent.app import make_respond
+    from iac_agent.core.logger_configuration import get_logger
+
+    get_logger().setLevel(args.log_level)
+    respond = make_respond(create_chat(args.mode))
+    print(f"Soak test of {args.mode}: {args.sessions} sessions in {workdir}")
+    started_at = time.monotonic()
+    samples = [sample(0, started_at, workdir)]
+    warmup_sessions = int(args.sessions * args.warmup)
+    baseline_snapshot = None
+    if args.tracemalloc:
+        tracemalloc.start(10)
+    failures = 0
+    for session in range(1, args.sessions + 1):
+        request = SimpleNamespace(session_hash=f"soak-{session}")
+        history = []
+        for turn in range(args.turns):
+            fail = args.fail_every and session % args.fail_every == 0 and turn == 0
+            message = f"Deploy a VPC with one subnet for session {session}-{turn}" + (f" {FAIL_MARKER}" if fail else "")
+            try:
+                reply = ""
+                for reply in respond(message, history, request):
+                    pass
+            except Exception as e:
+                failures += 1
+                reply = f"error: {e}"
+            history.append((message, reply))
+        if args.tracemalloc and session == warmup_sessions:
+            gc.collect()
+            baseline_snapshot = tracemalloc.take_snapshot()
+        if session % args.sample_every == 0 or session == args.sessions:
+            row = sample(session, started_at, workdir)
+            samples.append(row)
+            print("  ".join(f"{key}={value}" for key, value in row.items()), flush=True)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+
+    if baseline_snapshot is not None:
+        gc.collect()
+        growth = tracemalloc.take_snapshot().compare_to(baseline_snapshot, "traceback")
+        print(f"\nTop allocation growth since session {warmup_sessions}:")
+        for stat_diff in growth[:10]:
+            print(f"  {stat_diff.size_diff / 1024:+.1f} KiB in {stat_diff.count_diff:+d} blocks")
+            for line in stat_diff.traceback.format(limit=4):
+                print(f"    {line}")
+
+    limits = {"rss_kb": args.max_rss_kb, "fds": args.max_fds, "threads": args.max_threads, "disk_kb": args.max_disk_kb}
+    print(f"\n{args.sessions} sessions, {failures} failed requests, {samples[-1]['elapsed_s']}s")
+    print(f"{'metric':<10}{'start':>12}{'end':>12}{'per session':>14}{'limit':>10}  verdict")
+    leaking = []
+    for metric in METRICS:
+        slope = growth_per_session(samples, metric, args.warmup)
+        verdict = "GROWING" if slope > limits[metric] else "ok"
+        if verdict != "ok":
+            leaking.append(metric)
+        print(f"{metric:<10}{samples[0][metric]:>12}{samples[-1][metric]:>12}{slope:>14.4f}{limits[metric]:>10}  {verdict}")
+    print("\nDisk usage by directory:")
+    for path in sorted(workdir.iterdir()):
+        print(f"  {path.name:<24}{disk_usage_kb(path) if path.is_dir() else os.lstat(path).st_blocks // 2:>10} KiB")
+    exit_code = 0
+    if leaking:
+        print(f"\nUnbounded growth: {', '.join(leaking)}")
+        exit_code = 1
+    if failures > args.max_failures:
+        print(f"\n{failures} failed requests, more than the {args.max_failures} allowed")
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Memory benchmark: file contents in the workflow state vs. blob references.
+
+Runs the same generate -> write -> validate -> fix loop twice through a small
+LangGraph with an in-memory checkpointer:
+
+* ``inline``: every node updates the full state, file contents included, in
+  place and returns it (how part1 worked before file references were introduced)
+* ``refs``: file contents go to the ``BlobStore`` once and nodes return partial
+  updates carrying only hashes
+
+and reports peak traced memory, checkpoint size, the size of the blobs the
+checkpoints refer to and wall time for each.
+
+Usage:
+    cd code && python benchmarks/state_memory_benchmark.py --files 40 --file-kb 32
+"""
+
+import argparse
+import pickle
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+from typing_extensions import TypedDict  # noqa: E402
+
+from iac_agent.core.blob_store import BlobStore  # noqa: E402
+
+
+class BenchmarkState(TypedDict, total=False):
+    terraform_files: Dict[str, str]
+    terraform_file_refs: Dict[str, Any]
+    attempt: int
+    is_valid: bool
+
+
+def make_files(count: int, size_kb: int, revision: int) -> Dict[str, str]:
+    """Synthetic stack; only the first file changes between revisions."""
+    line = 'resource "aws_instance" "web_{index}_{i}" {{ ami = "ami-123" instance_type = "t3.micro" }}\n'
+    files = {}
+    for index in range(count):
+        # distinct contents per file, identical files would be deduplicated by the blob store
+        body = "".join(line.format(index=index, i=i) for i in range(size_kb * 1024 // len(line)))
+        files[f"file_{index}.tf"] = body + (f"# revision {revision}\n" if index == 0 else "")
+    return files
+
+
+def build_inline_graph(files: int, file_kb: int, attempts: int):
+    def generate(state):
+        state["terraform_files"] = make_files(files, file_kb, 0)
+        state["attempt"] = 0
+        return state
+
+    def write(state):
+        sum(len(content) for content in state["terraform_files"].values())
+        return state
+
+    def validate(state):
+        state["is_valid"] = state["attempt"] >= attempts
+        return state
+
+    def fix(state):
+        state["attempt"] += 1
+        state["terraform_files"] = make_files(files, file_kb, state["attempt"])
+        return state
+
+    return _compile(generate, write, validate, fix)
+
+
+def build_refs_graph(files: int, file_kb: int, attempts: int, store: BlobStore):
+    def generate(state):
+        return {"terraform_file_refs": store.put_files(make_files(files, file_kb, 0)), "attempt": 0}
+
+    def write(state):
+        sum(len(content) for content in store.get_files(state["terraform_file_refs"]).values())
+        return {}
+
+    def validate(state):
+        return {"is_valid": state["attempt"] >= attempts}
+
+    def fix(state):
+        attempt = state["attempt"] + 1
+        return {"terraform_file_refs": store.put_files(make_files(files, file_kb, attempt)), "attempt": attempt}
+
+    return _compile(generate, write, validate, fix)
+
+
+def _compile(generate, write, validate, fix):
+    builder = StateGraph(BenchmarkState)
+    builder.add_node("generate", generate)
+    builder.add_node("write", write)
+    builder.add_node("validate", validate)
+    builder.add_node("fix", fix)
+    builder.add_edge(START, "generate")
+    builder.add_edge("generate", "write")
+    builder.add_edge("write", "validate")
+    builder.add_conditional_edges("validate", lambda state: END if state["is_valid"] else "fix")
+    builder.add_edge("fix", "write")
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+def measure(name: str, graph, store: Optional[BlobStore] = None) -> Dict[str, Any]:
+    config = {"configurable": {"thread_id": name}}
+    tracemalloc.start()
+    started = time.perf_counter()
+    events = 0
+    for _ in graph.stream({}, config):
+        events += 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    checkpoint_bytes = sum(
+        len(pickle.dumps(snapshot.values)) for snapshot in graph.get_state_history(config)
+    )
+    # the checkpoints of the refs mode only hold hashes, the contents live in the store
+    blob_bytes = store.memory_bytes if store is not None else 0
+    return {"name": name, "events": events, "peak_mb": peak / 2**20, "checkpoint_mb": checkpoint_bytes / 2**20,
+            "blob_mb": blob_bytes / 2**20, "seconds": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare workflow state memory with inline files vs. blob refs")
+    parser.add_argument("--files", type=int, default=40, help="Files in the synthetic stack")
+    parser.add_argument("--file-kb", type=int, default=32, help="Size of each file in KB")
+    parser.add_argument("--attempts", type=int, default=3, help="Fix attempts before the stack validates")
+    args = parser.parse_args()
+
+    store = BlobStore()
+    results = [
+        measure("inline", build_inline_graph(args.files, args.file_kb, args.attempts)),
+        measure("refs", build_refs_graph(args.files, args.file_kb, args.attempts, store), store),
+    ]
+    print(f"stack: {args.files} files x {args.file_kb} KB, {args.attempts} fix attempts")
+    print(f"{'mode':<8}{'events':>8}{'peak MB':>10}{'ckpt MB':>10}{'blobs MB':>10}{'seconds':>10}")
+    for result in results:
+        print(f"{result['name']:<8}{result['events']:>8}{result['peak_mb']:>10.1f}"
+              f"{result['checkpoint_mb']:>10.1f}{result['blob_mb']:>10.1f}{result['seconds']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
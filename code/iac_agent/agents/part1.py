@@ -4,19 +4,25 @@ This is the first iteration of the project focusing on having a full POC for gen
 infrastructure as code based on user requirements using a tool-using agent approach.
 """
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from iac_agent.core.chat_interface import ChatInterface
-from iac_agent.tools.calculator import Calculator
 from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.prebuilt import create_react_agent
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import os
+import random
+import threading
+import time
 import json
 import re
-from pathlib import Path
+import openai
+from dataclasses import asdict
 
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
 
 # Opik imports
@@ -27,22 +33,53 @@ import opik
 from iac_agent.agents.prompts import (
     USER_REQUIREMENTS_VALIDATION_PROMPT,
     TF_FILES_GENERATION_PROMPT,
+    TF_ERROR_FIXING_PROMPT,
+    format_terraform_files,
 )
 
 from iac_agent.agents.workflow_state import WorkflowState
+from iac_agent.core.artifact_store import ArtifactStore
+from iac_agent.core.blob_store import DEFAULT_BLOB_DIR, BlobStore, file_ref_hashes
+from iac_agent.core.checkpointing import CheckpointStore, run_thread_id
+from iac_agent.core.deadline import DEFAULT_REQUEST_TIMEOUT, Deadline, DeadlineExceeded
 from iac_agent.core.logger_configuration import get_logger
+from iac_agent.core.process_runner import ProcessResult, RunCancelled, run_streaming
+from iac_agent.core.profiling import DEFAULT_PROFILE_SAMPLE_RATE, RunProfiler, profiled_node
+from iac_agent.core.prompt_cache import PromptRenderer, RenderedPrompt
+from iac_agent.core.shared_cache import SharedCache, cache_key
+from iac_agent.tools.cost_estimator import CostEstimate, CostEstimator
+from iac_agent.tools.error_fix_library import ErrorFixLibrary
+from iac_agent.tools.hcl_parser import parse_terraform_files
+from iac_agent.tools.provider_schema import SchemaViolation, get_provider_schema_index, refresh_from_terraform
+from iac_agent.tools.security_policy import SecurityFinding, SecurityPolicyEngine
 
 
 class IacAgentChat(ChatInterface):
     logger = get_logger()
     """Project iteration 1 implementation focusing on having full POC for generating infrastructure as code."""
 
-    def __init__(self):
+    MAX_FIX_ATTEMPTS = 3
+    # upper bounds for a single blocking call, the request deadline may cut them shorter
+    LLM_TIMEOUT = 120
+    TERRAFORM_TIMEOUT = 60
+    # LLM calls are retried by _invoke_llm, only while the request deadline leaves room for another attempt
+    LLM_MAX_ATTEMPTS = 3
+    LLM_RETRY_BACKOFF = 1.0
+    TRANSIENT_LLM_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+    def __init__(self, checkpointer=None):
+        """Initialize the agent and compile the workflow graph.
+
+        Args:
+            checkpointer: Optional LangGraph checkpointer; defaults to the SQLite
+                checkpoint store so interrupted runs can be resumed
+        """
 
         # Initialize Opik client
         self.opik_client = opik.Opik()
 
-        model_kwargs = {"model": "gpt-4o-mini"}
+        # the client's own retries would each get the full remaining budget and overrun the deadline
+        model_kwargs = {"model": "gpt-4o-mini", "max_retries": 0}
         # Get environment variables at runtime
         openai_api_key = os.getenv("OPENAI_API_KEY")
         openai_api_base = os.getenv("OPENAI_API_BASE")
@@ -55,16 +92,42 @@ class IacAgentChat(ChatInterface):
         # Create OpikTracer for LangChain integration
         self.opik_tracer = OpikTracer()
         self.llm = init_chat_model(**model_kwargs)
+        # deterministic repairs tried before spending an LLM round trip on a fix
+        self.fix_library = ErrorFixLibrary.default()
+        # in-process security policies, evaluated while terraform runs in its subprocess
+        self.security_engine = SecurityPolicyEngine.default()
+        # offline pricing of validated stacks
+        self.cost_estimator = CostEstimator.load()
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="iac-agent")
+        # deduplicated workspaces terraform runs in, with retention enforced in the background
+        self.artifact_store = ArtifactStore()
+        self.artifact_store.start_background_gc()
+        # file contents live here, the workflow state only carries their hashes
+        self.blob_store = BlobStore(spill_dir=DEFAULT_BLOB_DIR)
+        # renders the cache-friendly prompt layers and tracks cached-token usage
+        self.prompt_renderer = PromptRenderer()
+        # LLM responses and terraform validation results, shared with the other server workers
+        self.shared_cache = SharedCache()
+        # fraction of requests profiled when process_message is not told explicitly
+        self.profile_sample_rate = DEFAULT_PROFILE_SAMPLE_RATE
+        # thread_id -> cancellation flag of the runs currently streaming
+        self.cancel_events: Dict[str, threading.Event] = {}
 
         builder = StateGraph(WorkflowState)
-        builder.add_node("validate_user_requirements", self._validate_user_requirements)
-        builder.add_node("generate_terraform_files", self._generate_terraform_files)
-        builder.add_node(
-            "write_terraform_files_to_disk", self._write_terraform_files_to_disk
-        )
-        builder.add_node("validate_terraform_files", self._validate_terraform_files)
-        builder.add_node("fix_terraform_errors", self._fix_terraform_errors)
-        builder.add_node("finalize", self._finalize)
+        nodes = {
+            "validate_user_requirements": self._validate_user_requirements,
+            "generate_terraform_files": self._generate_terraform_files,
+            "write_terraform_files_to_disk": self._write_terraform_files_to_disk,
+            "validate_terraform_files": self._validate_terraform_files,
+            "apply_known_fixes": self._apply_known_fixes,
+            "fix_terraform_errors": self._fix_terraform_errors,
+            "pause_for_deadline": self._pause_for_deadline,
+            "estimate_cost": self._estimate_cost,
+            "finalize": self._finalize,
+        }
+        for name, node in nodes.items():
+            # the profiling wrapper only costs a context variable lookup unless the run is profiled
+            builder.add_node(name, profiled_node(name, node))
 
         builder.add_edge(START, "validate_user_requirements")
         ## if user requirements are invalid, it will end the flow and pass the control to the user to refine the requirements
@@ -81,74 +144,338 @@ class IacAgentChat(ChatInterface):
         builder.add_conditional_edges(
             "validate_terraform_files",
             self._route_after_terraform_validation,
-            {"finalize": "finalize", "fix_terraform_errors": "fix_terraform_errors"},
+            {
+                "estimate_cost": "estimate_cost",
+                "finalize": "finalize",
+                "apply_known_fixes": "apply_known_fixes",
+                "pause_for_deadline": "pause_for_deadline",
+            },
+        )
+        # a resumed run continues the fix loop where the deadline stopped it
+        builder.add_edge("pause_for_deadline", "apply_known_fixes")
+
+        # known errors are repaired in-process, only the rest reaches the LLM
+        builder.add_conditional_edges(
+            "apply_known_fixes",
+            self._route_after_known_fixes,
+            {
+                "write_terraform_files_to_disk": "write_terraform_files_to_disk",
+                "fix_terraform_errors": "fix_terraform_errors",
+            },
         )
 
         # Loop back to write files after fixing
         builder.add_edge("fix_terraform_errors", "write_terraform_files_to_disk")
 
+        builder.add_edge("estimate_cost", "finalize")
+
         # finalize goes to END
         builder.add_edge("finalize", END)
 
-        self.graph = builder.compile()
+        # checkpoint after every node so an interrupted run resumes where it stopped
+        self.checkpoint_store = None
+        if checkpointer is None:
+            self.checkpoint_store = CheckpointStore()
+            checkpointer = self.checkpoint_store.saver
+            # spilled blobs of runs that expired while no process was serving them
+            self.blob_store.collect_garbage(self.checkpoint_store.max_age_seconds)
+        self.graph = builder.compile(checkpointer=checkpointer)
 
     @track(name="process_message", project_name="project_Iac_agent")
-    def process_message(self, message: str, chat_history: Optional[List[Dict[str, str]]] = None):
+    def process_message(
+        self,
+        message: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        session_id: Optional[str] = None,
+        timeout_seconds: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+        profile: Optional[bool] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ):
         """Process a message using the tool-using agent with streaming.
 
+        If a previous run for the same session and message was interrupted, it is
+        resumed from its last completed node instead of starting over. The whole
+        call is bounded by ``timeout_seconds``; when it runs out the best partial
+        result so far is returned.
+
         Args:
             message: The user's input message
             chat_history: Previous conversation history
+            session_id: Optional session identifier used to key checkpoints
+            timeout_seconds: Overall deadline for this call, None for no deadline
+            profile: Profile this run (see ``iac_agent/core/profiling.py``); None
+                profiles it with probability ``profile_sample_rate``
+            cancel_event: Flag that cancels just this request when set, e.g. by
+                a worker process; a new one by default
+
+        Terraform output is streamed line by line while it runs. Closing the
+        generator (e.g. the client disconnected), setting ``cancel_event`` or
+        calling ``cancel`` for the session kills the running terraform process
+        tree and aborts the run; it stays checkpointed and can be resumed later.
 
         Yields:
             str: Progress updates and final response
         """
-        for event in self.graph.stream({"user_input": message}):
-            node_name = list(event.keys())[0]
-            state = event[node_name]
-            # Yield progress update for each node using workflow_state['progress_update']
-            progress_update = state.get('progress_update', f"🔄 **{node_name.replace('_', ' ').title()}**\n")
-            yield progress_update
-            # Log for debugging
-            self.logger.debug(f"Node {node_name} completed, user_message: {state.get('user_message', 'N/A')[:100]}")
-        # Yield final message
+        thread_id = run_thread_id(message, session_id)
+        deadline = Deadline.in_seconds(timeout_seconds)
+        config = {"configurable": {"thread_id": thread_id, "deadline_at": deadline.expires_at}}
+        snapshot = self.graph.get_state(config)
+        state = dict(snapshot.values)
+        if snapshot.next:
+            inputs = None
+            self.logger.info(f"Resuming run {thread_id} at {snapshot.next}")
+            yield f"♻️ Resuming previous run from **{snapshot.next[0].replace('_', ' ').title()}**\n"
+        else:
+            if snapshot.values:
+                # the previous run for this message completed, start a fresh one
+                self.graph.checkpointer.delete_thread(thread_id)
+                self.blob_store.release(thread_id)
+                state = {}
+            inputs = {"user_input": message}
+        # the files of a resumed run are referenced by its checkpoints again
+        self.blob_store.claim(thread_id, file_ref_hashes(state))
+        self._mark_run(thread_id, "running")
+        cancel_event = cancel_event or threading.Event()
+        self.cancel_events[thread_id] = cancel_event
+        profiler = self._start_profiler(thread_id, profile)
+        events = self.graph.stream(inputs, config, stream_mode=["updates", "custom"])
+        steps = profiler.iterate(events) if profiler is not None else events
+        try:
+            for mode, event in steps:
+                if mode == "custom":
+                    # live terraform output emitted by the validation node
+                    yield f"🔎 `{event['command']}`: {event['line']}"
+                    continue
+                node_name = list(event.keys())[0]
+                # nodes return partial updates, keep a merged view for progress and partial results
+                state = {**state, **(event[node_name] or {})}
+                # blobs referenced by the checkpoint just written must survive a restart
+                self.blob_store.claim(thread_id, file_ref_hashes(event[node_name]))
+                self.blob_store.flush()
+                # Yield progress update for each node using workflow_state['progress_update']
+                progress_update = state.get('progress_update', f"🔄 **{node_name.replace('_', ' ').title()}**\n")
+                yield progress_update
+                # Log for debugging
+                self.logger.debug(f"Node {node_name} completed, user_message: {state.get('user_message', 'N/A')[:100]}")
+        except GeneratorExit:
+            # the consumer went away, stop terraform and the rest of the fix loop
+            cancel_event.set()
+            self._mark_run(thread_id, "cancelled")
+            self.logger.warning(f"Run {thread_id} cancelled: client disconnected")
+            raise
+        except RunCancelled:
+            self._mark_run(thread_id, "cancelled")
+            self.logger.warning(f"Run {thread_id} cancelled")
+            yield "\n---\n\n🛑 The request was cancelled. Send the same message again to resume it."
+            return
+        except Exception as e:
+            self._mark_run(thread_id, "failed")
+            if not deadline.expired and not isinstance(e, DeadlineExceeded):
+                raise
+            # the run stays checkpointed, re-sending the message resumes it with a fresh deadline
+            self.logger.warning(f"Request deadline exceeded in run {thread_id}: {e}")
+            yield f"\n---\n\n{self._partial_result_message(state)}"
+            return
+        finally:
+            cancel_event.set()
+            steps.close()
+            events.close()
+            self.cancel_events.pop(thread_id, None)
+            if profiler is not None:
+                profiler.stop()
+        self._mark_run(thread_id, "completed")
+        # the final message is built, the checkpoints referencing the files are deleted
         final_message = state.get('user_message', 'Processing complete')
+        self.blob_store.release(thread_id)
+        # Yield final message
         yield f"\n---\n\n{final_message}"
 
+    def set_profile_sample_rate(self, sample_rate: float) -> None:
+        """Change the fraction of requests that are profiled, e.g. 0.01 for one in a hundred.
+
+        Takes effect with the next request, no restart needed.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Sample rate must be between 0 and 1, got {sample_rate}")
+        self.profile_sample_rate = sample_rate
+
+    def _start_profiler(self, thread_id: str, profile: Optional[bool]) -> Optional[RunProfiler]:
+        """Start profiling the run if it was requested or sampled."""
+        if profile is None:
+            profile = self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+        if not profile:
+            return None
+        profiler = RunProfiler(thread_id)
+        return profiler if profiler.start() else None
+
+    def cancel(self, session_id: Optional[str] = None) -> int:
+        """Cancel the running requests of a session.
+
+        Args:
+            session_id: Session whose runs are cancelled, as passed to ``process_message``
+
+        Returns:
+            int: Number of runs cancelled
+        """
+        prefix = f"{session_id or 'anonymous'}:"
+        cancelled = 0
+        for thread_id, cancel_event in list(self.cancel_events.items()):
+            if thread_id.startswith(prefix) and not cancel_event.is_set():
+                cancel_event.set()
+                cancelled += 1
+        return cancelled
+
+    @staticmethod
+    def _blob_owner(config: Optional[RunnableConfig]) -> Optional[str]:
+        """Run that claims the blobs a node stores, so they are never unclaimed before its checkpoint is written."""
+        return (config or {}).get("configurable", {}).get("thread_id")
+
+    def _check_cancelled(self, config: Optional[RunnableConfig]) -> Optional[threading.Event]:
+        """Return the cancellation flag of the run, raising if it is already set.
+
+        Raises:
+            RunCancelled: If the run was cancelled
+        """
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        cancel_event = self.cancel_events.get(thread_id)
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled(f"Run {thread_id} cancelled")
+        return cancel_event
+
+    def _partial_result_message(self, workflow_state: Dict) -> str:
+        """Build the reply returned when the request deadline runs out mid-run.
+
+        Args:
+            workflow_state: The last state emitted by the graph
+
+        Returns:
+            str: The best result produced so far
+        """
+        terraform_files = self._load_files(workflow_state)
+        if not terraform_files:
+            return (
+                "⏱️ The request ran out of time before any Terraform files were generated.\n\n"
+                "Send the same message again to resume from where it stopped."
+            )
+        files_content = "\n\n".join([
+            f"### {filename}\n```hcl\n{content}\n```"
+            for filename, content in terraform_files.items()
+        ])
+        errors = workflow_state.get("terraform_files_validation_errors")
+        errors_section = f"**Last Validation Errors:**\n```\n{errors}\n```\n\n" if errors else ""
+        return (
+            "⏱️ The request ran out of time before the Terraform files passed validation.\n\n"
+            f"{errors_section}"
+            f"**Best Result So Far:**\n\n{files_content}\n\n"
+            "Send the same message again to resume from where it stopped."
+        )
+
+    def _load_files(self, workflow_state: Dict) -> Dict[str, str]:
+        """Resolve the file references of the workflow state to their contents."""
+        return self.blob_store.get_files(workflow_state.get("terraform_file_refs") or {})
+
+    def _invoke_llm(self, prompt: RenderedPrompt, config: Optional[RunnableConfig], cached: bool = False):
+        """Invoke the LLM with the remaining request budget as its timeout.
+
+        Transient API errors are retried with exponential backoff as long as
+        the backoff still fits before the deadline; every attempt only gets
+        the budget that is left.
+
+        Args:
+            prompt: The rendered prompt to send
+            config: The run config carrying the request deadline
+            cached: Answer from the shared response cache when possible; the
+                caller stores the response with ``_cache_llm_response`` once
+                it has been parsed and validated
+
+        Returns:
+            The LLM response message
+        """
+        cancel_event = self._check_cancelled(config)
+        if cached:
+            # identical prompts to the same model are answered once across all workers
+            cached_content = self.shared_cache.get("llm_response", self._llm_cache_key(prompt))
+            if cached_content is not None:
+                self.logger.info(f"Prompt {prompt.name}: answered from the shared response cache")
+                return AIMessage(content=cached_content)
+        deadline = Deadline.from_config(config)
+        for attempt in range(1, self.LLM_MAX_ATTEMPTS + 1):
+            timeout = deadline.timeout(cap=self.LLM_TIMEOUT)
+            try:
+                response = self.llm.bind(timeout=timeout).invoke(prompt.messages)
+                break
+            except self.TRANSIENT_LLM_ERRORS as e:
+                backoff = self.LLM_RETRY_BACKOFF * 2 ** (attempt - 1)
+                if attempt == self.LLM_MAX_ATTEMPTS or not deadline.can_fit(backoff):
+                    raise
+                self.logger.warning(
+                    f"Prompt {prompt.name}: {type(e).__name__}, retrying in {backoff:.0f}s "
+                    f"(attempt {attempt + 1}/{self.LLM_MAX_ATTEMPTS})"
+                )
+                if cancel_event is not None:
+                    cancel_event.wait(backoff)
+                else:
+                    time.sleep(backoff)
+                self._check_cancelled(config)
+        self.prompt_renderer.record(prompt, response)
+        return response
+
+    def _llm_cache_key(self, prompt: RenderedPrompt) -> str:
+        """Key of a prompt's response in the shared cache."""
+        return cache_key(
+            type(self.llm).__name__,
+            getattr(self.llm, "model_name", None),
+            [(message.type, message.content) for message in prompt.messages],
+        )
+
+    def _cache_llm_response(self, prompt: RenderedPrompt, content: str) -> None:
+        """Share a response that passed its checks, bad replies never reach other sessions."""
+        self.shared_cache.put("llm_response", self._llm_cache_key(prompt), content)
+
+    def _mark_run(self, thread_id: str, status: str) -> None:
+        """Record the run status and trigger checkpoint and blob garbage collection when due."""
+        if self.checkpoint_store is None:
+            return
+        self.checkpoint_store.mark_run(thread_id, status)
+        if status != "running" and self.checkpoint_store.maybe_collect_garbage():
+            self.blob_store.collect_garbage(self.checkpoint_store.max_age_seconds)
+
     @track(name="validate_user_requirements", project_name="project_Iac_agent")
     def _validate_user_requirements(
-        self, workflow_state: WorkflowState
-    ) -> WorkflowState:
+        self, workflow_state: WorkflowState, config: RunnableConfig
+    ) -> Dict[str, Any]:
         """Validate user requirements in the workflow state using LLM.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the request deadline
 
         Returns:
-            WorkflowState: The updated workflow state with validation results
+            Dict[str, Any]: State updates with the validation results
         """
         self.logger.info(f"Validating user requirements is called with this user input: {workflow_state['user_input']}")
-        workflow_state["progress_update"] = "🔍 Validating user requirements ... "
-        formated_prompted = USER_REQUIREMENTS_VALIDATION_PROMPT.format_prompt(
-            USER_INPUT=workflow_state["user_input"]
+        update: Dict[str, Any] = {"progress_update": "🔍 Validating user requirements ... "}
+        prompt = self.prompt_renderer.render(
+            USER_REQUIREMENTS_VALIDATION_PROMPT, {"USER_INPUT": workflow_state["user_input"]}
         )
-        response = self.llm.invoke(formated_prompted.text)
+        response = self._invoke_llm(prompt, config, cached=True)
         response_content = response.content.strip()
         # TODO: hardening parsing logic to extract JSON from response
         if "NOT_VALID" in response_content:
-            workflow_state["is_valid_user_requirements"] = False
-            workflow_state["user_requirements_validation_errors"] = response_content
-            workflow_state["user_message"] = response_content
+            update["is_valid_user_requirements"] = False
+            update["user_requirements_validation_errors"] = response_content
+            update["user_message"] = response_content
             self.logger.warning(f"User requirements validation failed: {response_content}")
         elif "VALID" in response_content:
-            workflow_state["is_valid_user_requirements"] = True
-            workflow_state["user_requirements_validation_errors"] = ""
-            workflow_state["user_message"] = "Requirements are valid and ready for Terraform generation."
+            update["is_valid_user_requirements"] = True
+            update["user_requirements_validation_errors"] = ""
+            update["user_message"] = "Requirements are valid and ready for Terraform generation."
             self.logger.info("User requirements validated successfully")
 
         else:
             raise ValueError("Unexpected response format from LLM.")
-        return workflow_state
+        self._cache_llm_response(prompt, response.content)
+        return update
 
     @track(name="route_after_requirements_validation", project_name="project_Iac_agent")
     def _route_after_requirements_validation(self, workflow_state: WorkflowState):
@@ -167,35 +494,55 @@ class IacAgentChat(ChatInterface):
         )
         
     @track(name="fix_terraform_errors", project_name="project_Iac_agent")
-    def _fix_terraform_errors(self, workflow_state: WorkflowState) -> WorkflowState:
+    def _fix_terraform_errors(self, workflow_state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
         """Use LLM to analyze validation errors and regenerate fixed files.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the request deadline
 
         Returns:
-            WorkflowState: The updated workflow state with regenerated files
+            Dict[str, Any]: State updates with the regenerated file references
         """
-        workflow_state["validation_attempt_count"] = workflow_state.get("validation_attempt_count", 0) + 1
-        attempt_count = workflow_state["validation_attempt_count"]
-
-        workflow_state["progress_update"] = f"🛠️ Fixing Terraform errors (attempt {attempt_count}/3)..."
-        self.logger.info(f"Analyzing errors and fixing (attempt {attempt_count}/3)")
-        # format current files for prompt
-        current_files_str = "\n\n".join([
-            f"# {filename}\n```hcl\n{content}\n```"
-            for filename, content in workflow_state["terraform_files"].items()
-        ])
-        # create fix prompt
-        from iac_agent.agents.prompts import TF_ERROR_FIXING_PROMPT
-        fix_prompt = TF_ERROR_FIXING_PROMPT.format_prompt(
-            USER_INPUT=workflow_state["user_input"],
-            VALIDATION_ERRORS=workflow_state["terraform_files_validation_errors"],
-            CURRENT_FILES=current_files_str
+        attempt_count = workflow_state.get("validation_attempt_count", 0) + 1
+        update: Dict[str, Any] = {
+            "validation_attempt_count": attempt_count,
+            "cycle_started_at": time.time(),
+            "progress_update": f"🛠️ Fixing Terraform errors (attempt {attempt_count}/{self.MAX_FIX_ATTEMPTS})...",
+        }
+        self.logger.info(f"Analyzing errors and fixing (attempt {attempt_count}/{self.MAX_FIX_ATTEMPTS})")
+        current_files = self._load_files(workflow_state)
+        baseline_files = self.blob_store.get_files(workflow_state.get("prompt_baseline_refs") or {})
+        # only files that differ from the cached baseline are sent again; fixes never remove files
+        changed_files = {
+            filename: content for filename, content in current_files.items()
+            if baseline_files.get(filename) != content
+        }
+        schema_index = get_provider_schema_index()
+        fix_prompt = self.prompt_renderer.render(
+            TF_ERROR_FIXING_PROMPT,
+            {
+                "USER_INPUT": workflow_state["user_input"],
+                "BASELINE_FILES": format_terraform_files(baseline_files),
+                # schemas of the baseline's types keep the session context stable across attempts
+                "PROVIDER_SCHEMAS": schema_index.describe(schema_index.types_in_files(baseline_files)),
+            },
+            {
+                "CHANGED_FILES": format_terraform_files(changed_files) or "(none)",
+                "VALIDATION_ERRORS": workflow_state["terraform_files_validation_errors"],
+            },
+        )
+        self.logger.debug(
+            f"Fix prompt created for attempt {attempt_count}: {len(changed_files)} changed files, "
+            f"~{fix_prompt.prefix_tokens} cacheable prefix tokens"
         )
-        self.logger.debug(f"Fix prompt created for attempt {attempt_count}")
+        # remember what the LLM was asked to fix so a successful repair can be learned
+        update["last_llm_fix"] = {
+            "errors": workflow_state["terraform_files_validation_errors"],
+            "file_refs": dict(workflow_state["terraform_file_refs"]),
+        }
         # Get LLM to fix errors
-        response = self.llm.invoke(fix_prompt.text)
+        response = self._invoke_llm(fix_prompt, config)
         response_content = response.content.strip()
         self.logger.debug(f"LLM fix response: {response}")
         self.logger.debug(f"LLM fix response content: {response_content}")
@@ -203,22 +550,95 @@ class IacAgentChat(ChatInterface):
         fixed_files = self._parse_terraform_files(response_content)
         if not fixed_files:
             self.logger.warning("LLM did not generate any files, keeping original")
-            return workflow_state
-        workflow_state["terraform_files"] = fixed_files
+            return update
+        # the LLM only returns the files it modified
+        update["terraform_file_refs"] = self.blob_store.put_files(
+            {**current_files, **fixed_files}, self._blob_owner(config)
+        )
         self.logger.info(f"Attempt {attempt_count}: Regenerated {len(fixed_files)} files")
-        return workflow_state
+        return update
+
+    @track(name="apply_known_fixes", project_name="project_Iac_agent")
+    def _apply_known_fixes(self, workflow_state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
+        """Repair recognised terraform errors with the deterministic fix library.
+
+        Args:
+            workflow_state: The current workflow state
+            config: The run config carrying the thread ID
+
+        Returns:
+            Dict[str, Any]: State updates with the repaired file references
+        """
+        applied_keys = workflow_state.get("applied_fix_keys", [])
+        result = self.fix_library.repair(
+            workflow_state.get("terraform_files_validation_errors", ""),
+            self._load_files(workflow_state),
+            skip=applied_keys,
+            requirements=workflow_state["user_input"],
+        )
+        update: Dict[str, Any] = {
+            "progress_update": "🧰 Applying known fixes to Terraform errors...",
+            "cycle_started_at": time.time(),
+            "known_fixes_applied": bool(result.repaired),
+        }
+        if result.repaired:
+            update["terraform_file_refs"] = self.blob_store.put_files(result.files, self._blob_owner(config))
+            update["applied_fix_keys"] = applied_keys + [diagnostic.key for diagnostic in result.repaired]
+            update["known_fixes_count"] = workflow_state.get("known_fixes_count", 0) + len(result.repaired)
+            # rewrites are reported with the result, the user sees every change made to the generated files
+            update["known_fix_notes"] = workflow_state.get("known_fix_notes", []) + [
+                f"{rule_name}: {diagnostic.summary}"
+                + (f" ({diagnostic.block_type}.{diagnostic.block_name})" if diagnostic.block_type else "")
+                for rule_name, diagnostic in zip(result.applied_rules, result.repaired)
+            ]
+            update["progress_update"] = f"🧰 Repaired {len(result.repaired)} known errors without the LLM."
+            self.logger.info(
+                f"Known fixes applied: {', '.join(result.applied_rules)} "
+                f"({len(result.remaining)} errors left for the LLM)"
+            )
+        return update
+
+    def _route_after_known_fixes(self, workflow_state: WorkflowState):
+        """Revalidate after deterministic repairs, otherwise hand over to the LLM.
+
+        Args:
+            workflow_state: The current workflow state
+
+        Returns:
+            str: Next node to execute (write_terraform_files_to_disk or fix_terraform_errors)
+        """
+        if workflow_state.get("known_fixes_applied"):
+            return "write_terraform_files_to_disk"
+        return "fix_terraform_errors"
         
+    @track(name="estimate_cost", project_name="project_Iac_agent")
+    def _estimate_cost(self, workflow_state: WorkflowState) -> Dict[str, Any]:
+        """Estimate the monthly cost of the validated Terraform files.
+
+        Args:
+            workflow_state: The current workflow state
+
+        Returns:
+            Dict[str, Any]: State updates with the cost estimate
+        """
+        estimate = self.cost_estimator.estimate(self._load_files(workflow_state))
+        self.logger.info(f"Estimated monthly cost: {estimate.total_monthly} {estimate.currency}")
+        return {
+            "cost_estimate": estimate.as_dict(),
+            "progress_update": f"💰 Estimated monthly cost: {estimate.total_monthly:,.2f} {estimate.currency}",
+        }
+
     @track(name="finalize", project_name="project_Iac_agent")
-    def _finalize(self, workflow_state: WorkflowState) -> WorkflowState:
+    def _finalize(self, workflow_state: WorkflowState) -> Dict[str, Any]:
         """Create final message with all details (success or failure).
 
         Args:
             workflow_state: The current workflow state
 
         Returns:
-            WorkflowState: The updated workflow state with final message
+            Dict[str, Any]: State updates with the final message
         """
-        workflow_state["progress_update"] = f"✅ Finalizing ..."
+        update: Dict[str, Any] = {"progress_update": "✅ Finalizing ..."}
 
         attempt_count = workflow_state.get("validation_attempt_count", 0)
         files_list = "\n".join([
@@ -227,76 +647,165 @@ class IacAgentChat(ChatInterface):
         ])
         if workflow_state["is_valid_terraform_files"]:
             attempt_msg = f" (fixed in {attempt_count} attempts)" if attempt_count > 0 else ""
-            terraform_files = workflow_state.get("terraform_files", {})
+            terraform_files = self._load_files(workflow_state)
             files_content = "\n\n".join([
                 f"### {filename}\n```hcl\n{content}\n```"
                 for filename, content in terraform_files.items()
             ])
-            workflow_state["user_message"] = (
+            update["user_message"] = (
                 f"Terraform files validated successfully{attempt_msg}!\n\n"
                 f"**Generated Files:**\n{files_list}\n\n"
                 f"**File Contents:**\n\n{files_content}\n\n"
                 f"You can now review and apply these configurations."
             )
-            workflow_state["progress_update"] = "✅ Finalizing: Terraform files validated successfully."
+            update["progress_update"] = "✅ Finalizing: Terraform files validated successfully."
             self.logger.info("Workflow completed successfully")
+            known_fixes = workflow_state.get("known_fixes_count", 0)
+            if known_fixes:
+                notes = "".join(f"\n  - {note}" for note in workflow_state.get("known_fix_notes", []))
+                update["user_message"] += f"\n\n_{known_fixes} errors were repaired by known-fix rules:_{notes}"
+            warnings = [
+                finding for finding in workflow_state.get("security_findings", []) if finding["severity"] == "warning"
+            ]
+            if warnings:
+                update["user_message"] += "\n\n**Security warnings:**" + "".join(
+                    f"\n  - {finding['rule_id']} {finding['address']}: {finding['message']}" for finding in warnings
+                )
+            cost_estimate = workflow_state.get("cost_estimate")
+            if cost_estimate:
+                update["user_message"] += f"\n\n{CostEstimate.from_dict(cost_estimate).summary()}"
+            pending_response = workflow_state.get("pending_llm_response")
+            if pending_response and workflow_state["terraform_file_refs"] == workflow_state.get("prompt_baseline_refs"):
+                # the generated files validated as they were, other sessions may reuse the response
+                self.shared_cache.put(
+                    "llm_response", pending_response["cache_key"],
+                    self.blob_store.get(pending_response["response_ref"]["hash"]),
+                )
         else:
-            workflow_state["user_message"] = (
+            update["user_message"] = (
                 f"Failed to generate valid Terraform files after {attempt_count} attempts.\n\n"
                 f"**Last Validation Errors:**\n```\n{workflow_state['terraform_files_validation_errors']}\n```\n\n"
                 f"**Generated Files (with errors):**\n{files_list}\n\n"
                 f"Please refine your requirements and try again."
             )
-            workflow_state["progress_update"] = "❌ Finalizing: Failed to generate valid Terraform files."
+            update["progress_update"] = "❌ Finalizing: Failed to generate valid Terraform files."
             self.logger.error(f"Max retries reached. Last error: {workflow_state['terraform_files_validation_errors']}")
-        return workflow_state
+        self.logger.info(f"Known-fix rule hit rates: {self.fix_library.hit_rates()}")
+        self.logger.info(f"Prompt cache usage: {self.prompt_renderer.stats()}")
+        self.logger.info(f"Shared cache usage: {self.shared_cache.stats()}")
+        return update
 
     @track(name="route_after_terraform_validation", project_name="project_Iac_agent")
-    def _route_after_terraform_validation(self, workflow_state: WorkflowState):
-        """Route based on validation result and retry count.
+    def _route_after_terraform_validation(self, workflow_state: WorkflowState, config: RunnableConfig):
+        """Route based on validation result, retry count and remaining request budget.
+
+        Another fix attempt is only allowed if the slowest past generate/fix
+        cycle of this run would still fit before the deadline.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the request deadline
 
         Returns:
-            str: Next node to execute (finalize or fix_terraform_errors)
+            str: Next node to execute (estimate_cost, finalize, apply_known_fixes or pause_for_deadline)
         """
         if workflow_state["is_valid_terraform_files"]:
-            return "finalize"
+            return "estimate_cost"
         
         attempt_count = workflow_state.get("validation_attempt_count", 0)
         
-        if attempt_count > 2:
+        if attempt_count >= self.MAX_FIX_ATTEMPTS:
             return "finalize"
+
+        deadline = Deadline.from_config(config)
+        estimated_cycle = self._estimated_cycle(workflow_state)
+        if not deadline.can_fit(estimated_cycle):
+            self.logger.warning(
+                f"Skipping fix attempt: {deadline.remaining():.1f}s left, "
+                f"estimated cycle {estimated_cycle:.1f}s"
+            )
+            return "pause_for_deadline"
         
-        self.logger.info(f"Routing to error fixing (attempt {attempt_count + 1}/3)")
-        workflow_state["progress_update"] = f"The generated Terraform files are not valid. Attempt {attempt_count + 1}/3 to fix errors."
-        return "fix_terraform_errors"
+        self.logger.info(f"Routing to error fixing (attempt {attempt_count + 1}/{self.MAX_FIX_ATTEMPTS})")
+        return "apply_known_fixes"
+
+    @staticmethod
+    def _estimated_cycle(workflow_state: WorkflowState) -> float:
+        """Duration of the slowest generate/fix cycle of the run so far."""
+        cycle_durations = workflow_state.get("cycle_durations", [])
+        return max(cycle_durations) if cycle_durations else 0.0
+
+    @track(name="pause_for_deadline", project_name="project_Iac_agent")
+    def _pause_for_deadline(self, workflow_state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
+        """Stop a run whose next fix cycle would overrun the request deadline.
+
+        The node raises instead of finalizing, so the run never reaches END and
+        keeps its checkpoints. Re-sending the message resumes here with a fresh
+        deadline and the fix loop continues.
+
+        Args:
+            workflow_state: The current workflow state
+            config: The run config carrying the request deadline
+
+        Returns:
+            Dict[str, Any]: State updates when the resumed run has the budget for another cycle
+
+        Raises:
+            DeadlineExceeded: If the next fix cycle still does not fit before the deadline
+        """
+        deadline = Deadline.from_config(config)
+        estimated_cycle = self._estimated_cycle(workflow_state)
+        if not deadline.can_fit(estimated_cycle):
+            raise DeadlineExceeded(
+                f"Next fix cycle (~{estimated_cycle:.1f}s) does not fit in the {deadline.remaining():.1f}s left"
+            )
+        return {"progress_update": "⏱️ Resuming the fix loop with a fresh request budget."}
 
     @track(name="generate_terraform_files", project_name="project_Iac_agent")
-    def _generate_terraform_files(self, workflow_state: WorkflowState) -> WorkflowState:
+    def _generate_terraform_files(self, workflow_state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
         """Generate Terraform files based on user requirements Using LLM.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the request deadline
 
         Returns:
-            WorkflowState: The updated workflow state with generated file paths
+            Dict[str, Any]: State updates with the generated file references
         """
-        workflow_state["progress_update"] = "📝 Generating Terraform files..."
+        cycle_started_at = time.time()
         self.logger.info(f"Generating terraform files is called with this user input: {workflow_state['user_input']}")
-        formated_prompted = TF_FILES_GENERATION_PROMPT.format_prompt(
-            USER_INPUT=workflow_state["user_input"]
+        schema_index = get_provider_schema_index()
+        prompt = self.prompt_renderer.render(
+            TF_FILES_GENERATION_PROMPT,
+            {
+                "USER_INPUT": workflow_state["user_input"],
+                "PROVIDER_SCHEMAS": schema_index.describe(schema_index.relevant_types(workflow_state["user_input"])),
+            },
         )
-        self.logger.debug(f"Formatted prompt: {formated_prompted.text}")
-        response = self.llm.invoke(formated_prompted.text)
+        self.logger.debug(f"Formatted prompt: {prompt.messages}")
+        response = self._invoke_llm(prompt, config, cached=True)
         response_content = response.content.strip()
         self.logger.debug(f"LLM response: {response}")
         self.logger.debug(f"Response content: {response_content}")
         terraform_files = self._parse_terraform_files(response_content)
-        workflow_state["terraform_files"] = terraform_files
         self.logger.info(f"Parsed {len(terraform_files)} Terraform files")
-        return workflow_state
+        blob_owner = self._blob_owner(config)
+        file_refs = self.blob_store.put_files(terraform_files, blob_owner)
+        update = {
+            "progress_update": "📝 Generating Terraform files...",
+            "cycle_started_at": cycle_started_at,
+            "terraform_file_refs": file_refs,
+            # the fix prompt's session context, stable across all fix attempts of this run
+            "prompt_baseline_refs": file_refs,
+            "pending_llm_response": None,
+        }
+        if terraform_files:
+            # shared by finalize only if these files validate without any repair
+            update["pending_llm_response"] = {
+                "cache_key": self._llm_cache_key(prompt),
+                "response_ref": self.blob_store.put_files({"response": response.content}, blob_owner)["response"],
+            }
+        return update
     
     def _parse_terraform_files(self, response_content: str) -> Dict[str, str]:
         """Parse Terraform files from LLM response.
@@ -346,100 +855,222 @@ class IacAgentChat(ChatInterface):
 
     @track(name="write_terraform_files_to_disk", project_name="project_Iac_agent")
     def _write_terraform_files_to_disk(
-        self, workflow_state: WorkflowState
-    ) -> WorkflowState:
-        """Write generated Terraform files to disk.
+        self, workflow_state: WorkflowState, config: RunnableConfig
+    ) -> Dict[str, Any]:
+        """Write generated Terraform files to a workspace of the artifact store.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the thread ID
 
         Returns:
-            WorkflowState: The updated workflow state with file paths
+            Dict[str, Any]: State updates with the file paths
         """
-        workflow_state["progress_update"] = "💾 Generating Terraform files to be ready for validation using terraform..."
-        terraform_files = workflow_state.get("terraform_files", {})
+        update: Dict[str, Any] = {
+            "progress_update": "💾 Generating Terraform files to be ready for validation using terraform..."
+        }
+        terraform_files = self._load_files(workflow_state)
         if not terraform_files:
             self.logger.warning("No Terraform files to write")
-            workflow_state["terraform_files_paths"] = []
-            return workflow_state
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            update["terraform_files_paths"] = []
+            return update
+        thread_id = (config or {}).get("configurable", {}).get("thread_id") or "anonymous"
         attempt_count = workflow_state.get("validation_attempt_count", 0)
-        if attempt_count > 0:
-            dir_name = f"{timestamp}_attempt{attempt_count}"
-        else:
-            dir_name = timestamp
-        output_dir = Path("generated_tf") / dir_name
-        output_dir.mkdir(parents=True, exist_ok=True)
-        workflow_state["output_directory"] = str(output_dir.absolute())
-        self.logger.info(f"Created new output directory: {output_dir.absolute()}")
-        written_paths = []
-        for filename, content in terraform_files.items():
-            file_path = output_dir / filename
-            try:
-                with open(file_path, 'w') as f:
-                    f.write(content)
-                written_paths.append(str(file_path))
-                self.logger.info(f"Written Terraform file: {file_path}")
-            except Exception as e:
-                self.logger.error(f"Error writing file {filename}: {e}")
-        workflow_state["terraform_files_paths"] = written_paths
-        self.logger.info(f"Successfully wrote {len(written_paths)} Terraform files")
-        return workflow_state
+        # known-fix cycles keep the attempt count and a repeated message reuses the thread,
+        # the cycle counter and start time keep every run in the catalog
+        write_count = workflow_state.get("write_count", 0) + 1
+        run_started_at = workflow_state.get("run_started_at") or time.time()
+        run_id = f"{thread_id}/{int(run_started_at * 1000)}/cycle{write_count}-attempt{attempt_count}"
+        # identical file sets share a workspace, only new contents touch the disk
+        output_dir = self.artifact_store.create_run(run_id, terraform_files, thread_id)
+        update["write_count"] = write_count
+        update["run_started_at"] = run_started_at
+        update["output_directory"] = str(output_dir)
+        update["terraform_files_paths"] = [str(output_dir / filename) for filename in terraform_files]
+        self.logger.info(f"Wrote {len(terraform_files)} Terraform files to {output_dir}")
+        return update
 
     @track(name="validate_terraform_files", project_name="project_Iac_agent")
-    def _validate_terraform_files(self, workflow_state: WorkflowState) -> WorkflowState:
+    def _validate_terraform_files(self, workflow_state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
         """Run terraform validate on generated files.
 
         Args:
             workflow_state: The current workflow state
+            config: The run config carrying the request deadline
 
         Returns:
-            WorkflowState: The updated workflow state with validation results
+            Dict[str, Any]: State updates with the validation results
         """
-        workflow_state["progress_update"] = "🔎 Validating the generated Terraform files using Terraform Engine "
+        terraform_files = self._load_files(workflow_state)
+        blocks, _ = parse_terraform_files(terraform_files)
+        # the security scan is pure Python, it overlaps with the terraform subprocesses
+        security_scan = self.executor.submit(self.security_engine.scan_blocks, blocks, workflow_state["user_input"])
+        schema_index = get_provider_schema_index()
+        violations = schema_index.check(blocks)
+        if violations and schema_index.complete:
+            # arguments the provider does not accept fail validate anyway, skip the terraform round trip
+            update = self._schema_check_failed(violations)
+        else:
+            update = self._run_terraform_validation(workflow_state, terraform_files, config)
+            if violations and update.get("is_valid_terraform_files"):
+                # the snapshot is only a subset of the provider schema, terraform has the final word
+                self.logger.warning(
+                    f"terraform validate accepted {len(violations)} provider schema check violations, "
+                    f"the schema snapshot is out of date: {'; '.join(v.detail for v in violations)}"
+                )
+            elif violations:
+                # terraform stops at the first errors it finds, the fix prompt gets the schema's as well
+                report = self._schema_violation_report(violations)
+                existing_errors = update.get("terraform_files_validation_errors") or ""
+                update["terraform_files_validation_errors"] = f"{existing_errors}\n\n{report}" if existing_errors else report
+        update = self._apply_security_findings(update, security_scan.result())
+        # duration of the full generate/fix cycle, used to budget further fix attempts
+        cycle_started_at = workflow_state.get("cycle_started_at")
+        if cycle_started_at:
+            update["cycle_durations"] = workflow_state.get("cycle_durations", []) + [time.time() - cycle_started_at]
+        return update
+
+    def _schema_check_failed(self, violations: List[SchemaViolation]) -> Dict[str, Any]:
+        """Report provider schema violations as terraform validation errors.
+
+        Args:
+            violations: Violations found by the provider schema index
+
+        Returns:
+            Dict[str, Any]: State updates marking the files invalid
+        """
+        self.logger.warning(f"Provider schema check found {len(violations)} errors, skipping terraform validate")
+        return {
+            "is_valid_terraform_files": False,
+            "terraform_files_validation_errors": self._schema_violation_report(violations),
+            "progress_update": "❌ Provider schema check failed.",
+        }
+
+    @staticmethod
+    def _schema_violation_report(violations: List[SchemaViolation]) -> str:
+        """Provider schema violations in terraform's diagnostic layout."""
+        return "Provider schema check failed:\n" + "".join(violation.as_diagnostic() for violation in violations)
+
+    def _apply_security_findings(self, update: Dict[str, Any], findings: List[SecurityFinding]) -> Dict[str, Any]:
+        """Merge security policy findings into the validation results.
+
+        Policy errors make the files invalid and are reported in terraform's
+        diagnostic layout so the fix loop handles them like any other error.
+        Warnings (exposures the requirements ask for) are only shown with the result.
+
+        Args:
+            update: State updates of the terraform validation
+            findings: Findings of the security scan
+
+        Returns:
+            Dict[str, Any]: The state updates including the security results
+        """
+        update["security_findings"] = [finding.__dict__ for finding in findings]
+        errors = [finding for finding in findings if finding.severity == "error"]
+        if not errors:
+            return update
+        report = "Security check failed:\n" + "".join(finding.as_diagnostic() for finding in errors)
+        existing_errors = update.get("terraform_files_validation_errors") or ""
+        update["terraform_files_validation_errors"] = f"{existing_errors}\n\n{report}" if existing_errors else report
+        if update.get("is_valid_terraform_files"):
+            update["progress_update"] = "❌ Security check failed."
+        update["is_valid_terraform_files"] = False
+        self.logger.warning(f"Security check found {len(errors)} policy violations")
+        return update
+
+    def _run_terraform(self, arguments: List[str], cwd: str, config: RunnableConfig):
+        """Run a terraform command, streaming its output as custom graph events.
+
+        Args:
+            arguments: Terraform subcommand and flags
+            cwd: Directory holding the Terraform files
+            config: The run config carrying the request deadline and thread ID
+
+        Returns:
+            ProcessResult: Exit status and output of the command
+
+        Raises:
+            RunCancelled: If the run is cancelled while the command runs
+        """
+        cancel_event = self._check_cancelled(config)
+        command = ["terraform", *arguments]
+        display = " ".join(command)
+        writer = get_stream_writer()
+        return run_streaming(
+            command,
+            cwd=cwd,
+            timeout=Deadline.from_config(config).timeout(cap=self.TERRAFORM_TIMEOUT),
+            on_line=lambda stream, line: writer({"command": display, "line": line}) if line.strip() else None,
+            cancel_event=cancel_event,
+            env=self.artifact_store.terraform_env(),
+        )
+
+    def _run_terraform_validation(
+        self, workflow_state: WorkflowState, terraform_files: Dict[str, str], config: RunnableConfig
+    ) -> Dict[str, Any]:
+        """Run terraform init and validate within the remaining request budget.
+
+        Args:
+            workflow_state: The current workflow state
+            terraform_files: The file contents being validated
+            config: The run config carrying the request deadline and thread ID
+
+        Returns:
+            Dict[str, Any]: State updates with the validation results
+        """
+        update: Dict[str, Any] = {
+            "progress_update": "🔎 Validating the generated Terraform files using Terraform Engine "
+        }
         import subprocess
         output_dir = workflow_state.get("output_directory")
         if not output_dir:
-            workflow_state["is_valid_terraform_files"] = False
-            workflow_state["terraform_files_validation_errors"] = "No output directory found"
-            return workflow_state
+            update["is_valid_terraform_files"] = False
+            update["terraform_files_validation_errors"] = "No output directory found"
+            return update
         self.logger.info(f"Validating Terraform files in {output_dir}")
         try:
-            self.logger.info("Running terraform init...")
-            init_result = subprocess.run(
-                ['terraform', 'init','-backend=false'],
-                cwd=output_dir,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            if init_result.returncode != 0:
-                error_msg = init_result.stderr or init_result.stdout or "Unknown terraform init error"
-                workflow_state["is_valid_terraform_files"] = False
-                workflow_state["terraform_files_validation_errors"] = f"Terraform init failed:\n{error_msg}"
-                workflow_state["progress_update"] = "❌ Terraform init failed."
-                self.logger.warning(f"Terraform init failed: {error_msg}")
-                return workflow_state
-            self.logger.debug(f"Init output: {init_result.stdout}")
-            self.logger.info("Running terraform validate...")
-            validate_result = subprocess.run(
-                ['terraform', 'validate'],
-                cwd=output_dir,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+            # validate only depends on the files, another worker may have validated the same set
+            validation_key = cache_key(terraform_files)
+            cached_validation = self.shared_cache.get("terraform_validation", validation_key)
+            if cached_validation is not None:
+                self.logger.info("Terraform validate result taken from the shared cache")
+                validate_result = ProcessResult(**cached_validation)
+            else:
+                self.logger.info("Running terraform init...")
+                # the plugin cache and shared workspaces are initialized by one process at a time
+                lock_timeout = Deadline.from_config(config).timeout(cap=self.TERRAFORM_TIMEOUT)
+                with self.artifact_store.provider_lock(timeout=lock_timeout):
+                    init_result = self._run_terraform(['init', '-backend=false', '-input=false'], output_dir, config)
+                if init_result.returncode != 0:
+                    error_msg = init_result.stderr or init_result.stdout or "Unknown terraform init error"
+                    update["is_valid_terraform_files"] = False
+                    update["terraform_files_validation_errors"] = f"Terraform init failed:\n{error_msg}"
+                    update["progress_update"] = "❌ Terraform init failed."
+                    self.logger.warning(f"Terraform init failed: {error_msg}")
+                    return update
+                self.logger.debug(f"Init output: {init_result.stdout}")
+                # the initialized providers give the schema check their complete schema, once per version set
+                self.executor.submit(refresh_from_terraform, output_dir, self.TERRAFORM_TIMEOUT)
+                self.logger.info("Running terraform validate...")
+                validate_result = self._run_terraform(['validate'], output_dir, config)
+                # init failures may be transient (registry, network), validate results are not
+                self.shared_cache.put("terraform_validation", validation_key, asdict(validate_result))
             if validate_result.returncode != 0:
                 error_msg = validate_result.stderr or validate_result.stdout or "Unknown terraform validate error"
-                workflow_state["is_valid_terraform_files"] = False
-                workflow_state["terraform_files_validation_errors"] = f"Terraform validate failed:\n{error_msg}"
-                workflow_state["progress_update"] = "❌ Terraform validation failed."
+                update["is_valid_terraform_files"] = False
+                update["terraform_files_validation_errors"] = f"Terraform validate failed:\n{error_msg}"
+                update["progress_update"] = "❌ Terraform validation failed."
                 self.logger.warning(f"Terraform validation failed: {error_msg}")
-                return workflow_state
+                return update
             self.logger.info("Terraform validate passed!")
-            workflow_state["is_valid_terraform_files"] = True
-            workflow_state["terraform_files_validation_errors"] = ""
-            workflow_state["progress_update"] = "✅ Terraform files validated successfully."
+            last_llm_fix = workflow_state.get("last_llm_fix")
+            if last_llm_fix:
+                files_before = self.blob_store.get_files(last_llm_fix["file_refs"])
+                self.fix_library.learn(last_llm_fix["errors"], files_before, terraform_files)
+                update["last_llm_fix"] = None
+            update["is_valid_terraform_files"] = True
+            update["terraform_files_validation_errors"] = ""
+            update["progress_update"] = "✅ Terraform files validated successfully."
             self.logger.info("Terraform plan successful!") 
 
             # # run terraform plan dry-run
@@ -462,19 +1093,22 @@ class IacAgentChat(ChatInterface):
             #     workflow_state["terraform_files_validation_errors"] = f"Terraform plan failed:\n{error_msg}"
             #     self.logger.warning(f"Terraform plan failed: {error_msg}")
 
-        except subprocess.TimeoutExpired:
-            workflow_state["is_valid_terraform_files"] = False
-            workflow_state["terraform_files_validation_errors"] = "Terraform command timed out"
-            workflow_state["progress_update"] = "❌ Terraform command timed out."
+        except (subprocess.TimeoutExpired, DeadlineExceeded, TimeoutError):
+            update["is_valid_terraform_files"] = False
+            update["terraform_files_validation_errors"] = "Terraform command timed out"
+            update["progress_update"] = "❌ Terraform command timed out."
             self.logger.error("Terraform validation timed out")
         except FileNotFoundError:
-            workflow_state["is_valid_terraform_files"] = False
-            workflow_state["terraform_files_validation_errors"] = "Terraform CLI not found. Please install Terraform."
-            workflow_state["progress_update"] = "❌ Terraform CLI not found."
+            update["is_valid_terraform_files"] = False
+            update["terraform_files_validation_errors"] = "Terraform CLI not found. Please install Terraform."
+            update["progress_update"] = "❌ Terraform CLI not found."
             self.logger.error("Terraform CLI not found")
+        except RunCancelled:
+            # not a validation failure, abort the graph run
+            raise
         except Exception as e:
-            workflow_state["is_valid_terraform_files"] = False
-            workflow_state["terraform_files_validation_errors"] = f"Unexpected error: {str(e)}"
-            workflow_state["progress_update"] = f"❌ Unexpected error: {str(e)}"
+            update["is_valid_terraform_files"] = False
+            update["terraform_files_validation_errors"] = f"Unexpected error: {str(e)}"
+            update["progress_update"] = f"❌ Unexpected error: {str(e)}"
             self.logger.error(f"Terraform validation error: {e}")
-        return workflow_state
+        return update
@@ -1,43 +1,355 @@
-"""Part 3 - Enhance the performance.
+"""Part 3 - Deep research with parallel researcher agents.
 
-This implementation focuses on:
-- improve the performance 
-- validate the terraform code 
-- deploy the infrastructure as code automatically()
+A planner splits the research request into independent sub-tasks, researcher
+agents work on them concurrently within a bounded worker budget and a writer
+merges every finding into the report as soon as it arrives, streaming the
+growing draft to the UI. The wall time of a request therefore follows its
+slowest sub-task instead of the sum of all of them.
+
+Without an OpenAI API key (or with ``IAC_AGENT_OFFLINE_RESEARCH=1``) the
+workflow runs against the offline stand-in model and search tool. A real model
+is never paired with the stand-in search tool, whose sources are synthetic: it
+needs a ``search_tool``.
 """
 
-from typing import Dict, List, Optional
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from langchain.chat_models import init_chat_model
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, START, END
+from opik import track
+
+from iac_agent.agents.prompts import REPORT_SUMMARY_PROMPT, RESEARCH_PLANNER_PROMPT, RESEARCHER_PROMPT
+from iac_agent.agents.workflow_state import ResearchState
 from iac_agent.core.chat_interface import ChatInterface
+from iac_agent.core.logger_configuration import get_logger
+from iac_agent.core.process_runner import RunCancelled
+from iac_agent.core.prompt_cache import PromptRenderer, RenderedPrompt
+from iac_agent.tools.offline_research import OfflineChatModel, OfflineSearchTool
+
+# researchers running at the same time, shared by all requests of the process
+DEFAULT_MAX_RESEARCHERS = int(os.getenv("IAC_AGENT_MAX_RESEARCHERS", "4"))
+DEFAULT_MAX_SUB_TASKS = int(os.getenv("IAC_AGENT_MAX_SUB_TASKS", "5"))
+OFFLINE_RESEARCH = os.getenv("IAC_AGENT_OFFLINE_RESEARCH", "").lower() in ("1", "true", "yes")
+MISSING_SEARCH_TOOL = (
+    "Deep research with a real model needs a search tool: pass search_tool to "
+    "DeepResearchChat, or set IAC_AGENT_OFFLINE_RESEARCH=1 to run on the offline stand-ins"
+)
+
+
+def check_research_configuration(llm=None, search_tool=None) -> None:
+    """Fail fast when deep research would pair a real model with no search tool.
+
+    Args:
+        llm: Chat model the chat is created with, None for the default one
+        search_tool: Search tool the chat is created with
+
+    Raises:
+        RuntimeError: If the default OpenAI model would be used without a search tool
+    """
+    if llm is None and search_tool is None and os.getenv("OPENAI_API_KEY") and not OFFLINE_RESEARCH:
+        raise RuntimeError(MISSING_SEARCH_TOOL)
+
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.+?)\s*$")
+
+
+def parse_sub_tasks(plan: str, max_sub_tasks: int) -> List[str]:
+    """Extract the sub-tasks from the planner's numbered list, dropping duplicates."""
+    sub_tasks: List[str] = []
+    for line in plan.splitlines():
+        match = _LIST_ITEM.match(line)
+        if match and match.group(1) not in sub_tasks:
+            sub_tasks.append(match.group(1))
+    return sub_tasks[:max_sub_tasks]
+
+
+def format_search_results(results: List[Dict[str, str]]) -> str:
+    """Render search results as a numbered list the researcher can cite from."""
+    return "\n\n".join(
+        f"[{number}] {result.get('title', '')} ({result.get('url', '')})\n{result.get('content', '')}"
+        for number, result in enumerate(results, 1)
+    )
+
+
+class ReportDraft:
+    """Report merged incrementally from findings, sections kept in plan order."""
+
+    def __init__(self, topic: str, sub_tasks: List[str]):
+        self.topic = topic
+        self.sub_tasks = sub_tasks
+        self.findings: List[Optional[Dict[str, Any]]] = [None] * len(sub_tasks)
+
+    def add(self, index: int, finding: Dict[str, Any]) -> None:
+        self.findings[index] = finding
+
+    @property
+    def completed(self) -> int:
+        return sum(finding is not None for finding in self.findings)
+
+    def sections(self) -> str:
+        """Markdown of the sections researched so far."""
+        parts = []
+        for finding in self.findings:
+            if finding is None:
+                continue
+            if finding.get("error"):
+                parts.append(f"## {finding['sub_task']}\n⚠️ Research failed: {finding['error']}")
+                continue
+            sources = "\n".join(
+                f"[{number}] {source}" for number, source in enumerate(finding.get("sources", []), 1)
+            )
+            parts.append(f"## {finding['sub_task']}\n{finding['summary']}\n\n**Sources:**\n{sources}")
+        return "\n\n".join(parts)
+
+    def render(self) -> str:
+        """The current draft, with placeholders for sub-tasks still being researched."""
+        pending = [
+            f"- ⏳ {sub_task}" for sub_task, finding in zip(self.sub_tasks, self.findings) if finding is None
+        ]
+        pending_section = "\n\n**Still researching:**\n" + "\n".join(pending) if pending else ""
+        return f"# {self.topic}\n\n{self.sections()}{pending_section}"
 
 
 class DeepResearchChat(ChatInterface):
     """Week 3 Part 3 implementation focusing on multi-agent deep research."""
-    
-    def __init__(self):
-        self.llm = None
-        self.search_tool = None
+
+    logger = get_logger()
+    LLM_TIMEOUT = 120
+
+    def __init__(self, llm=None, search_tool=None, max_researchers: int = DEFAULT_MAX_RESEARCHERS,
+                 max_sub_tasks: int = DEFAULT_MAX_SUB_TASKS):
+        """Create the chat; components are built by ``initialize`` on first use.
+
+        Args:
+            llm: Chat model of all agents, the OpenAI model or the offline stand-in by default
+            search_tool: Search tool whose ``invoke(query)`` returns dicts with
+                ``title``, ``url`` and ``content``; required with a real model,
+                the offline stand-in in offline mode
+            max_researchers: Sub-tasks researched at the same time
+            max_sub_tasks: Upper bound on the sub-tasks of one request
+
+        Raises:
+            RuntimeError: If the default OpenAI model would be used without a search tool
+        """
+        check_research_configuration(llm, search_tool)
+        self.llm = llm
+        self.search_tool = search_tool
         self.graph = None
-    
+        self.max_researchers = max_researchers
+        self.max_sub_tasks = max_sub_tasks
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.prompt_renderer = PromptRenderer()
+        self.init_lock = threading.Lock()
+
     def initialize(self) -> None:
-        """Initialize components for the deep research system.
-        
-        Students should:
-        - Initialize the chat model
-        - Create specialized agents (planner, researcher, writer, etc.)
-        - Build a multi-agent workflow using LangGraph
-        - Implement coordination between agents
+        """Initialize the model, search tool, researcher pool and the research workflow.
+
+        Raises:
+            RuntimeError: If a real model is used without a search tool
         """
-        pass
-    
-    def process_message(self, message: str, chat_history: Optional[List[Dict[str, str]]] = None) -> str:
+        with self.init_lock:
+            if self.graph is not None:
+                return
+            if self.llm is None:
+                openai_api_key = os.getenv("OPENAI_API_KEY")
+                if openai_api_key and not OFFLINE_RESEARCH:
+                    model_kwargs = {"model": "gpt-4o-mini", "api_key": openai_api_key}
+                    if os.getenv("OPENAI_API_BASE"):
+                        model_kwargs["base_url"] = os.getenv("OPENAI_API_BASE")
+                    self.llm = init_chat_model(**model_kwargs)
+                else:
+                    self.logger.info("Deep research runs offline with the stand-in model")
+                    self.llm = OfflineChatModel()
+            if self.search_tool is None:
+                if not self.offline:
+                    raise RuntimeError(MISSING_SEARCH_TOOL)
+                self.search_tool = OfflineSearchTool()
+            # the worker budget: researchers of all requests share these threads
+            self.executor = ThreadPoolExecutor(max_workers=self.max_researchers, thread_name_prefix="researcher")
+
+            builder = StateGraph(ResearchState)
+            builder.add_node("plan_research", self._plan_research)
+            builder.add_node("research_sub_tasks", self._research_sub_tasks)
+            builder.add_node("write_report", self._write_report)
+            builder.add_edge(START, "plan_research")
+            builder.add_edge("plan_research", "research_sub_tasks")
+            builder.add_edge("research_sub_tasks", "write_report")
+            builder.add_edge("write_report", END)
+            self.graph = builder.compile()
+
+    @property
+    def offline(self) -> bool:
+        """Whether the workflow runs on the stand-ins, explicitly or for lack of an API key."""
+        return OFFLINE_RESEARCH or isinstance(self.llm, OfflineChatModel)
+
+    def process_message(self, message: str, chat_history: Optional[List[Dict[str, str]]] = None):
         """Process a research query using the multi-agent system.
-        
+
         Args:
             message: The research topic/query
             chat_history: Previous conversation history
-            
+
+        Closing the generator (e.g. the client disconnected) stops the
+        sub-tasks that have not started yet.
+
+        Yields:
+            str: Progress updates, the growing draft and finally the research report
+        """
+        if self.graph is None:
+            self.initialize()
+        cancel_event = threading.Event()
+        config = {"configurable": {"cancel_event": cancel_event}}
+        state: Dict[str, Any] = {}
+        events = self.graph.stream({"topic": message}, config, stream_mode=["updates", "custom"])
+        try:
+            for mode, event in events:
+                if mode == "custom":
+                    # a researcher finished and the writer merged its finding
+                    yield (
+                        f"📚 **Researched {event['completed']}/{event['total']}:** {event['sub_task']}\n\n"
+                        f"{event['draft']}"
+                    )
+                    continue
+                node_name = list(event.keys())[0]
+                state = {**state, **(event[node_name] or {})}
+                yield state.get("progress_update", f"🔄 **{node_name.replace('_', ' ').title()}**\n")
+        except GeneratorExit:
+            cancel_event.set()
+            self.logger.warning(f"Research on {message[:60]!r} cancelled: client disconnected")
+            raise
+        finally:
+            cancel_event.set()
+            events.close()
+        yield f"\n---\n\n{state.get('user_message', 'Research complete')}"
+
+    def _invoke_llm(self, prompt: RenderedPrompt) -> str:
+        response = self.llm.bind(timeout=self.LLM_TIMEOUT).invoke(prompt.messages)
+        self.prompt_renderer.record(prompt, response)
+        return str(response.content).strip()
+
+    @staticmethod
+    def _cancel_event(config: Optional[RunnableConfig]) -> Optional[threading.Event]:
+        return (config or {}).get("configurable", {}).get("cancel_event")
+
+    @track(name="plan_research", project_name="project_Iac_agent")
+    def _plan_research(self, state: ResearchState, config: RunnableConfig) -> Dict[str, Any]:
+        """Split the research request into independent sub-tasks.
+
+        Args:
+            state: The current research state
+            config: The run config
+
         Returns:
-            str: A comprehensive research report
+            Dict[str, Any]: State updates with the sub-tasks
         """
-        return "Not implemented yet. Please implement Week 3 Part 3: Deep Research Multi-Agent System."
+        topic = state["topic"]
+        prompt = self.prompt_renderer.render(
+            RESEARCH_PLANNER_PROMPT, {"TOPIC": topic, "MAX_SUB_TASKS": self.max_sub_tasks}
+        )
+        # an unparseable plan degrades to researching the request as a whole
+        sub_tasks = parse_sub_tasks(self._invoke_llm(prompt), self.max_sub_tasks) or [topic]
+        self.logger.info(f"Planned {len(sub_tasks)} sub-tasks for {topic[:60]!r}")
+        plan = "\n".join(f"{number}. {sub_task}" for number, sub_task in enumerate(sub_tasks, 1))
+        return {
+            "sub_tasks": sub_tasks,
+            "progress_update": f"🗺️ **Research plan** ({len(sub_tasks)} sub-tasks):\n{plan}\n",
+        }
 
+    @track(name="research_sub_tasks", project_name="project_Iac_agent")
+    def _research_sub_tasks(self, state: ResearchState, config: RunnableConfig) -> Dict[str, Any]:
+        """Fan the sub-tasks out to concurrent researchers and merge findings as they complete.
+
+        The fan-out happens inside this node rather than as one graph branch per
+        sub-task, so the writer can merge and stream each finding as soon as
+        its researcher finishes instead of after the slowest one.
+
+        Args:
+            state: The current research state
+            config: The run config carrying the cancellation flag
+
+        Returns:
+            Dict[str, Any]: State updates with the findings in plan order
+        """
+        topic, sub_tasks = state["topic"], state["sub_tasks"]
+        cancel_event = self._cancel_event(config)
+        writer = get_stream_writer()
+        draft = ReportDraft(topic, sub_tasks)
+        started_at = time.monotonic()
+        futures: Dict[Future, int] = {
+            self.executor.submit(self._research_sub_task, topic, sub_task, cancel_event): index
+            for index, sub_task in enumerate(sub_tasks)
+        }
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    finding = future.result()
+                except RunCancelled:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"Researching {sub_tasks[index]!r} failed: {e}")
+                    finding = {"sub_task": sub_tasks[index], "summary": "", "sources": [], "error": str(e)}
+                draft.add(index, finding)
+                writer({
+                    "completed": draft.completed,
+                    "total": len(sub_tasks),
+                    "sub_task": sub_tasks[index],
+                    "draft": draft.render(),
+                })
+        finally:
+            # free the worker budget when the run is abandoned
+            for future in futures:
+                future.cancel()
+        elapsed = time.monotonic() - started_at
+        self.logger.info(f"Researched {len(sub_tasks)} sub-tasks in {elapsed:.2f}s")
+        return {
+            "findings": draft.findings,
+            "progress_update": f"🔬 Researched {len(sub_tasks)} sub-tasks in {elapsed:.1f}s\n",
+        }
+
+    def _research_sub_task(
+        self, topic: str, sub_task: str, cancel_event: Optional[threading.Event]
+    ) -> Dict[str, Any]:
+        """Search for one sub-task and summarize the results; runs on a researcher thread."""
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled(f"Research on {sub_task!r} cancelled")
+        results = self.search_tool.invoke(sub_task)
+        prompt = self.prompt_renderer.render(
+            RESEARCHER_PROMPT,
+            {"TOPIC": topic},
+            {"SUB_TASK": sub_task, "SEARCH_RESULTS": format_search_results(results) or "(no results)"},
+        )
+        return {
+            "sub_task": sub_task,
+            "summary": self._invoke_llm(prompt),
+            "sources": [result.get("url", "") for result in results],
+        }
+
+    @track(name="write_report", project_name="project_Iac_agent")
+    def _write_report(self, state: ResearchState, config: RunnableConfig) -> Dict[str, Any]:
+        """Add the executive summary to the merged sections.
+
+        Args:
+            state: The current research state
+            config: The run config
+
+        Returns:
+            Dict[str, Any]: State updates with the final report
+        """
+        draft = ReportDraft(state["topic"], state["sub_tasks"])
+        for index, finding in enumerate(state["findings"]):
+            if finding is not None:
+                draft.add(index, finding)
+        sections = draft.sections()
+        prompt = self.prompt_renderer.render(REPORT_SUMMARY_PROMPT, {"TOPIC": state["topic"], "SECTIONS": sections})
+        summary = self._invoke_llm(prompt)
+        report = f"# {state['topic']}\n\n{summary}\n\n{sections}"
+        if isinstance(self.search_tool, OfflineSearchTool):
+            report += "\n\n_Offline mode: the sources above are synthetic placeholders, not real search results._"
+        return {"report": report, "user_message": report, "progress_update": "✍️ Writing the report...\n"}
@@ -1,7 +1,28 @@
+"""Prompts of the IaC agent.
+
+Every prompt is a ``LayeredPrompt``: static instructions first, then the
+per-session context, then the per-call delta, so repeated and fix-loop calls
+share the longest possible prefix with earlier requests and hit the provider's
+prompt cache. Template variables must never be moved into the ``system`` layer.
+"""
+
+from typing import Dict
+
 from langchain_core.prompts import PromptTemplate
 
-USER_REQUIREMENTS_VALIDATION_PROMPT = PromptTemplate.from_template(
-    """
+from iac_agent.core.prompt_cache import LayeredPrompt
+
+
+def format_terraform_files(terraform_files: Dict[str, str]) -> str:
+    """Render files as fenced HCL blocks, sorted by name so the text is stable across calls."""
+    return "\n\n".join(
+        f"# {filename}\n```hcl\n{terraform_files[filename]}\n```" for filename in sorted(terraform_files)
+    )
+
+
+USER_REQUIREMENTS_VALIDATION_PROMPT = LayeredPrompt(
+    name="user_requirements_validation",
+    system="""
         You are an Infrastructure-as-Code assistant.
         Begin with a concise checklist (3-7 bullets) describing the validation process you will follow before performing substantive work.
         Your role is to validate user requirements for Terraform automation with a lenient approach. If any required information is missing but can reasonably be filled with a real default value, consider the requirements VALID. Only return NOT_VALID if there is critical, non-defaultable information missing.
@@ -32,14 +53,18 @@ USER_REQUIREMENTS_VALIDATION_PROMPT = PromptTemplate.from_template(
         **Example (VALID):**
         "validation_result": "VALID",
         "terraform_errors": []
-        
+    """,
+    context=PromptTemplate.from_template(
+        """
         User Requirement:
         {USER_INPUT}
-    """
+        """
+    ),
 )
 
-TF_FILES_GENERATION_PROMPT = PromptTemplate.from_template(
-    """
+TF_FILES_GENERATION_PROMPT = LayeredPrompt(
+    name="tf_files_generation",
+    system="""
         You are an expert Terraform generator.
 
         Generate .tf files based ONLY on the validated requirements and organizational standards below.
@@ -53,25 +78,28 @@ TF_FILES_GENERATION_PROMPT = PromptTemplate.from_template(
         - Short explanation of what infrastructure will be created
         - Terraform code in .tf syntax
         - No commentary inside code blocks unless required by policy
+    """,
+    context=PromptTemplate.from_template(
+        """
+        Provider schemas of the resource types this request likely needs
+        (arguments marked * are required; do not use arguments that are not listed):
+        {PROVIDER_SCHEMAS}
 
         User Requirements:
         {USER_INPUT}
-    """
+        """
+    ),
 )
 
-TF_ERROR_FIXING_PROMPT = PromptTemplate.from_template(
-    """You are a Terraform expert. Fix the validation errors in these files.
+TF_ERROR_FIXING_PROMPT = LayeredPrompt(
+    name="tf_error_fixing",
+    system="""You are a Terraform expert. Fix the validation errors in the user's Terraform files.
 
-USER REQUIREMENTS:
-{USER_INPUT}
-
-VALIDATION ERRORS:
-{VALIDATION_ERRORS}
-
-CURRENT FILES:
-{CURRENT_FILES}
+You receive the user requirements and the BASELINE FILES the fix loop started from, then for
+each attempt the files that CHANGED SINCE THE BASELINE and the current VALIDATION ERRORS.
+The current version of a file is its changed version if there is one, the baseline otherwise.
 
-Use this format for each file:
+Return the complete content of every file you modify, using this format for each file:
 
 # filename.tf
 ```hcl
@@ -79,5 +107,81 @@ Use this format for each file:
 ```
 
 Fix ONLY the reported errors. Keep filenames and structure the same.
+Files you do not return are kept unchanged, so do not repeat files without modifications.
+""",
+    context=PromptTemplate.from_template(
+        """USER REQUIREMENTS:
+{USER_INPUT}
+
+BASELINE FILES:
+{BASELINE_FILES}
+
+PROVIDER SCHEMAS (arguments marked * are required):
+{PROVIDER_SCHEMAS}
+"""
+    ),
+    delta=PromptTemplate.from_template(
+        """CHANGED FILES SINCE BASELINE:
+{CHANGED_FILES}
+
+VALIDATION ERRORS:
+{VALIDATION_ERRORS}
+"""
+    ),
+)
+
+RESEARCH_PLANNER_PROMPT = LayeredPrompt(
+    name="research_planner",
+    system="""You are a research planner. Split the user's research request into independent sub-tasks
+that can be researched in parallel by different researchers.
+
+Each sub-task must be a self-contained search question that does not depend on the answer of another
+sub-task. Together the sub-tasks must cover the request without overlapping.
+
+Return only a numbered list, one sub-task per line, with no other text.
+""",
+    context=PromptTemplate.from_template(
+        """Research request:
+{TOPIC}
+
+Return at most {MAX_SUB_TASKS} sub-tasks.
+"""
+    ),
+)
+
+RESEARCHER_PROMPT = LayeredPrompt(
+    name="researcher",
+    system="""You are a research assistant. Answer the sub-task using only the numbered search results
+you are given. Write a concise, factual summary of 3 to 6 sentences and cite the results you use as [n].
+If the results do not answer the sub-task, say so instead of guessing.
+""",
+    context=PromptTemplate.from_template(
+        """Research topic:
+{TOPIC}
+"""
+    ),
+    delta=PromptTemplate.from_template(
+        """Sub-task:
+{SUB_TASK}
+
+Search results:
+{SEARCH_RESULTS}
+"""
+    ),
+)
+
+REPORT_SUMMARY_PROMPT = LayeredPrompt(
+    name="report_summary",
+    system="""You are a report editor. You receive the sections of a research report, each written by a
+different researcher. Write a one paragraph executive summary of the report followed by 3 to 5 key
+takeaways as a bulleted list. Do not repeat the sections and do not add facts that are not in them.
+""",
+    context=PromptTemplate.from_template(
+        """Research topic:
+{TOPIC}
+
+Report sections:
+{SECTIONS}
 """
+    ),
 )
@@ -1,10 +1,15 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, TypedDict
 from langgraph.graph import MessagesState
 
+from iac_agent.core.blob_store import FileRef
+
 
 class WorkflowState(MessagesState):
     user_input: str
-    terraform_files: Dict[str, str]
+    # filename -> reference into the blob store, contents are never copied through the graph
+    terraform_file_refs: Dict[str, FileRef]
+    # files as first generated, the cached session context of the fix prompt
+    prompt_baseline_refs: Dict[str, FileRef]
     terraform_files_paths: List[str]
     is_valid_terraform_files: bool
     terraform_files_validation_errors: Optional[str]
@@ -13,4 +18,30 @@ class WorkflowState(MessagesState):
     user_message: List[str]
     validation_attempt_count: int = 0
     output_directory: str = ""
+    # files written to the artifact store in this run, part of its catalog run IDs
+    write_count: int
+    run_started_at: float
     progress_update: Optional[str] = None
+    applied_fix_keys: List[str]
+    known_fixes_applied: bool
+    known_fixes_count: int
+    # one line per deterministic rewrite, shown to the user with the result
+    known_fix_notes: List[str]
+    last_llm_fix: Optional[Dict[str, Any]]
+    # cache key and raw reply of the generation prompt, shared once its files validate unchanged
+    pending_llm_response: Optional[Dict[str, Any]]
+    cycle_started_at: float
+    cycle_durations: List[float]
+    security_findings: List[Dict[str, Any]]
+    cost_estimate: Optional[Dict[str, Any]]
+
+
+class ResearchState(TypedDict, total=False):
+    topic: str
+    # independent questions the planner split the topic into, in plan order
+    sub_tasks: List[str]
+    # one entry per sub-task in plan order: sub_task, summary, sources, error
+    findings: List[Dict[str, Any]]
+    report: str
+    user_message: str
+    progress_update: Optional[str]
@@ -6,13 +6,57 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bool = False):
+def make_respond(chat_interface):
+    """Build the Gradio ``respond`` callback of a chat implementation.
+
+    Args:
+        chat_interface: The chat implementation answering the messages
+
+    Returns:
+        Callable: Generator function taking the message, the history and the Gradio request
+    """
+    from iac_agent.agents.part1 import IacAgentChat
+    from iac_agent.core.worker_pool import WorkerPool
+
+    def respond(message: str, history: List[Tuple[str, str]], request: gr.Request = None):
+        """Process the message and return a response.
+    
+        Args:
+            message: The user's input message
+            history: List of previous (user, assistant) message tuples
+            request: Gradio request, used to key checkpoints by session
+        
+        Yields:
+            str: The assistant's response chunks
+        """
+        # Convert history format from Gradio tuples to dict format
+        chat_history = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": msg}
+            for pair in history
+            for i, msg in enumerate(pair)
+        ] if history else None
+    
+        # Process message and yield response chunks
+        session_id = getattr(request, "session_hash", None)
+        if session_id and isinstance(chat_interface, (IacAgentChat, WorkerPool)):
+            chunks = chat_interface.process_message(message, chat_history, session_id=session_id)
+        else:
+            chunks = chat_interface.process_message(message, chat_history)
+        for chunk in chunks:
+            yield chunk
+
+    return respond
+
+
+def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bool = False, chat_interface=None):
     """Create and return a Gradio demo with the specified week and mode.
     
     Args:
         week: Which week implementation to use (1, 2, or 3)
         mode_str: String representation of the mode ('part1', 'part2', or 'part3')
         use_solution: If True, use solution implementation; if False, use student code
+        chat_interface: Chat implementation to serve, e.g. a started ``WorkerPool``;
+            by default the one of ``mode_str`` is created in this process
         
     Returns:
         gr.ChatInterface: Configured Gradio chat interface
@@ -24,6 +68,8 @@ def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bo
     if week == "project":
         # Import the appropriate factory based on use_solution flag
         from iac_agent.agents.factory import ProjectIteration, create_chat_implementation as create_chat
+        from iac_agent.agents.part1 import IacAgentChat
+        from iac_agent.core.worker_pool import WorkerPool
 
         # Convert string to enum
         mode_map = {
@@ -36,7 +82,8 @@ def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bo
             raise ValueError(f"Unknown mode: {mode_str}. Choose from: {list(mode_map.keys())}")
         
         mode = mode_map[mode_str]
-        chat_interface = create_chat(mode)
+        if chat_interface is None:
+            chat_interface = create_chat(mode)
         
         titles = {
             "part1": "Infrastructure as Code AI - Iteration 1: IaC Agent",
@@ -116,28 +163,8 @@ def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bo
     else:
         raise ValueError(f"Unknown week: {week}. Choose from: [1, 2, 3]")
     
-    # Create the respond function that uses our chat implementation
-    def respond(message: str, history: List[Tuple[str, str]]):
-        """Process the message and return a response.
-        
-        Args:
-            message: The user's input message
-            history: List of previous (user, assistant) message tuples
-            
-        Yields:
-            str: The assistant's response chunks
-        """
-        # Convert history format from Gradio tuples to dict format
-        chat_history = [
-            {"role": "user" if i % 2 == 0 else "assistant", "content": msg}
-            for pair in history
-            for i, msg in enumerate(pair)
-        ] if history else None
-        
-        # Process message and yield response chunks
-        for chunk in chat_interface.process_message(message, chat_history):
-            yield chunk
-    
+    respond = make_respond(chat_interface)
+
     # Create the Gradio interface
     demo = gr.ChatInterface(
         fn=respond,
@@ -147,5 +174,16 @@ def create_demo(week: str = "project", mode_str: str = "part1", use_solution: bo
         examples=examples,
         theme=gr.themes.Soft()
     )
+
+    if isinstance(chat_interface, WorkerPool):
+        # the default of one request at a time would leave all but one worker idle
+        demo.queue(default_concurrency_limit=chat_interface.concurrency_limit)
+
+    if isinstance(chat_interface, (IacAgentChat, WorkerPool)):
+        def cancel_session(request: gr.Request):
+            """Stop the running terraform commands and fix loop of a closed tab."""
+            chat_interface.cancel(request.session_hash)
+
+        demo.unload(cancel_session)
     
     return demo
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""Content-addressed storage of the Terraform files written for validation.
+
+Every distinct file content is written once under ``objects/`` keyed by its
+SHA-256. A run's working directory is assembled from hardlinks to those
+objects (symlinks where hardlinks are not possible), and runs with an
+identical file set share one workspace, including its ``.terraform``
+directory, so re-validating the same files does not reinstall providers.
+Providers themselves are shared through terraform's plugin cache, which
+several processes may use at once (see ``provider_lock``).
+
+A small SQLite catalog records every run with its files, which keeps run
+outputs reproducible: the files of any cataloged run can be read back or its
+workspace rebuilt. Retention is enforced by age, run count and total size,
+and a background thread collects garbage periodically.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_ARTIFACT_DIR = os.getenv("IAC_AGENT_ARTIFACT_DIR", "generated_tf")
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("IAC_AGENT_ARTIFACT_MAX_AGE_DAYS", "7"))
+DEFAULT_MAX_RUNS = int(os.getenv("IAC_AGENT_ARTIFACT_MAX_RUNS", "500"))
+DEFAULT_MAX_MB = float(os.getenv("IAC_AGENT_ARTIFACT_MAX_MB", "1024"))
+DEFAULT_GC_INTERVAL = float(os.getenv("IAC_AGENT_ARTIFACT_GC_INTERVAL", "300"))
+# runs this recent are never collected, they may still be validating
+ACTIVE_GRACE_SECONDS = float(os.getenv("IAC_AGENT_ARTIFACT_GRACE_SECONDS", "900"))
+# how often a waiting process retries the provider lock
+LOCK_POLL_SECONDS = 0.05
+# per-attempt directories written before the store existed
+LEGACY_RUN_DIR = re.compile(r"^\d{8}_\d{6}(_attempt\d+)?$")
+
+
+class ArtifactStore:
+    """Deduplicating store of Terraform run workspaces with retention."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ARTIFACT_DIR,
+        max_age_seconds: float = DEFAULT_MAX_AGE_DAYS * 24 * 3600,
+        max_runs: int = DEFAULT_MAX_RUNS,
+        max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+    ):
+        """Open (or create) the store.
+
+        Args:
+            root: Directory holding objects, workspaces, the plugin cache and the catalog
+            max_age_seconds: Runs older than this are deleted
+            max_runs: Number of most recent runs kept
+            max_bytes: Budget for stored files and workspace-local data such
+                as ``.terraform``; the oldest runs are deleted beyond it
+        """
+        self.root = Path(root).absolute()
+        self.objects_dir = self.root / "objects"
+        self.workspaces_dir = self.root / "workspaces"
+        self.plugin_cache_dir = self.root / "plugin-cache"
+        for directory in (self.objects_dir, self.workspaces_dir, self.plugin_cache_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_seconds
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.gc_thread: Optional[threading.Thread] = None
+        self.gc_stop = threading.Event()
+
+        self.conn = sqlite3.connect(self.root / "catalog.sqlite", check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS workspaces ("
+                "manifest TEXT PRIMARY KEY, created_at REAL NOT NULL, last_used_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, thread_id TEXT, manifest TEXT NOT NULL, created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS run_files ("
+                "run_id TEXT NOT NULL, filename TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (run_id, filename));"
+                "CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);"
+                "CREATE INDEX IF NOT EXISTS run_files_hash ON run_files (hash);"
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def manifest_hash(file_hashes: Dict[str, str]) -> str:
+        """Hash identifying a file set: its sorted filenames and content hashes."""
+        manifest = "\n".join(f"{filename}\0{file_hashes[filename]}" for filename in sorted(file_hashes))
+        return hashlib.sha256(manifest.encode("utf-8")).hexdigest()
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def workspace_path(self, manifest: str) -> Path:
+        return self.workspaces_dir / manifest[:16]
+
+    def terraform_env(self) -> Dict[str, str]:
+        """Environment for terraform commands that shares provider installs across workspaces."""
+        return {
+            **os.environ,
+            "TF_PLUGIN_CACHE_DIR": str(self.plugin_cache_dir),
+            # workspaces have no lock file yet, allow linking from the cache anyway
+            "TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE": "true",
+        }
+
+    @contextlib.contextmanager
+    def provider_lock(self, timeout: Optional[float] = None):
+        """Hold the store's inter-process lock around ``terraform init``.
+
+        Terraform does not lock its plugin cache, and workspaces shared by
+        identical file sets are initialized in place, so concurrent inits from
+        several server workers take turns.
+
+        Args:
+            timeout: Seconds to wait for the lock, None waits indefinitely
+
+        Raises:
+            TimeoutError: If the lock was not acquired in time
+        """
+        started_at = time.monotonic()
+        with open(self.root / "provider.lock", "w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if timeout is not None and time.monotonic() - started_at >= timeout:
+                        raise TimeoutError(f"Provider lock not acquired within {timeout:.1f}s")
+                    time.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def create_run(self, run_id: str, files: Dict[str, str], thread_id: Optional[str] = None) -> Path:
+        """Record a run and return the workspace holding its files.
+
+        Args:
+            run_id: Unique ID of the run, e.g. the checkpoint thread, its start
+                time and write cycle; recording the same ID again replaces the
+                earlier entry
+            files: Mapping of filename to content
+            thread_id: Checkpoint thread the run belongs to
+
+        Returns:
+            Path: Workspace directory to run terraform in
+        """
+        file_hashes = {filename: self._put_object(content) for filename, content in files.items()}
+        manifest = self.manifest_hash(file_hashes)
+        now = time.time()
+        with self.lock:
+            # registered before the workspace is built so a concurrent GC never sees it orphaned
+            self.conn.execute(
+                "INSERT INTO workspaces (manifest, created_at, last_used_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(manifest) DO UPDATE SET last_used_at = excluded.last_used_at",
+                (manifest, now, now),
+            )
+            self.conn.execute("DELETE FROM run_files WHERE run_id = ?", (run_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, thread_id, manifest, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, thread_id, manifest, now),
+            )
+            self.conn.executemany(
+                "INSERT INTO run_files (run_id, filename, hash) VALUES (?, ?, ?)",
+                [(run_id, filename, digest) for filename, digest in file_hashes.items()],
+            )
+            self.conn.commit()
+        return self._ensure_workspace(manifest, file_hashes)
+
+    def run_files(self, run_id: str) -> Dict[str, str]:
+        """Read back the files of a cataloged run."""
+        with self.lock:
+            rows = self.conn.execute("SELECT filename, hash FROM run_files WHERE run_id = ?", (run_id,)).fetchall()
+        return {filename: self.object_path(digest).read_text(encoding="utf-8") for filename, digest in rows}
+
+    def workspace(self, run_id: str) -> Optional[Path]:
+        """Workspace of a cataloged run, rebuilt from the objects if it was removed."""
+        with self.lock:
+            run = self.conn.execute("SELECT manifest FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            rows = self.conn.execute("SELECT filename, hash FROM run_files WHERE run_id = ?", (run_id,)).fetchall()
+        if run is None:
+            return None
+        return self._ensure_workspace(run[0], dict(rows))
+
+    def list_runs(self, thread_id: Optional[str] = None) -> List[Dict[str, object]]:
+        """Cataloged runs, newest first, optionally of one checkpoint thread."""
+        query = "SELECT run_id, thread_id, manifest, created_at FROM runs"
+        parameters: tuple = ()
+        if thread_id is not None:
+            query += " WHERE thread_id = ?"
+            parameters = (thread_id,)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY created_at DESC", parameters).fetchall()
+        return [
+            {"run_id": run_id, "thread_id": thread, "workspace": str(self.workspace_path(manifest)), "created_at": created_at}
+            for run_id, thread, manifest, created_at in rows
+        ]
+
+    def _put_object(self, content: str) -> str:
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        with self.lock:
+            # touched before the existence check so GC cannot delete it in between
+            self.conn.execute(
+                "INSERT INTO objects (hash, size, last_used_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET last_used_at = excluded.last_used_at",
+                (digest, len(data), time.time()),
+            )
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(f".{digest}.{uuid.uuid4().hex}")
+            temporary.write_bytes(data)
+            # objects are shared by every workspace linking them, keep them read-only
+            temporary.chmod(0o444)
+            os.replace(temporary, path)
+        return digest
+
+    def _ensure_workspace(self, manifest: str, file_hashes: Dict[str, str]) -> Path:
+        workspace = self.workspace_path(manifest)
+        if workspace.is_dir():
+            return workspace
+        staging = self.workspaces_dir / f".{manifest[:16]}.{uuid.uuid4().hex}"
+        staging.mkdir()
+        for filename, digest in file_hashes.items():
+            target = staging / filename
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self.object_path(digest), target)
+            except OSError:
+                # e.g. objects on another filesystem
+                os.symlink(self.object_path(digest), target)
+        try:
+            os.rename(staging, workspace)
+        except OSError:
+            # another thread or process built the same workspace first
+            shutil.rmtree(staging, ignore_errors=True)
+        return workspace
+
+    @staticmethod
+    def _local_bytes(path: Path) -> int:
+        """Bytes only this workspace holds: skips linked objects and symlinks into the plugin cache."""
+        total = 0
+        for directory, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    stat = os.lstat(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    continue
+                if not os.path.islink(os.path.join(directory, filename)) and stat.st_nlink == 1:
+                    total += stat.st_size
+        return total
+
+    def usage_bytes(self) -> int:
+        """Bytes held by stored objects and workspace-local data."""
+        with self.lock:
+            objects_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            manifests = [row[0] for row in self.conn.execute("SELECT manifest FROM workspaces")]
+        return objects_bytes + sum(self._local_bytes(self.workspace_path(manifest)) for manifest in manifests)
+
+    def collect_garbage(self) -> int:
+        """Apply the retention policy and delete unreferenced workspaces and objects.
+
+        Runs are deleted when older than ``max_age_seconds``, beyond the newest
+        ``max_runs``, and then oldest first while the store exceeds
+        ``max_bytes``. Runs younger than ``ACTIVE_GRACE_SECONDS`` are kept.
+        Expired ``<timestamp>[_attemptN]`` directories of older versions are
+        removed as well.
+
+        Returns:
+            int: Number of runs deleted
+        """
+        now = time.time()
+        with self.lock:
+            runs = self.conn.execute("SELECT run_id, created_at FROM runs ORDER BY created_at DESC").fetchall()
+        protected = {run_id for run_id, created_at in runs if now - created_at < ACTIVE_GRACE_SECONDS}
+        doomed = {
+            run_id for index, (run_id, created_at) in enumerate(runs)
+            if run_id not in protected and (now - created_at > self.max_age_seconds or index >= self.max_runs)
+        }
+        deleted = self._delete_runs(doomed) + self._delete_legacy_runs(now - self.max_age_seconds)
+        # size budget: drop the oldest remaining runs until the store fits
+        remaining = [run_id for run_id, _ in reversed(runs) if run_id not in doomed and run_id not in protected]
+        while remaining and self.usage_bytes() > self.max_bytes:
+            step = max(1, len(remaining) // 10)
+            batch, remaining = remaining[:step], remaining[step:]
+            deleted += self._delete_runs(set(batch))
+        return deleted
+
+    def _delete_runs(self, run_ids: set) -> int:
+        cutoff = time.time() - ACTIVE_GRACE_SECONDS
+        with self.lock:
+            self.conn.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+            self.conn.executemany("DELETE FROM run_files WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+            orphan_workspaces = [row[0] for row in self.conn.execute(
+                "SELECT manifest FROM workspaces WHERE manifest NOT IN (SELECT manifest FROM runs) AND last_used_at < ?",
+                (cutoff,),
+            )]
+            self.conn.executemany("DELETE FROM workspaces WHERE manifest = ?", [(manifest,) for manifest in orphan_workspaces])
+            orphan_objects = [row[0] for row in self.conn.execute(
+                "SELECT hash FROM objects WHERE hash NOT IN (SELECT hash FROM run_files) AND last_used_at < ?",
+                (cutoff,),
+            )]
+            self.conn.executemany("DELETE FROM objects WHERE hash = ?", [(digest,) for digest in orphan_objects])
+            self.conn.commit()
+            # files go while the lock is held, a concurrent create_run touches its rows first
+            for manifest in orphan_workspaces:
+                shutil.rmtree(self.workspace_path(manifest), ignore_errors=True)
+            for digest in orphan_objects:
+                self.object_path(digest).unlink(missing_ok=True)
+        if run_ids or orphan_workspaces or orphan_objects:
+            logger.info(
+                f"Artifact GC removed {len(run_ids)} runs, {len(orphan_workspaces)} workspaces "
+                f"and {len(orphan_objects)} objects"
+            )
+        return len(run_ids)
+
+    def _delete_legacy_runs(self, cutoff: float) -> int:
+        deleted = 0
+        for path in self.root.iterdir():
+            if path.is_dir() and LEGACY_RUN_DIR.match(path.name) and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                deleted += 1
+        return deleted
+
+    def start_background_gc(self, interval_seconds: float = DEFAULT_GC_INTERVAL) -> None:
+        """Collect garbage every ``interval_seconds`` on a daemon thread."""
+        if self.gc_thread is not None:
+            return
+
+        def loop() -> None:
+            while not self.gc_stop.wait(interval_seconds):
+                try:
+                    self.collect_garbage()
+                except Exception as e:
+                    logger.warning(f"Artifact GC failed: {e}")
+
+        self.gc_thread = threading.Thread(target=loop, name="artifact-gc", daemon=True)
+        self.gc_thread.start()
+
+    def close(self) -> None:
+        """Stop the background collector and close the catalog."""
+        self.gc_stop.set()
+        if self.gc_thread is not None:
+            self.gc_thread.join()
+            self.gc_thread = None
+        with self.lock:
+            self.conn.close()
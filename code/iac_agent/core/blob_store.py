@@ -0,0 +1,255 @@
+"""Content-addressed storage for Terraform file contents.
+
+The workflow state only carries references (hash and size) to file contents;
+the contents themselves live here, once per distinct blob. Node outputs,
+stream events, Opik traces and checkpoints therefore stay small no matter how
+large the generated stack is. Blobs are held in memory and, when a spill
+directory is configured, written to disk once the memory budget is exceeded or
+when ``flush`` is called.
+
+Runs ``claim`` the blobs their state references and ``release`` them once their
+checkpoints are gone; a blob no run claims any more is dropped from memory and
+disk. Spilled blobs of runs that never finished are removed by
+``collect_garbage`` once they are older than the checkpoint retention.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, TypedDict
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_BLOB_DIR = os.getenv("IAC_AGENT_BLOB_DIR", ".iac_agent/blobs")
+
+
+class FileRef(TypedDict):
+    """Reference to a file content stored in the blob store."""
+
+    hash: str
+    size: int
+
+
+def file_ref_hashes(value: Any) -> Set[str]:
+    """Hashes of every file reference nested in a state value, e.g. a node update."""
+    if isinstance(value, dict):
+        if value.keys() == {"hash", "size"}:
+            return {value["hash"]}
+        return set().union(*(file_ref_hashes(item) for item in value.values()))
+    if isinstance(value, (list, tuple)):
+        return set().union(*(file_ref_hashes(item) for item in value))
+    return set()
+
+
+class BlobStore:
+    """Thread-safe content-addressed blob store with optional disk spill."""
+
+    def __init__(self, spill_dir: Optional[str] = None, max_memory_bytes: int = 64 * 1024 * 1024):
+        """Create the store.
+
+        Args:
+            spill_dir: Directory for blobs evicted from memory; None keeps
+                everything in memory
+            max_memory_bytes: Memory budget before the least recently used
+                blobs are spilled to disk (only with ``spill_dir``)
+        """
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.memory: "OrderedDict[str, str]" = OrderedDict()
+        self.memory_bytes = 0
+        # blobs put since the last flush, only those are written by the next one
+        self.unflushed: Set[str] = set()
+        # blob -> runs whose state references it; run -> its blobs, and the time of its last claim
+        self.owners: Dict[str, Set[str]] = {}
+        self.claims: Dict[str, Set[str]] = {}
+        self.claimed_at: Dict[str, float] = {}
+        # modification time of the spilled files this process wrote, touched or read
+        self.written_mtimes: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digest(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def put(self, content: str, owner: Optional[str] = None) -> str:
+        """Store a blob and return its hash; storing the same content twice is a no-op.
+
+        With an ``owner`` the blob is claimed for that run in the same step, so
+        another run releasing identical content cannot delete it in between.
+        """
+        digest = self.digest(content)
+        with self.lock:
+            if owner is not None:
+                self._claim(owner, (digest,))
+            if digest in self.memory:
+                self.memory.move_to_end(digest)
+                return digest
+            self.memory[digest] = content
+            self.memory_bytes += len(content)
+            self.unflushed.add(digest)
+            self._spill_if_needed()
+        return digest
+
+    def get(self, digest: str) -> str:
+        """Return the content of a blob.
+
+        Raises:
+            KeyError: If the blob is unknown
+        """
+        with self.lock:
+            if digest in self.memory:
+                self.memory.move_to_end(digest)
+                return self.memory[digest]
+        path = self._path(digest)
+        try:
+            content = path.read_text(encoding="utf-8") if path is not None else None
+            mtime = path.stat().st_mtime_ns if path is not None else None
+        except FileNotFoundError:
+            content = None
+        if content is None:
+            raise KeyError(f"Unknown blob {digest}")
+        with self.lock:
+            # a resumed run read it, releasing that run may delete it
+            self.written_mtimes.setdefault(digest, mtime)
+        return content
+
+    def put_files(self, files: Dict[str, str], owner: Optional[str] = None) -> Dict[str, FileRef]:
+        """Store file contents, claimed for ``owner`` if given, and return the references to keep in the workflow state."""
+        return {
+            filename: FileRef(hash=self.put(content, owner), size=len(content)) for filename, content in files.items()
+        }
+
+    def get_files(self, refs: Dict[str, FileRef]) -> Dict[str, str]:
+        """Resolve file references back to their contents."""
+        return {filename: self.get(ref["hash"]) for filename, ref in refs.items()}
+
+    def flush(self) -> None:
+        """Write the blobs put since the last flush to the spill directory so they survive a restart."""
+        if self.spill_dir is None:
+            return
+        with self.lock:
+            pending = [(digest, self.memory[digest]) for digest in self.unflushed if digest in self.memory]
+            self.unflushed.clear()
+        for digest, content in pending:
+            mtime = self._write(digest, content)
+            with self.lock:
+                self.written_mtimes[digest] = mtime
+
+    def claim(self, owner: str, digests: Iterable[str]) -> None:
+        """Record that a run's state references blobs, which keeps them until the run releases them."""
+        with self.lock:
+            self._claim(owner, digests)
+
+    def _claim(self, owner: str, digests: Iterable[str]) -> None:
+        """Claim blobs for a run (lock held)."""
+        claimed = self.claims.setdefault(owner, set())
+        for digest in digests:
+            claimed.add(digest)
+            self.owners.setdefault(digest, set()).add(owner)
+        self.claimed_at[owner] = time.time()
+
+    def release(self, owner: str) -> int:
+        """Drop a run's claims and delete the blobs no other run claims.
+
+        Call it once the run's checkpoints are deleted. A spilled file another
+        process touched since this one wrote it is claimed there too and is left
+        to ``collect_garbage``.
+
+        Returns:
+            int: Number of blobs deleted
+        """
+        with self.lock:
+            unclaimed = []
+            for digest in self.claims.pop(owner, set()):
+                owners = self.owners.get(digest, set())
+                owners.discard(owner)
+                if not owners:
+                    self.owners.pop(digest, None)
+                    unclaimed.append(digest)
+            self.claimed_at.pop(owner, None)
+            for digest in unclaimed:
+                content = self.memory.pop(digest, None)
+                if content is not None:
+                    self.memory_bytes -= len(content)
+                self.unflushed.discard(digest)
+            written_mtimes = [(digest, self.written_mtimes.pop(digest, None)) for digest in unclaimed]
+        for digest, mtime in written_mtimes:
+            self._remove(digest, mtime)
+        return len(unclaimed)
+
+    def collect_garbage(self, max_age_seconds: float) -> int:
+        """Release runs not claimed for ``max_age_seconds`` and delete spilled blobs older than that.
+
+        Runs that never finish (cancelled and never resumed, or left by a
+        process that died) are expired this way, matching the checkpoint
+        retention.
+
+        Returns:
+            int: Number of spilled blobs deleted
+        """
+        cutoff = time.time() - max_age_seconds
+        with self.lock:
+            expired = [owner for owner, claimed_at in self.claimed_at.items() if claimed_at < cutoff]
+        for owner in expired:
+            self.release(owner)
+        if self.spill_dir is None:
+            return 0
+        deleted = 0
+        for path in self.spill_dir.glob("*/*"):
+            with self.lock:
+                if path.name in self.owners:
+                    continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        if deleted:
+            logger.info(f"Blob GC removed {deleted} spilled blobs")
+        return deleted
+
+    def _path(self, digest: str) -> Optional[Path]:
+        return self.spill_dir / digest[:2] / digest if self.spill_dir else None
+
+    def _write(self, digest: str, content: str) -> int:
+        """Write a blob to disk (or touch its existing file) and return the file's modification time."""
+        path = self._path(digest)
+        try:
+            # written by another run or process: touching it marks it as claimed here too
+            os.utime(path)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            os.replace(tmp_path, path)
+        return path.stat().st_mtime_ns
+
+    def _remove(self, digest: str, mtime: Optional[int]) -> None:
+        """Delete a spilled blob unless another process touched it after this one did."""
+        path = self._path(digest)
+        if path is None or mtime is None:
+            return
+        try:
+            if path.stat().st_mtime_ns == mtime:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _spill_if_needed(self) -> None:
+        """Evict least recently used blobs to disk while over the memory budget (lock held)."""
+        if self.spill_dir is None:
+            return
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            digest, content = self.memory.popitem(last=False)
+            self.memory_bytes -= len(content)
+            self.unflushed.discard(digest)
+            self.written_mtimes[digest] = self._write(digest, content)
+            logger.debug(f"Spilled blob {digest[:12]} ({len(content)} bytes) to disk")
@@ -0,0 +1,263 @@
+"""Durable checkpointing for the LangGraph workflows.
+
+Runs are checkpointed after every node so a terraform timeout, a process
+restart or a dropped Gradio connection does not throw away completed LLM work:
+the next ``process_message`` call for the same run resumes from the last
+completed node.
+
+The default store is SQLite. Large string payloads (Terraform file contents,
+LLM responses) are stored once in a content-addressed ``blobs`` table and the
+checkpoints only carry a reference to them, which keeps the per-node writes
+small. Completed runs drop their checkpoints right away (a new run starts
+fresh anyway), interrupted ones keep only their latest checkpoints, and expired
+runs and unused blobs are garbage-collected periodically.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_CHECKPOINT_DB = os.getenv("IAC_AGENT_CHECKPOINT_DB", ".iac_agent/checkpoints.sqlite")
+# resuming only needs the latest checkpoint, a few more are kept for debugging
+DEFAULT_MAX_CHECKPOINTS_PER_THREAD = int(os.getenv("IAC_AGENT_MAX_CHECKPOINTS_PER_THREAD", "5"))
+BLOB_REF_KEY = "__blob_ref__"
+
+
+class BlobRefSerializer(SerializerProtocol):
+    """Serializer that stores large strings by reference in a blob table.
+
+    Wraps another serializer: before serializing, every string longer than
+    ``threshold`` is replaced by ``{"__blob_ref__": <sha256>}`` and written to
+    the ``blobs`` table once; on load the references are resolved again.
+    """
+
+    def __init__(self, db_path: str, inner: Optional[SerializerProtocol] = None, threshold: int = 2048):
+        self.inner = inner or JsonPlusSerializer()
+        self.threshold = threshold
+        # dedicated connection, the saver serialises access to its own one
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "hash TEXT PRIMARY KEY, content TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.commit()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        pending = {}
+        externalized = self._externalize(obj, pending)
+        if pending:
+            now = time.time()
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT INTO blobs (hash, content, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT(hash) DO UPDATE SET last_used = excluded.last_used",
+                    [(digest, content, now) for digest, content in pending.items()],
+                )
+                self.conn.commit()
+        return self.inner.dumps_typed(externalized)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self._internalize(self.inner.loads_typed(data), {})
+
+    def _externalize(self, value: Any, pending: dict) -> Any:
+        if isinstance(value, str) and len(value) >= self.threshold:
+            digest = hashlib.sha256(value.encode("utf-8")).hexdigest()
+            pending[digest] = value
+            return {BLOB_REF_KEY: digest}
+        if isinstance(value, dict):
+            return {key: self._externalize(item, pending) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._externalize(item, pending) for item in value]
+        if isinstance(value, tuple):
+            return tuple(self._externalize(item, pending) for item in value)
+        return value
+
+    def _internalize(self, value: Any, cache: dict) -> Any:
+        if isinstance(value, dict):
+            if len(value) == 1 and BLOB_REF_KEY in value:
+                return self._load_blob(value[BLOB_REF_KEY], cache)
+            return {key: self._internalize(item, cache) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._internalize(item, cache) for item in value]
+        if isinstance(value, tuple):
+            return tuple(self._internalize(item, cache) for item in value)
+        return value
+
+    def _load_blob(self, digest: str, cache: dict) -> Any:
+        if digest not in cache:
+            with self.lock:
+                row = self.conn.execute("SELECT content FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                logger.warning(f"Checkpoint blob {digest[:12]} is missing, it was probably garbage-collected")
+                return {BLOB_REF_KEY: digest}
+            cache[digest] = row[0]
+        return cache[digest]
+
+
+class CheckpointStore:
+    """SQLite-backed checkpoint store with run bookkeeping and garbage collection.
+
+    Attributes:
+        saver: The LangGraph checkpointer passed to ``builder.compile``
+    """
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_CHECKPOINT_DB,
+        max_age_seconds: float = 7 * 24 * 3600,
+        gc_interval_seconds: float = 3600,
+        blob_threshold: int = 2048,
+        max_checkpoints_per_thread: int = DEFAULT_MAX_CHECKPOINTS_PER_THREAD,
+    ):
+        """Open (or create) the checkpoint database.
+
+        Args:
+            db_path: Path of the SQLite database file
+            max_age_seconds: Runs not updated for longer than this are deleted
+            gc_interval_seconds: Minimum time between two garbage collections
+            blob_threshold: Strings at least this long are stored by reference
+            max_checkpoints_per_thread: Most recent checkpoints kept per
+                unfinished run, older ones are pruned
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_age_seconds = max_age_seconds
+        self.gc_interval_seconds = gc_interval_seconds
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.last_gc = 0.0
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.serde = BlobRefSerializer(db_path, threshold=blob_threshold)
+        self.saver = SqliteSaver(self.conn, serde=self.serde)
+        self.saver.setup()
+        # the saver's transactions run on the same connection, every statement here takes its lock
+        self.lock = self.saver.lock
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "thread_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.conn.commit()
+        self.maybe_collect_garbage()
+
+    def mark_run(self, thread_id: str, status: str) -> None:
+        """Record the status of a run (``running``, ``completed``, ``cancelled`` or ``failed``).
+
+        A completed run is never resumed, its checkpoints are deleted; an
+        interrupted one keeps its most recent checkpoints only.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO runs (thread_id, status, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (thread_id, status, now, now),
+            )
+            self.conn.commit()
+        if status == "completed":
+            self.saver.delete_thread(thread_id)
+        elif status != "running":
+            self.prune_checkpoints(thread_id)
+
+    def prune_checkpoints(self, thread_id: Optional[str] = None) -> int:
+        """Delete all but the ``max_checkpoints_per_thread`` latest checkpoints of runs.
+
+        Checkpoint IDs are time-ordered, so the newest sort last. Pending
+        writes of deleted checkpoints are deleted with them.
+
+        Args:
+            thread_id: Run to prune, None prunes every run
+
+        Returns:
+            int: Number of checkpoints deleted
+        """
+        thread_filter, parameters = ("WHERE thread_id = ?", (thread_id,)) if thread_id else ("", ())
+        with self.lock:
+            deleted = self.conn.execute(
+                "DELETE FROM checkpoints WHERE rowid IN (SELECT rowid FROM ("
+                "SELECT rowid, ROW_NUMBER() OVER ("
+                "PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position "
+                f"FROM checkpoints {thread_filter}) WHERE position > ?)",
+                (*parameters, self.max_checkpoints_per_thread),
+            ).rowcount
+            if deleted:
+                self.conn.execute(
+                    "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints WHERE "
+                    "checkpoints.thread_id = writes.thread_id AND checkpoints.checkpoint_ns = writes.checkpoint_ns "
+                    "AND checkpoints.checkpoint_id = writes.checkpoint_id)"
+                    + (" AND writes.thread_id = ?" if thread_id else ""),
+                    parameters,
+                )
+            self.conn.commit()
+        return deleted
+
+    def delete_run(self, thread_id: str) -> None:
+        """Delete every checkpoint of a run."""
+        self.saver.delete_thread(thread_id)
+        with self.lock:
+            self.conn.execute("DELETE FROM runs WHERE thread_id = ?", (thread_id,))
+            self.conn.commit()
+
+    def maybe_collect_garbage(self) -> bool:
+        """Run garbage collection if the last one is older than the configured interval.
+
+        Returns:
+            bool: True if garbage collection ran
+        """
+        if time.time() - self.last_gc < self.gc_interval_seconds:
+            return False
+        self.collect_garbage()
+        return True
+
+    def collect_garbage(self) -> int:
+        """Delete expired runs and blobs that no recent checkpoint wrote.
+
+        Every checkpoint write refreshes ``last_used`` of the blobs it
+        references, so a blob older than ``max_age_seconds`` can only be
+        referenced by checkpoints that are themselves expired.
+
+        Returns:
+            int: Number of runs deleted
+        """
+        self.last_gc = time.time()
+        cutoff = self.last_gc - self.max_age_seconds
+        with self.lock:
+            expired = [row[0] for row in self.conn.execute("SELECT thread_id FROM runs WHERE updated_at < ?", (cutoff,))]
+        for thread_id in expired:
+            self.delete_run(thread_id)
+        # runs of a process that died mid-run were never pruned by mark_run
+        pruned = self.prune_checkpoints()
+        with self.serde.lock:
+            deleted_blobs = self.serde.conn.execute("DELETE FROM blobs WHERE last_used < ?", (cutoff,)).rowcount
+            self.serde.conn.commit()
+        if expired or deleted_blobs or pruned:
+            logger.info(
+                f"Checkpoint GC removed {len(expired)} runs, {pruned} old checkpoints and {deleted_blobs} blobs"
+            )
+        return len(expired)
+
+
+def run_thread_id(message: str, session_id: Optional[str] = None) -> str:
+    """Derive the checkpoint thread ID of a run from its session and message.
+
+    Re-sending the same message in the same session maps to the same run, which
+    is what lets an interrupted run be resumed.
+    """
+    digest = hashlib.sha256(f"{session_id or 'anonymous'}\n{message}".encode("utf-8")).hexdigest()
+    return f"{session_id or 'anonymous'}:{digest[:16]}"
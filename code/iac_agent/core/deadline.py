@@ -0,0 +1,67 @@
+"""End-to-end request deadlines.
+
+Each ``process_message`` call gets one overall deadline. It is carried through
+the graph in the run config as an absolute wall-clock timestamp, so it stays
+meaningful across threads and checkpoint resumes, and every LLM call and
+subprocess takes the remaining budget as its timeout.
+"""
+
+import math
+import os
+import time
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("IAC_AGENT_REQUEST_TIMEOUT", "300"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation is started after the request deadline has passed."""
+
+
+class Deadline:
+    """An absolute point in time by which a request must complete."""
+
+    def __init__(self, expires_at: float = math.inf):
+        self.expires_at = expires_at
+
+    @classmethod
+    def in_seconds(cls, seconds: Optional[float]) -> "Deadline":
+        """Create a deadline ``seconds`` from now; ``None`` means no deadline."""
+        return cls(math.inf if seconds is None else time.time() + seconds)
+
+    @classmethod
+    def from_config(cls, config: Optional[RunnableConfig]) -> "Deadline":
+        """Read the deadline stored in a run config by ``process_message``."""
+        configurable = (config or {}).get("configurable", {})
+        return cls(configurable.get("deadline_at", math.inf))
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (may be negative)."""
+        return self.expires_at - time.time()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout to use for the next blocking operation.
+
+        Args:
+            cap: Upper bound for this single operation
+
+        Returns:
+            float: The remaining budget, bounded by ``cap``
+
+        Raises:
+            DeadlineExceeded: If no time is left
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return remaining if cap is None else min(remaining, cap)
+
+    def can_fit(self, estimated_seconds: float, safety_factor: float = 1.2) -> bool:
+        """Whether an operation of the estimated duration is likely to finish in time."""
+        return self.remaining() > estimated_seconds * safety_factor
@@ -0,0 +1,134 @@
+"""Managed child processes with live output and prompt cancellation.
+
+Commands run in their own process group so that cancelling them also stops
+every process they spawned (terraform launches provider plugins). Output is
+read line by line on background threads and handed to a callback on the
+calling thread, so the caller can forward it as progress while the command is
+still running.
+"""
+
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+# how often the calling thread checks for cancellation and timeouts
+POLL_INTERVAL = 0.1
+# grace period between SIGTERM and SIGKILL
+TERMINATE_GRACE_SECONDS = 2.0
+
+
+class RunCancelled(Exception):
+    """Raised when a run is cancelled, e.g. because the client disconnected."""
+
+
+@dataclass
+class ProcessResult:
+    """Exit status and captured output of a finished command."""
+
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """Terminate the process group of ``process``, escalating to SIGKILL after a grace period."""
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def _pump(stream, name: str, lines: "queue.Queue") -> None:
+    for line in iter(stream.readline, ""):
+        lines.put((name, line.rstrip("\n")))
+    stream.close()
+    lines.put((name, None))
+
+
+def run_streaming(
+    command: List[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    env: Optional[dict] = None,
+) -> ProcessResult:
+    """Run a command, streaming its output, until it exits, times out or is cancelled.
+
+    Args:
+        command: Command and arguments
+        cwd: Working directory
+        timeout: Seconds before the command is killed
+        on_line: Called on the calling thread with ``(stream, line)`` for every
+            line of stdout/stderr as it is produced
+        cancel_event: Kills the command when set
+        env: Environment of the command
+
+    Returns:
+        ProcessResult: Exit status and the full output
+
+    Raises:
+        FileNotFoundError: If the executable does not exist
+        subprocess.TimeoutExpired: If the command ran longer than ``timeout``
+        RunCancelled: If ``cancel_event`` was set
+    """
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+        start_new_session=True,
+    )
+    lines: "queue.Queue" = queue.Queue()
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", lines), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", lines), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    output = {"stdout": [], "stderr": []}
+    open_streams = len(readers)
+    started_at = time.monotonic()
+    try:
+        while open_streams:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RunCancelled(f"{command[0]} cancelled")
+            if timeout is not None and time.monotonic() - started_at > timeout:
+                raise subprocess.TimeoutExpired(command, timeout)
+            try:
+                name, line = lines.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            output[name].append(line)
+            if on_line is not None:
+                on_line(name, line)
+        remaining = None if timeout is None else max(timeout - (time.monotonic() - started_at), 0)
+        returncode = process.wait(timeout=remaining)
+    except BaseException:
+        # timeouts, cancellation and generator shutdown all take the whole tree down
+        kill_process_tree(process)
+        logger.warning(f"Killed {' '.join(command)} (pid {process.pid})")
+        raise
+    return ProcessResult(returncode, "\n".join(output["stdout"]), "\n".join(output["stderr"]))
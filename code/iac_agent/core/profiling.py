@@ -0,0 +1,288 @@
+"""On-demand profiling of single workflow runs.
+
+A ``RunProfiler`` captures one run split per graph node:
+
+* a cProfile profile per node execution and one for the time the graph spends
+  between nodes (checkpointing, state serialization), written as ``.pstats``
+  files plus a merged ``run.pstats``
+* wall-clock stack samples of the threads running the graph, written as
+  collapsed stacks (``run.collapsed``, one ``node;frame;...;frame count`` line
+  per stack) that flamegraph.pl, speedscope or inferno render directly
+* tracemalloc allocation diffs per node execution
+
+Nodes are wrapped with ``profiled_node``. The active profiler travels in a
+context variable, so when no run is being profiled the wrapper costs a single
+lookup. Only one run per process is profiled at a time.
+"""
+
+import cProfile
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_PROFILE_DIR = os.getenv("IAC_AGENT_PROFILE_DIR", ".iac_agent/profiles")
+# fraction of requests profiled when the caller does not decide
+DEFAULT_PROFILE_SAMPLE_RATE = float(os.getenv("IAC_AGENT_PROFILE_SAMPLE_RATE", "0"))
+SAMPLE_INTERVAL = 0.005
+# one frame is enough to attribute allocations to source lines and keeps snapshots cheap
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 25
+# the profiler's own allocations are left out of the per-node diffs
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+
+_active_profiler: contextvars.ContextVar[Optional["RunProfiler"]] = contextvars.ContextVar(
+    "iac_agent_profiler", default=None
+)
+# cProfile and tracemalloc are process-wide resources, profiled runs take turns
+_profiling_lock = threading.Lock()
+
+
+def profiled_node(name: str, node: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a graph node so it is profiled when its run is.
+
+    ``functools.wraps`` keeps the node's signature visible to LangGraph, so
+    nodes taking a ``config`` still receive it.
+    """
+
+    @functools.wraps(node)
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return node(*args, **kwargs)
+        with profiler.node(name, sys._getframe()):
+            return node(*args, **kwargs)
+
+    return wrapper
+
+
+class _NodeRecord:
+    def __init__(self, index: int, name: str):
+        self.index = index
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.allocated_bytes = 0
+        self.peak_bytes = 0
+        self.profile: Optional[cProfile.Profile] = None
+        self.allocations: List[tracemalloc.StatisticDiff] = []
+
+    @property
+    def label(self) -> str:
+        return f"{self.index:02d}_{self.name}"
+
+
+class RunProfiler:
+    """Collects the CPU profile, stack samples and allocations of one run."""
+
+    def __init__(self, run_id: str, output_root: str = DEFAULT_PROFILE_DIR, sample_interval: float = SAMPLE_INTERVAL):
+        """Create the profiler; nothing is measured before ``start``.
+
+        Args:
+            run_id: Identifier of the run, used in the output directory name
+            output_root: Directory the per-run profile directories are created in
+            sample_interval: Seconds between two stack samples
+        """
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]+", "_", run_id)[:80]
+        self.output_dir = Path(output_root) / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_id}"
+        self.sample_interval = sample_interval
+        self.nodes: List[_NodeRecord] = []
+        self.graph_profile = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        # thread id -> (label, frame the sampled stacks are cut at)
+        self.active: Dict[int, Tuple[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.stop_sampling = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+        self.started_tracemalloc = False
+        self.started_at = 0.0
+        # time spent taking and diffing allocation snapshots, excluded from node timings
+        self.overhead_seconds = 0.0
+        self.running = False
+
+    def start(self) -> bool:
+        """Start profiling; returns False when another run is already being profiled."""
+        if not _profiling_lock.acquire(blocking=False):
+            logger.info("Another run is being profiled, skipping this one")
+            return False
+        self.running = True
+        self.started_at = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        self.sampler = threading.Thread(target=self._sample, name="run-profiler", daemon=True)
+        self.sampler.start()
+        return True
+
+    def iterate(self, events: Iterator[Any]) -> Iterator[Any]:
+        """Drive a graph stream, profiling the graph's own work between nodes.
+
+        Each step runs with this profiler active on whatever thread consumes
+        the stream, which may change between steps (e.g. Gradio's worker pool).
+        """
+        while True:
+            token = _active_profiler.set(self)
+            thread_id = threading.get_ident()
+            with self.lock:
+                self.active[thread_id] = ("graph", sys._getframe())
+            self._enable(self.graph_profile)
+            try:
+                event = next(events)
+            except StopIteration:
+                return
+            finally:
+                self.graph_profile.disable()
+                with self.lock:
+                    self.active.pop(thread_id, None)
+                _active_profiler.reset(token)
+            yield event
+
+    @contextlib.contextmanager
+    def node(self, name: str, anchor: Any):
+        """Profile one node execution on the current thread."""
+        thread_id = threading.get_ident()
+        with self.lock:
+            record = _NodeRecord(len(self.nodes) + 1, name)
+            self.nodes.append(record)
+            # the thread is not sampled while the profiler itself works
+            previous = self.active.pop(thread_id, None)
+        # nodes often run inline on the thread stepping the graph, pause its profile meanwhile
+        inline = previous is not None and previous[0] == "graph"
+        if inline:
+            self.graph_profile.disable()
+        overhead_started_at = time.perf_counter()
+        before = tracemalloc.take_snapshot()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        with self.lock:
+            self.active[thread_id] = (record.label, anchor)
+        record.profile = cProfile.Profile()
+        if not self._enable(record.profile):
+            record.profile = None
+        started_at, cpu_started_at = time.perf_counter(), time.thread_time()
+        self.overhead_seconds += started_at - overhead_started_at
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - started_at
+            record.cpu_seconds = time.thread_time() - cpu_started_at
+            if record.profile is not None:
+                record.profile.disable()
+            with self.lock:
+                self.active.pop(thread_id, None)
+            overhead_started_at = time.perf_counter()
+            traced, peak = tracemalloc.get_traced_memory()
+            record.allocated_bytes = traced - traced_before
+            record.peak_bytes = peak - traced_before
+            allocations = tracemalloc.take_snapshot().compare_to(before, "lineno")
+            record.allocations = [
+                stat for stat in allocations if stat.traceback[0].filename not in _IGNORED_FILES
+            ][:TOP_ALLOCATIONS]
+            self.overhead_seconds += time.perf_counter() - overhead_started_at
+            if previous is not None:
+                with self.lock:
+                    self.active[thread_id] = previous
+            if inline:
+                self._enable(self.graph_profile)
+
+    @staticmethod
+    def _enable(profile: cProfile.Profile) -> bool:
+        try:
+            profile.enable()
+            return True
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; samples still cover this node
+            return False
+
+    def _sample(self) -> None:
+        while not self.stop_sampling.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self.lock:
+                active = list(self.active.items())
+            for thread_id, (label, anchor) in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and frame is not anchor:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([label, *reversed(stack)])] += 1
+
+    def stop(self) -> Optional[Path]:
+        """Stop profiling and write the profile files.
+
+        Returns:
+            Optional[Path]: Directory holding the profile, None if nothing was profiled
+        """
+        if not self.running:
+            return None
+        self.running = False
+        self.stop_sampling.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+        _profiling_lock.release()
+        try:
+            return self._write()
+        except OSError as e:
+            logger.warning(f"Could not write profile to {self.output_dir}: {e}")
+            return None
+
+    def _write(self) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profiles = []
+        for label, profile in [("graph", self.graph_profile)] + [(record.label, record.profile) for record in self.nodes]:
+            if profile is None:
+                continue
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            profile.dump_stats(self.output_dir / f"{label}.pstats")
+            profiles.append(profile)
+        if profiles:
+            merged = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                merged.add(profile)
+            merged.dump_stats(self.output_dir / "run.pstats")
+        with open(self.output_dir / "run.collapsed", "w", encoding="utf-8") as collapsed:
+            for stack, count in sorted(self.stacks.items()):
+                collapsed.write(f"{stack} {count}\n")
+        for record in self.nodes:
+            if record.allocations:
+                with open(self.output_dir / f"{record.label}.allocations.txt", "w", encoding="utf-8") as allocations:
+                    allocations.write("\n".join(str(stat) for stat in record.allocations) + "\n")
+        summary = {
+            "wall_seconds": round(time.perf_counter() - self.started_at, 4),
+            "profiler_overhead_seconds": round(self.overhead_seconds, 4),
+            "nodes": [
+                {
+                    "node": record.name,
+                    "label": record.label,
+                    "wall_seconds": round(record.wall_seconds, 4),
+                    "cpu_seconds": round(record.cpu_seconds, 4),
+                    "allocated_kib": round(record.allocated_bytes / 1024, 1),
+                    "peak_kib": round(record.peak_bytes / 1024, 1),
+                    "samples": sum(count for stack, count in self.stacks.items() if stack.startswith(record.label + ";")),
+                }
+                for record in self.nodes
+            ],
+        }
+        (self.output_dir / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        logger.info(f"Profile written to {self.output_dir}")
+        return self.output_dir
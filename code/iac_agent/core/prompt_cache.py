@@ -0,0 +1,157 @@
+"""Cache-friendly prompt layout and prompt-cache accounting.
+
+Providers (and self-hosted servers with prefix/KV reuse) only skip work for
+the longest prefix that is byte-identical to an earlier request. Prompts are
+therefore split into three layers, ordered from most to least stable:
+
+1. ``system``: static instructions, identical for every call of a prompt
+2. ``context``: per-session data, identical across the calls of one run
+   (e.g. the user requirements and the files the fix loop started from)
+3. ``delta``: what changes on every call (e.g. the latest validation errors)
+
+``PromptRenderer`` renders the layers into chat messages, reports how much of
+the prompt is cacheable and records the cached-token usage returned by the
+provider.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import PromptTemplate
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+# rough chars-per-token ratio of English text and HCL, only used for reporting
+CHARS_PER_TOKEN = 4
+
+
+@dataclass(frozen=True)
+class LayeredPrompt:
+    """A prompt split into a static system prefix, session context and per-call delta.
+
+    Attributes:
+        name: Name used for cache accounting
+        system: Static instructions, must not contain template variables
+        context: Template of the per-session context
+        delta: Template of the per-call part, if any
+    """
+
+    name: str
+    system: str
+    context: PromptTemplate
+    delta: Optional[PromptTemplate] = None
+
+
+@dataclass
+class RenderedPrompt:
+    """Chat messages of a rendered prompt and the size of their cacheable prefix."""
+
+    name: str
+    messages: List[BaseMessage]
+    prefix_chars: int
+    total_chars: int
+
+    @property
+    def prefix_tokens(self) -> int:
+        """Estimated tokens of the static and session layers."""
+        return self.prefix_chars // CHARS_PER_TOKEN
+
+
+@dataclass
+class PromptCacheStats:
+    """Cache usage accumulated over the calls of one prompt."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    prefix_tokens: int = 0
+    cache_hits: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "estimated_prefix_tokens": self.prefix_tokens,
+            "cache_hits": self.cache_hits,
+            "cached_ratio": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+        }
+
+
+def cached_tokens(response: Any) -> Optional[Dict[str, int]]:
+    """Extract input and cached token counts from an LLM response message.
+
+    Reads the standard ``usage_metadata`` first and falls back to the raw
+    OpenAI ``token_usage`` payload.
+
+    Returns:
+        Dict with ``input_tokens`` and ``cached_tokens``, or None when the
+        response carries no usage
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {"input_tokens": usage.get("input_tokens", 0), "cached_tokens": details.get("cache_read", 0) or 0}
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return {"input_tokens": token_usage.get("prompt_tokens", 0), "cached_tokens": details.get("cached_tokens", 0) or 0}
+    return None
+
+
+class PromptRenderer:
+    """Renders layered prompts and tracks prompt-cache effectiveness per prompt."""
+
+    def __init__(self):
+        self.stats_by_prompt: Dict[str, PromptCacheStats] = {}
+        self.lock = threading.Lock()
+
+    def render(
+        self, prompt: LayeredPrompt, context: Dict[str, Any], delta: Optional[Dict[str, Any]] = None
+    ) -> RenderedPrompt:
+        """Render a layered prompt into chat messages.
+
+        Args:
+            prompt: The prompt to render
+            context: Variables of the session context layer
+            delta: Variables of the per-call layer
+
+        Returns:
+            RenderedPrompt: Messages ordered from most to least stable
+        """
+        system_text = prompt.system.strip()
+        context_text = prompt.context.format(**context).strip()
+        messages: List[BaseMessage] = [SystemMessage(content=system_text), HumanMessage(content=context_text)]
+        prefix_chars = len(system_text) + len(context_text)
+        total_chars = prefix_chars
+        if prompt.delta is not None:
+            delta_text = prompt.delta.format(**(delta or {})).strip()
+            messages.append(HumanMessage(content=delta_text))
+            total_chars += len(delta_text)
+        return RenderedPrompt(prompt.name, messages, prefix_chars, total_chars)
+
+    def record(self, rendered: RenderedPrompt, response: Any) -> None:
+        """Record the cached-token usage reported for a rendered prompt."""
+        usage = cached_tokens(response)
+        with self.lock:
+            stats = self.stats_by_prompt.setdefault(rendered.name, PromptCacheStats())
+            stats.calls += 1
+            stats.prefix_tokens += rendered.prefix_tokens
+            if usage:
+                stats.input_tokens += usage["input_tokens"]
+                stats.cached_tokens += usage["cached_tokens"]
+                stats.cache_hits += 1 if usage["cached_tokens"] else 0
+        if usage:
+            logger.debug(
+                f"Prompt {rendered.name}: {usage['cached_tokens']}/{usage['input_tokens']} input tokens cached "
+                f"(~{rendered.prefix_tokens} cacheable)"
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Cache usage per prompt name."""
+        with self.lock:
+            return {name: stats.as_dict() for name, stats in self.stats_by_prompt.items()}
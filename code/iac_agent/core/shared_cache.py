@@ -0,0 +1,162 @@
+"""Cache shared by every process serving the agent on one host.
+
+The worker processes of the multi-process server (``iac_agent/core/worker_pool.py``)
+share no memory, so results worth reusing across sessions are kept in a
+SQLite database in WAL mode: readers never block, writers from different
+processes queue up briefly, and a cache entry written by one worker is a hit
+for all the others. It is used for LLM responses keyed by model and prompt,
+and for terraform validation results keyed by file set.
+
+Values are JSON. Entries expire after a TTL and the oldest are evicted beyond
+a maximum count. A cache failure (e.g. the database is locked for too long)
+only ever turns into a miss.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_SHARED_CACHE_DB = os.getenv("IAC_AGENT_SHARED_CACHE_DB", ".iac_agent/shared_cache.sqlite")
+# 0 disables the cache
+DEFAULT_CACHE_TTL_HOURS = float(os.getenv("IAC_AGENT_CACHE_TTL_HOURS", "24"))
+DEFAULT_CACHE_MAX_ENTRIES = int(os.getenv("IAC_AGENT_CACHE_MAX_ENTRIES", "10000"))
+# writes between two purges of expired and surplus entries
+PURGE_INTERVAL_WRITES = 200
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key of JSON-serializable parts, e.g. a model name and prompt messages."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedCache:
+    """Namespaced key-value cache in a SQLite database shared between processes."""
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_SHARED_CACHE_DB,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_HOURS * 3600,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ):
+        """Open (or create) the cache database.
+
+        Args:
+            db_path: Path of the SQLite database file, the same for every process
+            ttl_seconds: Lifetime of an entry; 0 disables the cache
+            max_entries: Number of most recent entries kept
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.writes = 0
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        if not self.enabled:
+            return
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # a lost write only costs a recomputation, skip the fsync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock:
+            self.conn.executescript(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (namespace, key));"
+                "CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);"
+            )
+            self.conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, None on a miss or an expired entry."""
+        if self.conn is None:
+            return None
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value FROM entries WHERE namespace = ? AND key = ? AND created_at >= ?",
+                    (namespace, key, time.time() - self.ttl_seconds),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            row = None
+        if row is None:
+            self.misses[namespace] += 1
+            return None
+        self.hits[namespace] += 1
+        return json.loads(row[0])
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        """Store a JSON-serializable value, replacing an existing entry."""
+        if self.conn is None:
+            return
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                self.conn.commit()
+                self.writes += 1
+                due = self.writes % PURGE_INTERVAL_WRITES == 0
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            return
+        if due:
+            self.purge()
+
+    def purge(self) -> int:
+        """Delete expired entries and the oldest ones beyond ``max_entries``.
+
+        Returns:
+            int: Number of entries deleted
+        """
+        if self.conn is None:
+            return 0
+        try:
+            with self.lock:
+                deleted = self.conn.execute(
+                    "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+                deleted += self.conn.execute(
+                    "DELETE FROM entries WHERE rowid IN ("
+                    "SELECT rowid FROM entries ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache purge failed: {e}")
+            return 0
+        if deleted:
+            logger.debug(f"Shared cache purged {deleted} entries")
+        return deleted
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hits and misses of this process per namespace."""
+        return {
+            namespace: {"hits": self.hits[namespace], "misses": self.misses[namespace]}
+            for namespace in sorted(set(self.hits) | set(self.misses))
+        }
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        with self.lock:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,371 @@
+"""Multi-process serving of a chat implementation.
+
+A ``WorkerPool`` runs several worker processes, each with its own chat
+implementation, behind the single Gradio front end. The front end only relays
+text, so the CPU-bound parts of requests (response parsing, state
+serialization, prompt rendering, policy scans) run in parallel instead of
+contending for one GIL.
+
+Sessions are routed by a hash of their ID, so every message of a session
+reaches the same worker, where its cancellation flags and in-memory state
+live. Everything else the workers need to share is on disk: checkpoints,
+artifacts and provider installs, and the response and validation caches
+(``iac_agent/core/shared_cache.py``), all in SQLite databases in WAL mode.
+
+``drain`` stops accepting requests, lets the running ones finish within a
+timeout, cancels what is left and only then stops the workers. A stopping
+worker keeps handling cancellations until its last request has ended, so
+terraform process trees are torn down by the cancellation, not orphaned by a
+kill.
+"""
+
+import hashlib
+import inspect
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from iac_agent.core.chat_interface import ChatInterface
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+DEFAULT_WORKERS = int(os.getenv("IAC_AGENT_WORKERS", "1"))
+# requests served concurrently by one worker, each on its own thread
+DEFAULT_WORKER_CONCURRENCY = int(os.getenv("IAC_AGENT_WORKER_CONCURRENCY", "4"))
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv("IAC_AGENT_DRAIN_TIMEOUT", "60"))
+# how often waiting sides check that the other side is still alive
+POLL_INTERVAL = 0.5
+# time cancelled requests and stopped workers get to wind down before they are killed
+CANCEL_GRACE_SECONDS = 10.0
+
+
+def _serve_request(
+    chat: ChatInterface,
+    responses: Any,
+    request_id: str,
+    message: str,
+    chat_history: Optional[List[Dict[str, str]]],
+    session_id: Optional[str],
+    stop: threading.Event,
+    cancel: threading.Event,
+) -> None:
+    """Run one request in a worker and send its chunks to the front end."""
+    chunks = None
+    try:
+        parameters = inspect.signature(chat.process_message).parameters
+        kwargs: Dict[str, Any] = {}
+        if session_id is not None and "session_id" in parameters:
+            kwargs["session_id"] = session_id
+        if "cancel_event" in parameters:
+            kwargs["cancel_event"] = cancel
+        chunks = chat.process_message(message, chat_history, **kwargs)
+        for chunk in chunks:
+            if stop.is_set():
+                break
+            responses.put(("chunk", request_id, chunk))
+    except Exception as e:
+        logger.exception(f"Request {request_id} failed")
+        responses.put(("error", request_id, f"{type(e).__name__}: {e}"))
+        return
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    responses.put(("done", request_id))
+
+
+def _worker_main(
+    index: int,
+    factory: Callable[[], ChatInterface],
+    requests: Any,
+    responses: Any,
+    parent_pid: int,
+) -> None:
+    """Entry point of a worker process: serve requests until told to stop and the running ones have ended."""
+    # the front end decides when to stop, a signal to the process group must not cut requests short
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        chat = factory()
+    except Exception as e:
+        logger.exception(f"Worker {index} failed to start")
+        responses.put(("failed", index, f"{type(e).__name__}: {e}"))
+        return
+    responses.put(("ready", index, os.getpid()))
+    # request ID -> (thread, stop flag, cancel flag passed to the chat)
+    running: Dict[str, Tuple[threading.Thread, threading.Event, threading.Event]] = {}
+    stopping = False
+    while True:
+        for request_id in [request_id for request_id, (thread, _, _) in running.items() if not thread.is_alive()]:
+            running.pop(request_id)
+        # a stopping worker still reads cancellations until its last request has ended
+        if stopping and not running:
+            break
+        try:
+            command = requests.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if os.getppid() != parent_pid:
+                logger.warning(f"Worker {index}: front end exited, stopping")
+                break
+            continue
+        if command[0] == "run":
+            _, request_id, message, chat_history, session_id = command
+            if stopping:
+                responses.put(("error", request_id, f"Worker {index} is stopping"))
+                continue
+            stop = threading.Event()
+            cancel = threading.Event()
+            thread = threading.Thread(
+                target=_serve_request,
+                args=(chat, responses, request_id, message, chat_history, session_id, stop, cancel),
+                name=f"request-{request_id[:8]}",
+                daemon=True,
+            )
+            running[request_id] = (thread, stop, cancel)
+            thread.start()
+        elif command[0] == "cancel":
+            entry = running.get(command[1])
+            if entry is not None:
+                _, stop, cancel = entry
+                if "cancel_event" in inspect.signature(chat.process_message).parameters:
+                    # the chat stops this request itself and still replies that it was cancelled
+                    cancel.set()
+                else:
+                    stop.set()
+        elif command[0] == "stop":
+            stopping = True
+    # only left with running requests when the front end is gone, let them wind down
+    for thread, _, _ in list(running.values()):
+        thread.join()
+    logger.info(f"Worker {index} stopped")
+
+
+class WorkerPool(ChatInterface):
+    """Chat implementation that forwards requests to worker processes with session affinity."""
+
+    def __init__(
+        self,
+        factory: Callable[[], ChatInterface],
+        workers: int = DEFAULT_WORKERS,
+        concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+    ):
+        """Create the pool; no process is started before ``start``.
+
+        Args:
+            factory: Picklable callable creating the chat implementation in a
+                worker, e.g. a ``functools.partial`` of a module-level function
+            workers: Number of worker processes
+            concurrency: Requests served concurrently by one worker
+        """
+        if workers < 1:
+            raise ValueError(f"At least one worker is needed, got {workers}")
+        self.factory = factory
+        self.concurrency = concurrency
+        # spawned workers do not inherit the front end's threads and locks
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * workers
+        self.request_queues: List[Any] = [None] * workers
+        self.responses = self.context.Queue()
+        # request ID -> (worker index, session ID, inbox of the waiting caller)
+        self.pending: Dict[str, Tuple[int, Optional[str], queue.Queue]] = {}
+        self.lock = threading.Lock()
+        self.accepting = False
+        self.round_robin = itertools.count()
+        self.dispatcher: Optional[threading.Thread] = None
+
+    @property
+    def workers(self) -> int:
+        return len(self.processes)
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Requests the whole pool serves at once, the front end's queue limit."""
+        return self.workers * self.concurrency
+
+    def start(self) -> None:
+        """Start the worker processes and the thread routing their output."""
+        with self.lock:
+            for index in range(self.workers):
+                self._start_worker(index)
+            self.accepting = True
+        self.dispatcher = threading.Thread(target=self._dispatch, name="worker-pool-dispatch", daemon=True)
+        self.dispatcher.start()
+        logger.info(f"Started {self.workers} workers serving {self.concurrency} requests each")
+
+    def _start_worker(self, index: int) -> None:
+        """Start (or restart) a worker with a fresh request queue (lock held)."""
+        self.request_queues[index] = self.context.Queue()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(index, self.factory, self.request_queues[index], self.responses, os.getpid()),
+            name=f"iac-agent-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def worker_for(self, session_id: Optional[str]) -> int:
+        """Index of the worker serving a session; anonymous requests are spread round-robin."""
+        if session_id is None:
+            return next(self.round_robin) % self.workers
+        digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.workers
+
+    def process_message(
+        self,
+        message: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        session_id: Optional[str] = None,
+    ):
+        """Forward a message to the session's worker and stream its response.
+
+        Closing the generator (e.g. the client disconnected) cancels the
+        request in the worker.
+
+        Args:
+            message: The user's input message
+            chat_history: Previous conversation history
+            session_id: Session identifier, used for routing and by the worker's chat
+
+        Yields:
+            str: The chunks produced by the worker
+
+        Raises:
+            RuntimeError: If the request failed or its worker died
+        """
+        if not self.accepting:
+            yield "🛑 The server is shutting down, please send your message again in a moment."
+            return
+        index = self.worker_for(session_id)
+        request_id = uuid.uuid4().hex
+        inbox: queue.Queue = queue.Queue()
+        with self.lock:
+            process = self.processes[index]
+            if process is None or not process.is_alive():
+                logger.warning(f"Worker {index} is not running, restarting it")
+                self._start_worker(index)
+                process = self.processes[index]
+            self.pending[request_id] = (index, session_id, inbox)
+            self.request_queues[index].put(("run", request_id, message, chat_history, session_id))
+        finished = False
+        try:
+            while True:
+                try:
+                    kind, payload = inbox.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if not process.is_alive():
+                        finished = True
+                        raise RuntimeError(f"Worker {index} exited while serving the request")
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "error":
+                    finished = True
+                    raise RuntimeError(payload)
+                else:
+                    finished = True
+                    return
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+                if not finished and process.is_alive():
+                    # the caller went away, stop the request in the worker
+                    self.request_queues[index].put(("cancel", request_id))
+
+    def cancel(self, session_id: Optional[str] = None) -> int:
+        """Cancel the running requests of a session.
+
+        Returns:
+            int: Number of requests cancelled
+        """
+        with self.lock:
+            cancelled = [
+                (request_id, index) for request_id, (index, pending_session, _) in self.pending.items()
+                if pending_session == session_id
+            ]
+            for request_id, index in cancelled:
+                self.request_queues[index].put(("cancel", request_id))
+        return len(cancelled)
+
+    def _dispatch(self) -> None:
+        """Route worker output to the callers waiting for it."""
+        while True:
+            item = self.responses.get()
+            if item is None:
+                return
+            kind, key, *rest = item
+            if kind == "ready":
+                logger.info(f"Worker {key} ready (pid {rest[0]})")
+                continue
+            if kind == "failed":
+                logger.error(f"Worker {key} failed to start: {rest[0]}")
+                continue
+            with self.lock:
+                entry = self.pending.get(key)
+            # output of a request whose caller already left is dropped
+            if entry is not None:
+                entry[2].put((kind, rest[0] if rest else None))
+
+    def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+        """Stop accepting requests, let running ones finish and stop the workers.
+
+        Requests still running after ``timeout`` are cancelled. Workers are
+        told to stop after that and exit once their requests have ended; a
+        worker still alive after a grace period is killed as a last resort.
+
+        Args:
+            timeout: Seconds the running requests get to finish
+
+        Returns:
+            bool: True if every running request finished on its own
+        """
+        with self.lock:
+            if not self.accepting and self.dispatcher is None:
+                return True
+            self.accepting = False
+            logger.info(f"Draining {len(self.pending)} running requests")
+        drained = self._wait_for_requests(timeout)
+        if not drained:
+            # cancels go out while the workers still serve, so they stop terraform before exiting
+            with self.lock:
+                logger.warning(f"Drain timeout reached, cancelling {len(self.pending)} requests")
+                for request_id, (index, _, _) in self.pending.items():
+                    self.request_queues[index].put(("cancel", request_id))
+            self._wait_for_requests(CANCEL_GRACE_SECONDS)
+        with self.lock:
+            for request_queue, process in zip(self.request_queues, self.processes):
+                if process is not None and process.is_alive():
+                    request_queue.put(("stop",))
+        stop_by = time.monotonic() + CANCEL_GRACE_SECONDS
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(max(stop_by - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Worker {index} still has running requests, killing it")
+                process.kill()
+                process.join()
+        self.responses.put(None)
+        if self.dispatcher is not None:
+            self.dispatcher.join()
+            self.dispatcher = None
+        logger.info("Worker pool stopped")
+        return drained
+
+    def _wait_for_requests(self, timeout: float) -> bool:
+        """Wait until no request is pending; False if some still are after ``timeout``."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not self.pending:
+                    return True
+            time.sleep(0.1)
+        with self.lock:
+            return not self.pending
@@ -1,50 +1,156 @@
-import re
-from typing import Union
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Union
+
+import numpy as np
+
+CompiledExpression = Callable[[Mapping[str, Any]], Any]
+
+MAX_EXPONENT = 1000
+# integer powers are exact and unbounded, their results are capped by size
+MAX_RESULT_DIGITS = 1000
+
+
+def _power(base: Any, exponent: Any) -> Any:
+    # bounded so an expression like 9**9**9 cannot hang the process
+    if np.any(np.abs(exponent) > MAX_EXPONENT):
+        raise ValueError("Exponent too large")
+    # a bounded exponent is not enough once powers nest, e.g. ((10**999)**999)**999
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * math.log10(abs(base)) > MAX_RESULT_DIGITS:
+            raise ValueError("Result too large")
+    return operator.pow(base, exponent)
+
+
+# operators and functions allowed in expressions; the numpy functions work on
+# scalars and element-wise on arrays, so one compiled formula prices a whole
+# column of resources at once
+BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "min": np.minimum,
+    "max": np.maximum,
+    "abs": np.abs,
+    "ceil": np.ceil,
+    "floor": np.floor,
+}
+
 
 class Calculator:
     """A simple calculator tool for evaluating basic arithmetic expressions."""
-    
+
     @staticmethod
-    def evaluate_expression(expression: str) -> Union[float, str]:
+    def evaluate_expression(expression: str, variables: Optional[Mapping[str, Any]] = None) -> Union[float, str]:
         """Evaluate a basic arithmetic expression.
-        
-        Supports only basic arithmetic operations (+, -, *, /) and parentheses.
-        Returns an error message if the expression is invalid or cannot be 
+
+        Supports basic arithmetic operations (+, -, *, /, //, %, **), parentheses,
+        named variables and the functions min, max, abs, ceil and floor.
+        Returns an error message if the expression is invalid or cannot be
         evaluated safely.
-        
+
         Args:
             expression: A string containing a mathematical expression
                        e.g. "5 + 3" or "10 * (2 + 3)"
-            
+            variables: Values of the names used in the expression
+
         Returns:
             Union[float, str]: The result of the evaluation, or an error message
                               if the expression is invalid
-        
+
         Examples:
             >>> Calculator.evaluate_expression("5 + 3")
             8.0
             >>> Calculator.evaluate_expression("10 * (2 + 3)")
             50.0
-            >>> Calculator.evaluate_expression("15 / 3")
-            5.0
+            >>> Calculator.evaluate_expression("hourly * hours", {"hourly": 0.01, "hours": 730})
+            7.3
         """
         try:
-            # Clean up the expression
-            expression = expression.strip()
-            
-            # Only allow safe characters (digits, basic operators, parentheses, spaces)
-            if not re.match(r'^[\d\s\+\-\*\/\(\)\.]*$', expression):
-                return "Error: Invalid characters in expression"
-            
-            # Evaluate the expression
-            result = eval(expression, {"__builtins__": {}})
-            
-            # Convert to float and handle division by zero
+            result = Calculator.compile(expression.strip())(variables or {})
             return float(result)
-            
         except ZeroDivisionError:
             return "Error: Division by zero"
-        except (SyntaxError, TypeError, NameError):
+        except KeyError as e:
+            return f"Error: Unknown variable {e.args[0]}"
+        except (SyntaxError, TypeError, ValueError):
             return "Error: Invalid expression"
         except Exception as e:
             return f"Error: {str(e)}"
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def compile(expression: str) -> CompiledExpression:
+        """Compile an expression into a callable taking the variable values.
+
+        The expression is parsed once and turned into a tree of closures, so
+        repeated evaluations (e.g. a pricing formula applied to every stack)
+        skip parsing entirely. Only the whitelisted operators and functions
+        are accepted; nothing is ever passed to ``eval``.
+
+        Args:
+            expression: A string containing a mathematical expression
+
+        Returns:
+            CompiledExpression: Callable mapping variable values to the result;
+                it raises KeyError for variables that are not provided
+
+        Raises:
+            SyntaxError: If the expression cannot be parsed
+            ValueError: If the expression uses unsupported syntax
+        """
+        return _compile_node(ast.parse(expression, mode="eval").body)
+
+
+def _compile_node(node: ast.AST) -> CompiledExpression:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = node.value
+        return lambda variables: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in ("pi", "e"):
+            constant = getattr(math, name)
+            return lambda variables: constant
+        return lambda variables: variables[name]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        function = BINARY_OPERATORS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda variables: function(left(variables), right(variables))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        function = UNARY_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda variables: function(operand(variables))
+    if (
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+        and not node.keywords and node.args
+    ):
+        function = FUNCTIONS[node.func.id]
+        arguments = [_compile_node(argument) for argument in node.args]
+        if len(arguments) == 1:
+            argument = arguments[0]
+            return lambda variables: function(argument(variables))
+        if node.func.id not in ("min", "max"):
+            raise ValueError(f"{node.func.id}() takes exactly one argument")
+        first, *rest = arguments
+
+        def call(variables):
+            # min/max fold over any number of arguments
+            result = first(variables)
+            for argument in rest:
+                result = function(result, argument(variables))
+            return result
+
+        return call
+    raise ValueError(f"Unsupported expression element: {ast.dump(node)}")
@@ -0,0 +1,259 @@
+"""Offline monthly cost estimation for generated Terraform stacks.
+
+Resources are extracted from the parsed files into line items (resource type,
+SKU such as the instance type or storage type, count, storage size), joined
+against a local columnar pricing table and priced with per-type formulas
+compiled once by ``Calculator``. All line items of all stacks being estimated
+are priced together as numpy columns, so estimating one stack or many
+candidate stacks costs a handful of vectorized operations.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from iac_agent.tools.calculator import Calculator
+from iac_agent.tools.hcl_parser import Block, Expression, parse_terraform_files
+
+DEFAULT_PRICING_TABLE = os.getenv(
+    "IAC_AGENT_PRICING_TABLE", str(Path(__file__).parent / "data" / "aws_pricing.json")
+)
+ANY_SKU = "*"
+# defaults terraform / AWS apply when the argument is omitted
+DEFAULT_ROOT_VOLUME_GB = 8
+DEFAULT_DB_STORAGE_GB = 20
+DEFAULT_VOLUME_TYPE = "gp2"
+
+
+@dataclass
+class CostItem:
+    """Monthly cost of one priced line item of a stack."""
+
+    address: str
+    resource_type: str
+    sku: str
+    count: int
+    monthly_cost: float
+
+
+@dataclass
+class CostEstimate:
+    """Monthly cost estimate of a Terraform stack."""
+
+    total_monthly: float
+    currency: str
+    items: List[CostItem] = field(default_factory=list)
+    unpriced: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CostEstimate":
+        """Rebuild an estimate stored in the workflow state by ``as_dict``."""
+        return cls(
+            data["total_monthly"],
+            data["currency"],
+            [CostItem(**item) for item in data.get("items", [])],
+            list(data.get("unpriced", [])),
+        )
+
+    def summary(self, max_items: int = 8) -> str:
+        """Markdown summary of the most expensive line items."""
+        lines = [f"**Estimated monthly cost:** {self.total_monthly:,.2f} {self.currency}"]
+        for item in sorted(self.items, key=lambda item: -item.monthly_cost)[:max_items]:
+            if item.monthly_cost > 0:
+                count = f" x{item.count}" if item.count != 1 else ""
+                sku = f" ({item.sku})" if item.sku != ANY_SKU else ""
+                lines.append(f"  - {item.address}{sku}{count}: {item.monthly_cost:,.2f} {self.currency}")
+        if self.unpriced:
+            lines.append(f"  - not priced: {', '.join(self.unpriced)}")
+        return "\n".join(lines)
+
+
+class _LineItems:
+    """Column buffers for the line items of the stacks being estimated."""
+
+    def __init__(self):
+        self.stack: List[int] = []
+        self.address: List[str] = []
+        self.resource_type: List[str] = []
+        self.sku: List[str] = []
+        self.count: List[int] = []
+        self.storage_gb: List[float] = []
+        self.multi_az: List[int] = []
+
+    def add(self, stack: int, address: str, resource_type: str, sku: str, count: int,
+            storage_gb: float = 0.0, multi_az: bool = False) -> None:
+        self.stack.append(stack)
+        self.address.append(address)
+        self.resource_type.append(resource_type)
+        self.sku.append(sku)
+        self.count.append(count)
+        self.storage_gb.append(storage_gb)
+        self.multi_az.append(int(multi_az))
+
+
+def _number(value: Any, default: float) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+
+def _string(value: Any, default: str) -> str:
+    return value if isinstance(value, str) and not isinstance(value, Expression) else default
+
+
+def resource_count(block: Block) -> int:
+    """Instances a resource block creates; unknown ``count``/``for_each`` values count as one."""
+    count = block.body.get("count")
+    if count is not None:
+        return int(count) if isinstance(count, int) and not isinstance(count, bool) else 1
+    for_each = block.body.get("for_each")
+    if isinstance(for_each, (list, dict)):
+        return len(for_each)
+    return 1
+
+
+class CostEstimator:
+    """Prices Terraform stacks against a columnar pricing table."""
+
+    def __init__(self, table: Dict[str, Any]):
+        """Create the estimator.
+
+        Args:
+            table: Pricing table with ``columns`` (resource_type, sku, hourly,
+                per_gb_month, monthly), ``formulas`` by resource type, a
+                ``default_formula``, ``hours_per_month`` and ``currency``
+        """
+        columns = table["columns"]
+        self.currency = table.get("currency", "USD")
+        self.hours_per_month = float(table.get("hours_per_month", 730))
+        self.hourly = np.asarray(columns["hourly"], dtype=np.float64)
+        self.per_gb_month = np.asarray(columns["per_gb_month"], dtype=np.float64)
+        self.monthly = np.asarray(columns["monthly"], dtype=np.float64)
+        self.row_index: Dict[tuple, int] = {
+            (resource_type, sku): index
+            for index, (resource_type, sku) in enumerate(zip(columns["resource_type"], columns["sku"]))
+        }
+        self.default_formula = table.get("default_formula", "count * (hourly * hours + per_gb_month * storage_gb + monthly)")
+        self.formulas: Dict[str, str] = table.get("formulas", {})
+        # compile every formula up front so a bad table fails at load time
+        for formula in {self.default_formula, *self.formulas.values()}:
+            Calculator.compile(formula)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "CostEstimator":
+        """Load the estimator from a pricing table file, the vendored AWS table by default."""
+        with open(path or DEFAULT_PRICING_TABLE, encoding="utf-8") as table_file:
+            return cls(json.load(table_file))
+
+    def estimate(self, terraform_files: Dict[str, str]) -> CostEstimate:
+        """Estimate the monthly cost of one stack."""
+        return self.estimate_many([terraform_files])[0]
+
+    def estimate_many(self, stacks: Sequence[Dict[str, str]]) -> List[CostEstimate]:
+        """Estimate the monthly cost of several candidate stacks in one vectorized pass.
+
+        Args:
+            stacks: Terraform stacks, each a mapping of filename to content
+
+        Returns:
+            List[CostEstimate]: One estimate per stack, in input order
+        """
+        return self.estimate_blocks([parse_terraform_files(files)[0] for files in stacks])
+
+    def estimate_blocks(self, stacks: Sequence[List[Block]]) -> List[CostEstimate]:
+        """Estimate already parsed stacks."""
+        items = _LineItems()
+        for stack_index, blocks in enumerate(stacks):
+            for block in blocks:
+                if block.kind == "resource" and len(block.labels) == 2:
+                    self._extract(stack_index, block, items)
+        costs = self._price(items)
+        totals = np.bincount(
+            np.asarray(items.stack, dtype=np.intp), weights=np.nan_to_num(costs), minlength=len(stacks)
+        )
+        estimates = [CostEstimate(round(float(total), 2), self.currency) for total in totals]
+        for index, stack_index in enumerate(items.stack):
+            estimate = estimates[stack_index]
+            if np.isnan(costs[index]):
+                sku = items.sku[index]
+                estimate.unpriced.append(items.address[index] + (f" ({sku})" if sku != ANY_SKU else ""))
+            else:
+                estimate.items.append(CostItem(
+                    items.address[index], items.resource_type[index], items.sku[index],
+                    items.count[index], round(float(costs[index]), 2),
+                ))
+        return estimates
+
+    def _extract(self, stack: int, block: Block, items: _LineItems) -> None:
+        """Turn a resource block into priced line items."""
+        resource_type, address, count = block.labels[0], block.address, resource_count(block)
+        body = block.body
+        if resource_type == "aws_instance":
+            items.add(stack, address, resource_type, _string(body.get("instance_type"), "unknown"), count)
+            root_devices = block.blocks("root_block_device")
+            root = root_devices[0].body if root_devices else {}
+            items.add(
+                stack, f"{address}.root_block_device", "aws_instance.storage",
+                _string(root.get("volume_type"), DEFAULT_VOLUME_TYPE), count,
+                storage_gb=_number(root.get("volume_size"), DEFAULT_ROOT_VOLUME_GB),
+            )
+            for device in block.blocks("ebs_block_device"):
+                items.add(
+                    stack, f"{address}.ebs_block_device", "aws_instance.storage",
+                    _string(device.body.get("volume_type"), DEFAULT_VOLUME_TYPE), count,
+                    storage_gb=_number(device.body.get("volume_size"), 0),
+                )
+        elif resource_type == "aws_ebs_volume":
+            items.add(
+                stack, address, resource_type, _string(body.get("type"), DEFAULT_VOLUME_TYPE), count,
+                storage_gb=_number(body.get("size"), 0),
+            )
+        elif resource_type == "aws_db_instance":
+            multi_az = body.get("multi_az") is True
+            items.add(stack, address, resource_type, _string(body.get("instance_class"), "unknown"), count,
+                      multi_az=multi_az)
+            items.add(
+                stack, f"{address}.storage", "aws_db_instance.storage",
+                _string(body.get("storage_type"), DEFAULT_VOLUME_TYPE), count,
+                storage_gb=_number(body.get("allocated_storage"), DEFAULT_DB_STORAGE_GB), multi_az=multi_az,
+            )
+        else:
+            items.add(stack, address, resource_type, ANY_SKU, count)
+
+    def _price(self, items: _LineItems) -> np.ndarray:
+        """Monthly cost per line item; NaN for items missing from the pricing table."""
+        rows = np.fromiter(
+            (
+                self.row_index.get((resource_type, sku), self.row_index.get((resource_type, ANY_SKU), -1))
+                for resource_type, sku in zip(items.resource_type, items.sku)
+            ),
+            dtype=np.intp,
+            count=len(items.sku),
+        )
+        costs = np.full(len(rows), np.nan)
+        priced = rows >= 0
+        if not priced.any():
+            return costs
+        variables = {
+            "count": np.asarray(items.count, dtype=np.float64),
+            "storage_gb": np.asarray(items.storage_gb, dtype=np.float64),
+            "multi_az": np.asarray(items.multi_az, dtype=np.float64),
+            "hourly": self.hourly[rows],
+            "per_gb_month": self.per_gb_month[rows],
+            "monthly": self.monthly[rows],
+            "hours": self.hours_per_month,
+        }
+        formulas = np.array([self.formulas.get(resource_type, self.default_formula) for resource_type in items.resource_type])
+        # one evaluation per distinct formula, over every line item that uses it
+        for formula in np.unique(formulas[priced]):
+            mask = priced & (formulas == formula)
+            selected = {
+                name: value[mask] if isinstance(value, np.ndarray) else value for name, value in variables.items()
+            }
+            costs[mask] = Calculator.compile(str(formula))(selected)
+        return costs
@@ -0,0 +1,541 @@
+"""Deterministic repairs for recurring Terraform diagnostics.
+
+The fix loop in part1 sends every validation failure to the LLM. A large share
+of those failures are the same handful of diagnostics (deprecated arguments,
+missing AMIs, missing ``required_providers``, malformed CIDR blocks) which
+can be repaired in-process by a plain text rewrite. This module parses the
+terraform CLI output into diagnostics and matches them against a library of
+signature-to-rewrite rules before the model is involved.
+"""
+
+import difflib
+import ipaddress
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from iac_agent.core.logger_configuration import get_logger
+
+logger = get_logger()
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+LOCATION_PATTERN = re.compile(
+    r'on (?P<file>[^\s]+) line (?P<line>\d+)'
+    r'(?:, in (?P<kind>resource|data|module|provider|variable|output|terraform)'
+    r'(?: "(?P<type>[^"]+)")?(?: "(?P<name>[^"]+)")?)?'
+)
+SOURCE_LINE_PATTERN = re.compile(r"^\s*\d+:")
+CIDR_PATTERN = re.compile(r'\b(\d{1,3}(?:\.\d{1,3}){3})(?:/(\d{1,3}))?\b')
+
+
+@dataclass
+class Diagnostic:
+    """A single error or warning reported by the terraform CLI."""
+
+    severity: str
+    summary: str
+    detail: str = ""
+    filename: Optional[str] = None
+    line: Optional[int] = None
+    block_kind: Optional[str] = None
+    block_type: Optional[str] = None
+    block_name: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Summary and detail joined, used for signature matching."""
+        return f"{self.summary}\n{self.detail}"
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the diagnostic location, used to avoid repeated repairs."""
+        return f"{self.summary}|{self.filename}|{self.block_type}.{self.block_name}"
+
+
+def parse_diagnostics(output: str) -> List[Diagnostic]:
+    """Parse human-readable terraform output into diagnostics.
+
+    Handles the box-drawn format of ``terraform validate`` / ``terraform init``
+    with or without colour codes.
+
+    Args:
+        output: Raw stderr/stdout of a terraform command
+
+    Returns:
+        List of parsed diagnostics, in output order
+    """
+    diagnostics: List[Diagnostic] = []
+    current: Optional[Diagnostic] = None
+    detail_lines: List[str] = []
+
+    def flush():
+        if current is not None:
+            current.detail = "\n".join(detail_lines).strip()
+            diagnostics.append(current)
+
+    for raw_line in ANSI_ESCAPE.sub("", output or "").splitlines():
+        line = raw_line.lstrip("╷╵│ ").rstrip()
+        header = re.match(r"^(Error|Warning):\s*(.*)$", line)
+        if header:
+            flush()
+            current = Diagnostic(severity=header.group(1).lower(), summary=header.group(2).strip())
+            detail_lines = []
+            continue
+        if current is None:
+            continue
+        location = LOCATION_PATTERN.search(line)
+        if location and current.filename is None:
+            current.filename = location.group("file")
+            current.line = int(location.group("line"))
+            current.block_kind = location.group("kind")
+            current.block_type = location.group("type")
+            current.block_name = location.group("name")
+            continue
+        if SOURCE_LINE_PATTERN.match(line) or line.startswith("with "):
+            continue
+        detail_lines.append(line)
+    flush()
+    return diagnostics
+
+
+def find_block(content: str, kind: str, block_type: str, name: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """Locate a top-level HCL block and return its (start, end) character offsets.
+
+    Args:
+        content: HCL file content
+        kind: Block keyword, e.g. ``resource`` or ``data``
+        block_type: First label, e.g. ``aws_instance``
+        name: Optional second label
+
+    Returns:
+        Offsets of the block including the closing brace, or None if not found
+    """
+    labels = rf'\s+"{re.escape(block_type)}"' + (rf'\s+"{re.escape(name)}"' if name else r'(?:\s+"[^"]*")?')
+    match = re.search(rf'^\s*{kind}{labels}\s*\{{', content, re.MULTILINE)
+    if not match:
+        return None
+    depth = 0
+    in_string = False
+    index = match.end() - 1
+    while index < len(content):
+        char = content[index]
+        if in_string:
+            if char == "\\":
+                index += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return match.start(), index + 1
+        index += 1
+    return None
+
+
+def _locate_file(diagnostic: Diagnostic, files: Dict[str, str]) -> Optional[str]:
+    """Resolve the file a diagnostic refers to, falling back to a block search."""
+    if diagnostic.filename in files:
+        return diagnostic.filename
+    if diagnostic.block_kind and diagnostic.block_type:
+        for filename, content in files.items():
+            if find_block(content, diagnostic.block_kind, diagnostic.block_type, diagnostic.block_name):
+                return filename
+    return None
+
+
+@dataclass
+class FixRule:
+    """A signature-to-rewrite rule.
+
+    Attributes:
+        name: Identifier used in hit-rate reports
+        signature: Regex matched against the diagnostic summary and detail
+        rewrite: Callable taking the diagnostic, the files and the user's
+            requirements, returning the rewritten file set, or None if the
+            rule matched but could not repair this occurrence
+    """
+
+    name: str
+    signature: re.Pattern
+    rewrite: Callable[[Diagnostic, Dict[str, str], str], Optional[Dict[str, str]]]
+    matches: int = 0
+    applied: int = 0
+
+    def apply(self, diagnostic: Diagnostic, files: Dict[str, str], requirements: str = "") -> Optional[Dict[str, str]]:
+        if not self.signature.search(diagnostic.text):
+            return None
+        self.matches += 1
+        rewritten = self.rewrite(diagnostic, files, requirements)
+        if rewritten is None or rewritten == files:
+            return None
+        self.applied += 1
+        return rewritten
+
+
+@dataclass
+class RepairResult:
+    """Outcome of running the library over one validation failure."""
+
+    files: Dict[str, str]
+    repaired: List[Diagnostic] = field(default_factory=list)
+    remaining: List[Diagnostic] = field(default_factory=list)
+    applied_rules: List[str] = field(default_factory=list)
+
+
+# Deprecated arguments that have a direct replacement: (resource type, argument) -> rewrite
+DEPRECATED_ARGUMENTS: Dict[Tuple[str, str], Callable[[str], Optional[str]]] = {
+    ("aws_eip", "vpc"): lambda value: 'domain = "vpc"' if value == "true" else "",
+    ("aws_db_instance", "name"): lambda value: f"db_name = {value}",
+}
+
+# Provider prefix -> required_providers entry
+KNOWN_PROVIDERS: Dict[str, Tuple[str, str]] = {
+    "aws": ("hashicorp/aws", "~> 5.0"),
+    "random": ("hashicorp/random", "~> 3.0"),
+    "tls": ("hashicorp/tls", "~> 4.0"),
+    "azurerm": ("hashicorp/azurerm", "~> 3.0"),
+    "google": ("hashicorp/google", "~> 5.0"),
+}
+
+AMI_DATA_SOURCE = """
+data "aws_ami" "{name}" {{
+  most_recent = true
+  owners      = ["{owner}"]
+
+  filter {{
+    name   = "name"
+    values = ["{pattern}"]
+  }}
+
+  filter {{
+    name   = "virtualization-type"
+    values = ["hvm"]
+  }}
+}}
+"""
+
+# Operating systems named in requirements -> (data source name, owner account, image name pattern).
+# Checked in order, so specific versions come before the distribution alone.
+AMI_IMAGES: List[Tuple[re.Pattern, Tuple[str, str, str]]] = [
+    (re.compile(r"(?i)ubuntu\s*24\.04|noble"),
+     ("ubuntu", "099720109477", "ubuntu/images/hvm-ssd-gp3/ubuntu-noble-24.04-amd64-server-*")),
+    (re.compile(r"(?i)ubuntu\s*22\.04|jammy"),
+     ("ubuntu", "099720109477", "ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*")),
+    (re.compile(r"(?i)ubuntu\s*20\.04|focal"),
+     ("ubuntu", "099720109477", "ubuntu/images/hvm-ssd/ubuntu-focal-20.04-amd64-server-*")),
+    (re.compile(r"(?i)amazon\s*linux\s*2023|\bal2023\b"),
+     ("amazon_linux", "amazon", "al2023-ami-2023.*-x86_64")),
+    (re.compile(r"(?i)amazon\s*linux\s*2\b"),
+     ("amazon_linux", "amazon", "amzn2-ami-hvm-*-x86_64-gp2")),
+    (re.compile(r"(?i)debian\s*12|bookworm"),
+     ("debian", "136693071363", "debian-12-amd64-*")),
+    (re.compile(r"(?i)windows\s*server\s*2022"),
+     ("windows", "amazon", "Windows_Server-2022-English-Full-Base-*")),
+]
+
+
+def _rewrite_deprecated_argument(
+    diagnostic: Diagnostic, files: Dict[str, str], requirements: str
+) -> Optional[Dict[str, str]]:
+    filename = _locate_file(diagnostic, files)
+    if not filename or not diagnostic.block_type:
+        return None
+    content = files[filename]
+    block = find_block(content, "resource", diagnostic.block_type, diagnostic.block_name)
+    if not block:
+        return None
+    body = content[block[0]:block[1]]
+    for (resource_type, argument), replacement in DEPRECATED_ARGUMENTS.items():
+        if resource_type != diagnostic.block_type:
+            continue
+        line_match = re.search(rf'^([ \t]*){argument}[ \t]*=[ \t]*(.+?)[ \t]*$', body, re.MULTILINE)
+        if not line_match:
+            continue
+        new_line = replacement(line_match.group(2))
+        if new_line is None:
+            continue
+        new_body = (
+            body[:line_match.start()]
+            + (f"{line_match.group(1)}{new_line}" if new_line else "")
+            + body[line_match.end() + (0 if new_line else 1):]
+        )
+        return {**files, filename: content[:block[0]] + new_body + content[block[1]:]}
+    return None
+
+
+def _rewrite_ami_to_data_source(
+    diagnostic: Diagnostic, files: Dict[str, str], requirements: str
+) -> Optional[Dict[str, str]]:
+    filename = _locate_file(diagnostic, files)
+    if not filename or diagnostic.block_type != "aws_instance":
+        return None
+    # the image must follow the requested OS, without one the LLM decides
+    image = next((image for pattern, image in AMI_IMAGES if pattern.search(requirements)), None)
+    if image is None:
+        return None
+    data_name, owner, name_pattern = image
+    content = files[filename]
+    block = find_block(content, "resource", "aws_instance", diagnostic.block_name)
+    if not block:
+        return None
+    body = content[block[0]:block[1]]
+    if re.search(r'^\s*ami\s*=', body, re.MULTILINE):
+        return None
+    opening = body.index("{") + 1
+    new_body = body[:opening] + f"\n  ami = data.aws_ami.{data_name}.id" + body[opening:]
+    content = content[:block[0]] + new_body + content[block[1]:]
+    if not any(find_block(text, "data", "aws_ami", data_name) for text in files.values()):
+        content = content.rstrip() + "\n" + AMI_DATA_SOURCE.format(name=data_name, owner=owner, pattern=name_pattern)
+    return {**files, filename: content}
+
+
+def _rewrite_required_providers(
+    diagnostic: Diagnostic, files: Dict[str, str], requirements: str
+) -> Optional[Dict[str, str]]:
+    all_content = "\n".join(files.values())
+    if re.search(r"required_providers\s*\{", all_content):
+        return None
+    prefixes = set(re.findall(r'^\s*(?:resource|data)\s+"([a-z0-9]+)_', all_content, re.MULTILINE))
+    prefixes |= set(re.findall(r'^\s*provider\s+"([a-z0-9]+)"', all_content, re.MULTILINE))
+    entries = [
+        f'    {prefix} = {{\n      source  = "{KNOWN_PROVIDERS[prefix][0]}"\n      version = "{KNOWN_PROVIDERS[prefix][1]}"\n    }}'
+        for prefix in sorted(prefixes) if prefix in KNOWN_PROVIDERS
+    ]
+    if not entries:
+        return None
+    required = "  required_providers {\n" + "\n".join(entries) + "\n  }\n"
+    for filename, content in files.items():
+        terraform_block = re.search(r'^\s*terraform\s*\{', content, re.MULTILINE)
+        if terraform_block:
+            insert_at = terraform_block.end()
+            return {**files, filename: content[:insert_at] + "\n" + required + content[insert_at:]}
+    return {**files, "versions.tf": "terraform {\n" + required + "}\n"}
+
+
+def _rewrite_block_attribute(attribute: str, value: str, only_if: Optional[str] = None):
+    """Build a rewrite that sets ``attribute = value`` in the block the diagnostic points at.
+
+    Args:
+        attribute: Attribute to set
+        value: HCL source of the new value
+        only_if: Optional regex the current value must match to be replaced
+    """
+    def rewrite(diagnostic: Diagnostic, files: Dict[str, str], requirements: str) -> Optional[Dict[str, str]]:
+        filename = _locate_file(diagnostic, files)
+        if not filename or not diagnostic.block_type:
+            return None
+        content = files[filename]
+        block = find_block(content, "resource", diagnostic.block_type, diagnostic.block_name)
+        if not block:
+            return None
+        body = content[block[0]:block[1]]
+        current = re.search(rf'^([ \t]*){attribute}[ \t]*=[ \t]*(.+?)[ \t]*$', body, re.MULTILINE)
+        if current:
+            if only_if and not re.search(only_if, current.group(2)):
+                return None
+            new_body = body[:current.start()] + f"{current.group(1)}{attribute} = {value}" + body[current.end():]
+        else:
+            opening = body.index("{") + 1
+            new_body = body[:opening] + f"\n  {attribute} = {value}" + body[opening:]
+        return {**files, filename: content[:block[0]] + new_body + content[block[1]:]}
+    return rewrite
+
+
+def _rewrite_invalid_cidr(
+    diagnostic: Diagnostic, files: Dict[str, str], requirements: str
+) -> Optional[Dict[str, str]]:
+    replacements: Dict[str, str] = {}
+    for match in CIDR_PATTERN.finditer(diagnostic.text):
+        literal = match.group(0)
+        prefix = match.group(2)
+        try:
+            if prefix is None:
+                fixed = str(ipaddress.ip_network(f"{match.group(1)}/32"))
+            elif int(prefix) > 32:
+                continue
+            else:
+                fixed = str(ipaddress.ip_network(literal, strict=False))
+        except ValueError:
+            continue
+        if fixed != literal:
+            replacements[literal] = fixed
+    if not replacements:
+        return None
+    updated = dict(files)
+    for filename, content in files.items():
+        for literal, fixed in replacements.items():
+            content = content.replace(f'"{literal}"', f'"{fixed}"')
+        updated[filename] = content
+    return updated
+
+
+class ErrorFixLibrary:
+    """Registry of signature-to-rewrite rules applied before the LLM fix node.
+
+    Rules are tried in registration order for each diagnostic. Repairs learned
+    from successful LLM fixes are kept as literal line replacements and tried
+    after the built-in rules.
+    """
+
+    def __init__(self, rules: Optional[List[FixRule]] = None):
+        self.rules: List[FixRule] = list(rules or [])
+        self.learned: Dict[Tuple[str, str], List[str]] = {}
+        self.learned_matches = 0
+        self.learned_applied = 0
+
+    @classmethod
+    def default(cls) -> "ErrorFixLibrary":
+        """Create a library with the built-in rules."""
+        return cls([
+            FixRule(
+                "deprecated_argument",
+                re.compile(r"(?i)argument is deprecated|unsupported argument|deprecated.*use .* instead"),
+                _rewrite_deprecated_argument,
+            ),
+            FixRule(
+                "ami_data_source",
+                # the only AMI error validate reports; unknown AMI IDs only fail at apply time
+                re.compile(r'The argument "ami" is required'),
+                _rewrite_ami_to_data_source,
+            ),
+            FixRule(
+                "required_providers",
+                re.compile(r"(?i)required_providers|missing required provider|failed to query available provider packages"),
+                _rewrite_required_providers,
+            ),
+            FixRule(
+                "rds_encryption",
+                re.compile(r"Security policy SEC004"),
+                _rewrite_block_attribute("storage_encrypted", "true"),
+            ),
+            FixRule(
+                "private_s3_acl",
+                re.compile(r"Security policy SEC003: S3 bucket uses the public ACL"),
+                _rewrite_block_attribute("acl", '"private"', only_if=r"public|authenticated"),
+            ),
+            FixRule(
+                "invalid_cidr",
+                re.compile(r"(?i)invalid CIDR|not a valid CIDR|valid network CIDR"),
+                _rewrite_invalid_cidr,
+            ),
+        ])
+
+    def register(self, rule: FixRule) -> None:
+        """Add a rule to the library."""
+        self.rules.append(rule)
+
+    def repair(
+        self,
+        error_output: str,
+        files: Dict[str, str],
+        skip: Optional[List[str]] = None,
+        requirements: str = "",
+    ) -> RepairResult:
+        """Apply every matching rule to the files.
+
+        Args:
+            error_output: Raw terraform error output
+            files: Mapping of filename to content
+            skip: Diagnostic keys that were already repaired in this run and
+                must not be retried
+            requirements: The user's requirements; rules that depend on them
+                (e.g. the requested OS image) do nothing without them
+
+        Returns:
+            RepairResult: Rewritten files and the diagnostics left for the LLM
+        """
+        result = RepairResult(files=dict(files))
+        skip = set(skip or [])
+        for diagnostic in parse_diagnostics(error_output):
+            if diagnostic.severity != "error" and not diagnostic.summary.lower().startswith("argument is deprecated"):
+                continue
+            if diagnostic.key in skip:
+                result.remaining.append(diagnostic)
+                continue
+            rewritten, rule_name = self._apply_first(diagnostic, result.files, requirements)
+            if rewritten is None:
+                if diagnostic.severity == "error":
+                    result.remaining.append(diagnostic)
+                continue
+            result.files = rewritten
+            result.repaired.append(diagnostic)
+            result.applied_rules.append(rule_name)
+        return result
+
+    def _apply_first(
+        self, diagnostic: Diagnostic, files: Dict[str, str], requirements: str
+    ) -> Tuple[Optional[Dict[str, str]], str]:
+        for rule in self.rules:
+            rewritten = rule.apply(diagnostic, files, requirements)
+            if rewritten is not None:
+                return rewritten, rule.name
+        return self._apply_learned(diagnostic, files), "learned"
+
+    def _apply_learned(self, diagnostic: Diagnostic, files: Dict[str, str]) -> Optional[Dict[str, str]]:
+        if diagnostic.filename not in files or not diagnostic.line:
+            return None
+        lines = files[diagnostic.filename].splitlines()
+        if diagnostic.line > len(lines):
+            return None
+        original = lines[diagnostic.line - 1]
+        replacement = self.learned.get((diagnostic.summary, original.strip()))
+        if replacement is None:
+            return None
+        self.learned_matches += 1
+        indent = original[:len(original) - len(original.lstrip())]
+        lines[diagnostic.line - 1:diagnostic.line] = [indent + line for line in replacement]
+        self.learned_applied += 1
+        return {**files, diagnostic.filename: "\n".join(lines)}
+
+    def learn(self, error_output: str, files_before: Dict[str, str], files_after: Dict[str, str]) -> int:
+        """Record line-level rewrites from an LLM fix that passed validation.
+
+        Only small, local edits at the reported diagnostic line are learned so
+        that a learned rule never rewrites unrelated parts of a file.
+
+        Args:
+            error_output: The errors the LLM was asked to fix
+            files_before: Files sent to the LLM
+            files_after: Files returned by the LLM
+
+        Returns:
+            int: Number of new rules learned
+        """
+        learned = 0
+        for diagnostic in parse_diagnostics(error_output):
+            if diagnostic.filename not in files_before or diagnostic.filename not in files_after or not diagnostic.line:
+                continue
+            before = files_before[diagnostic.filename].splitlines()
+            after = files_after[diagnostic.filename].splitlines()
+            matcher = difflib.SequenceMatcher(a=before, b=after, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag not in ("replace", "delete") or not (i1 < diagnostic.line <= i2) or i2 - i1 != 1 or j2 - j1 > 3:
+                    continue
+                key = (diagnostic.summary, before[i1].strip())
+                if key[1] and key not in self.learned:
+                    self.learned[key] = [line.strip() for line in after[j1:j2]]
+                    learned += 1
+        if learned:
+            logger.info(f"Learned {learned} fix rules from LLM repair")
+        return learned
+
+    def hit_rates(self) -> Dict[str, Dict[str, float]]:
+        """Report how often each rule matched and how often it repaired the match."""
+        report = {
+            rule.name: {
+                "matches": rule.matches,
+                "applied": rule.applied,
+                "hit_rate": rule.applied / rule.matches if rule.matches else 0.0,
+            }
+            for rule in self.rules
+        }
+        report["learned"] = {
+            "matches": self.learned_matches,
+            "applied": self.learned_applied,
+            "hit_rate": self.learned_applied / self.learned_matches if self.learned_matches else 0.0,
+        }
+        return report
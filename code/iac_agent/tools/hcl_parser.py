@@ -0,0 +1,290 @@
+"""Lightweight HCL parser for generated Terraform files.
+
+Parses the subset of HCL the generator produces into plain Python structures
+so in-process checks (security policies, schema validation, cost estimation)
+can work on resources without calling the terraform CLI. Literal values
+(strings, numbers, bools, lists and objects) are converted to Python values;
+anything else (references, function calls, interpolated strings) is kept as an
+``Expression`` holding the raw source text.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
+NUMBER = re.compile(r"^-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+HEREDOC = re.compile(r"<<-?([A-Za-z_][A-Za-z0-9_]*)\s*\n")
+
+
+class Expression(str):
+    """Raw source of a non-literal HCL expression, e.g. ``var.region``."""
+
+
+@dataclass
+class Block:
+    """A parsed HCL block.
+
+    Attributes:
+        kind: Block keyword, e.g. ``resource``
+        labels: Block labels, e.g. ``["aws_instance", "web"]``
+        body: Attributes by name; nested blocks are stored as lists of ``Block``
+        filename: File the block was parsed from
+        line: 1-based line of the block header
+    """
+
+    kind: str
+    labels: List[str]
+    body: Dict[str, Any] = field(default_factory=dict)
+    filename: str = ""
+    line: int = 0
+
+    @property
+    def address(self) -> str:
+        return ".".join(self.labels) if self.kind == "resource" else ".".join([self.kind] + self.labels)
+
+    def blocks(self, name: str) -> List["Block"]:
+        """Nested blocks with the given name."""
+        value = self.body.get(name, [])
+        return [item for item in value if isinstance(item, Block)] if isinstance(value, list) else []
+
+    def attributes(self) -> Dict[str, Any]:
+        """Attributes of the block, without nested blocks."""
+        return {
+            key: value for key, value in self.body.items()
+            if not (isinstance(value, list) and value and all(isinstance(item, Block) for item in value))
+        }
+
+
+class HclParseError(ValueError):
+    """Raised when the content is not parseable HCL."""
+
+
+class _Parser:
+    def __init__(self, text: str, filename: str):
+        self.text = text
+        self.filename = filename
+        self.pos = 0
+        self.blocks: List[Block] = []
+
+    def line(self, pos: Optional[int] = None) -> int:
+        return self.text.count("\n", 0, self.pos if pos is None else pos) + 1
+
+    def skip(self, newlines: bool = True) -> None:
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char in " \t\r" or (newlines and char == "\n"):
+                self.pos += 1
+            elif char == "#" or self.text.startswith("//", self.pos):
+                end = self.text.find("\n", self.pos)
+                self.pos = len(self.text) if end == -1 else end
+            elif self.text.startswith("/*", self.pos):
+                end = self.text.find("*/", self.pos + 2)
+                self.pos = len(self.text) if end == -1 else end + 2
+            else:
+                break
+
+    def parse_body(self, closing: Optional[str]) -> Dict[str, Any]:
+        body: Dict[str, Any] = {}
+        while True:
+            self.skip()
+            if self.pos >= len(self.text):
+                if closing:
+                    raise HclParseError(f"{self.filename}: unexpected end of file, missing '{closing}'")
+                return body
+            if closing and self.text[self.pos] == closing:
+                self.pos += 1
+                return body
+            start = self.pos
+            match = IDENTIFIER.match(self.text, self.pos)
+            if not match:
+                raise HclParseError(f"{self.filename}:{self.line()}: unexpected character {self.text[self.pos]!r}")
+            name = match.group(0)
+            self.pos = match.end()
+            self.skip(newlines=False)
+            if self.text.startswith("=", self.pos) and not self.text.startswith("==", self.pos):
+                self.pos += 1
+                body[name] = self.parse_expression()
+                continue
+            labels = []
+            while True:
+                self.skip(newlines=False)
+                if self.text.startswith('"', self.pos):
+                    end = self.string_end(self.pos)
+                    labels.append(self.text[self.pos + 1:end - 1])
+                    self.pos = end
+                    continue
+                label = IDENTIFIER.match(self.text, self.pos)
+                if label and not self.text.startswith("{", self.pos):
+                    labels.append(label.group(0))
+                    self.pos = label.end()
+                    continue
+                break
+            self.skip()
+            if not self.text.startswith("{", self.pos):
+                raise HclParseError(f"{self.filename}:{self.line()}: expected '{{' after block {name!r}")
+            self.pos += 1
+            block = Block(kind=name, labels=labels, filename=self.filename, line=self.line(start))
+            block.body = self.parse_body("}")
+            body.setdefault(name, [])
+            if isinstance(body[name], list):
+                body[name].append(block)
+            if not closing:
+                self.blocks.append(block)
+
+    def string_end(self, pos: int) -> int:
+        """Return the index just past the string literal starting at ``pos``."""
+        index = pos + 1
+        depth = 0
+        while index < len(self.text):
+            char = self.text[index]
+            if char == "\\":
+                index += 2
+                continue
+            if self.text.startswith("${", index) or self.text.startswith("%{", index):
+                depth += 1
+                index += 2
+                continue
+            if char == "}" and depth:
+                depth -= 1
+            elif char == '"' and not depth:
+                return index + 1
+            index += 1
+        raise HclParseError(f"{self.filename}:{self.line(pos)}: unterminated string")
+
+    def parse_expression(self) -> Any:
+        self.skip(newlines=False)
+        start = self.pos
+        heredoc = HEREDOC.match(self.text, self.pos)
+        if heredoc:
+            terminator = re.compile(rf"^\s*{heredoc.group(1)}\s*$", re.MULTILINE)
+            end = terminator.search(self.text, heredoc.end())
+            if not end:
+                raise HclParseError(f"{self.filename}:{self.line()}: unterminated heredoc")
+            self.pos = end.end()
+            return Expression(self.text[start:self.pos])
+        depth = 0
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == '"':
+                self.pos = self.string_end(self.pos)
+                continue
+            if char in "[{(":
+                depth += 1
+            elif char in "]})":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif char == "\n" and depth == 0:
+                # a trailing operator continues the expression on the next line
+                if not re.search(r"(\?|:|&&|\|\||[+\-*/,])\s*$", self.text[start:self.pos]):
+                    break
+            elif char == "#" and depth == 0:
+                break
+            self.pos += 1
+        return literal(self.text[start:self.pos].strip())
+
+
+def _split_top_level(text: str, separators: str) -> List[str]:
+    """Split ``text`` on separator characters that are not nested or quoted."""
+    parts, depth, current, index = [], 0, [], 0
+    while index < len(text):
+        char = text[index]
+        if char == '"':
+            end = index + 1
+            while end < len(text) and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            current.append(text[index:end + 1])
+            index = end + 1
+            continue
+        if char in "[{(":
+            depth += 1
+        elif char in "]})":
+            depth -= 1
+        if char in separators and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        index += 1
+    tail = "".join(current).strip()
+    if tail:
+        parts.append(tail)
+    return [part for part in parts if part]
+
+
+def literal(source: str) -> Any:
+    """Convert the source of an expression into a Python value when it is a literal."""
+    if source.startswith('"') and source.endswith('"') and "${" not in source and len(source) >= 2:
+        body = source[1:-1]
+        if '"' not in body.replace('\\"', ""):
+            return body.replace('\\"', '"').replace("\\\\", "\\")
+    if source in ("true", "false"):
+        return source == "true"
+    if source == "null":
+        return None
+    if NUMBER.match(source):
+        return float(source) if any(char in source for char in ".eE") else int(source)
+    if source.startswith("[") and source.endswith("]"):
+        items = [literal(item) for item in _split_top_level(source[1:-1], ",\n")]
+        return items if not any(isinstance(item, Expression) for item in items) else Expression(source)
+    if source.startswith("{") and source.endswith("}"):
+        mapping = {}
+        for item in _split_top_level(source[1:-1], ",\n"):
+            key, separator, value = item.partition("=")
+            if not separator or value.startswith("="):
+                key, separator, value = item.partition(":")
+            if not separator:
+                return Expression(source)
+            mapping[key.strip().strip('"')] = literal(value.strip())
+        return mapping
+    return Expression(source)
+
+
+def parse_hcl(content: str, filename: str = "") -> List[Block]:
+    """Parse HCL content into its top-level blocks.
+
+    Args:
+        content: HCL source
+        filename: Name used for locations and error messages
+
+    Returns:
+        List of top-level blocks in source order
+
+    Raises:
+        HclParseError: If the content cannot be parsed
+    """
+    parser = _Parser(content, filename)
+    parser.parse_body(None)
+    return parser.blocks
+
+
+def parse_terraform_files(terraform_files: Dict[str, str]) -> Tuple[List[Block], List[str]]:
+    """Parse every file of a Terraform stack.
+
+    Files that fail to parse are reported instead of raising, terraform itself
+    produces the authoritative syntax errors.
+
+    Args:
+        terraform_files: Mapping of filename to content
+
+    Returns:
+        Tuple of all top-level blocks and the parse error messages
+    """
+    blocks: List[Block] = []
+    errors: List[str] = []
+    for filename, content in terraform_files.items():
+        try:
+            blocks.extend(parse_hcl(content, filename))
+        except HclParseError as e:
+            errors.append(str(e))
+    return blocks, errors
+
+
+def index_resources(blocks: List[Block]) -> Dict[str, List[Block]]:
+    """Index ``resource`` blocks by resource type."""
+    index: Dict[str, List[Block]] = {}
+    for block in blocks:
+        if block.kind == "resource" and block.labels:
+            index.setdefault(block.labels[0], []).append(block)
+    return index
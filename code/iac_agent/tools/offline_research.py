@@ -0,0 +1,121 @@
+"""Offline stand-ins for the deep research agents.
+
+``OfflineSearchTool`` and ``OfflineChatModel`` let the deep research workflow
+run without network access or API keys, e.g. for demos, development and load
+tests. Both are deterministic and can simulate latency, which makes the
+effect of the parallel fan-out visible.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60]
+
+
+def _section(text: str, heading: str) -> str:
+    """Text following ``heading:`` up to the next blank-line separated heading."""
+    match = re.search(rf"{heading}:\s*\n(.*?)(?:\n\n[A-Z][A-Za-z ]+:\s*\n|\Z)", text, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+class OfflineSearchTool:
+    """Deterministic web search stand-in returning synthetic results."""
+
+    def __init__(self, results_per_query: int = 3, latency_seconds: float = 0.0):
+        self.results_per_query = results_per_query
+        self.latency_seconds = latency_seconds
+
+    def invoke(self, query: str) -> List[Dict[str, str]]:
+        """Search for ``query``.
+
+        Returns:
+            List[Dict[str, str]]: Results with ``title``, ``url`` and ``content``
+        """
+        time.sleep(self.latency_seconds)
+        slug = _slug(query)
+        return [
+            {
+                "title": f"{query} ({['overview', 'analysis', 'case study', 'survey'][index % 4]})",
+                "url": f"https://example.org/{slug}/{index + 1}",
+                "content": (
+                    f"Source {index + 1} on {query}: summarizes the main facts, recent developments "
+                    f"and open questions reported for this topic."
+                ),
+            }
+            for index in range(self.results_per_query)
+        ]
+
+
+class OfflineChatModel(BaseChatModel):
+    """Chat model stand-in that answers the deep research prompts deterministically.
+
+    It recognises the planner, researcher and editor prompts by their system
+    instructions and builds a plausible answer from the user message.
+    """
+
+    latency_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-stand-in"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        system = " ".join(str(message.content) for message in messages if isinstance(message, SystemMessage))
+        text = "\n\n".join(str(message.content) for message in messages if not isinstance(message, SystemMessage))
+        if "research planner" in system:
+            content = self._plan(text)
+        elif "research assistant" in system:
+            content = self._summarize(text)
+        elif "report editor" in system:
+            content = self._edit(text)
+        else:
+            content = f"(offline model) {text[:200]}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    @staticmethod
+    def _plan(text: str) -> str:
+        topic = _section(text, "Research request") or text.strip()
+        limit = re.search(r"at most (\d+)", text)
+        aspects = [
+            "Background and key concepts of",
+            "Current state and recent developments in",
+            "Main challenges and risks of",
+            "Leading approaches and case studies for",
+            "Future outlook and open questions for",
+        ]
+        aspects = aspects[:int(limit.group(1))] if limit else aspects
+        return "\n".join(f"{index}. {aspect} {topic}" for index, aspect in enumerate(aspects, 1))
+
+    @staticmethod
+    def _summarize(text: str) -> str:
+        sub_task = _section(text, "Sub-task")
+        sources = re.findall(r"^\[(\d+)\] (.+)$", _section(text, "Search results"), re.MULTILINE)
+        cited = " ".join(f"[{number}]" for number, _ in sources)
+        return (
+            f"{sub_task} is covered by {len(sources)} sources {cited}. "
+            f"They agree on the main facts and highlight recent developments and open questions."
+        )
+
+    @staticmethod
+    def _edit(text: str) -> str:
+        topic = _section(text, "Research topic")
+        headings = re.findall(r"^## (.+)$", text, re.MULTILINE)
+        takeaways = "\n".join(f"- {heading}" for heading in headings[:5])
+        return (
+            f"This report on {topic} combines {len(headings)} parallel research threads.\n\n"
+            f"**Key takeaways:**\n{takeaways}"
+        )
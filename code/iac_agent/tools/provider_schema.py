@@ -0,0 +1,411 @@
+"""Offline index of Terraform provider schemas.
+
+Loads the output of ``terraform providers schema -json`` (path in
+``IAC_AGENT_PROVIDER_SCHEMA``) or, when none is configured, the vendored
+snapshot of common AWS types in ``data/aws_provider_schema.json``, into a
+compact index keyed by resource type. The index is used to
+
+* check the arguments of generated resources in-process, before paying for a
+  ``terraform init`` plus ``validate`` round trip, and
+* ground the generation and fix prompts with the schemas of only the resource
+  types a request needs.
+
+Only an index built from terraform's own schema output is ``complete``. The
+snapshot is a hand-maintained subset, so violations it reports are confirmed
+by ``terraform validate`` before they fail a stack. After the first successful
+``terraform init`` of a provider version set, ``refresh_from_terraform``
+replaces the snapshot with the complete schema of those providers, cached on
+disk per version set.
+
+The index is loaded on first use and shared by all sessions of the process.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from iac_agent.core.logger_configuration import get_logger
+from iac_agent.tools.hcl_parser import Block, parse_terraform_files
+
+logger = get_logger()
+
+DEFAULT_PROVIDER_SCHEMA = os.getenv("IAC_AGENT_PROVIDER_SCHEMA", "")
+SNAPSHOT_PATH = Path(__file__).parent / "data" / "aws_provider_schema.json"
+# terraform's schema output per provider version set, shared by all processes
+SCHEMA_CACHE_DIR = os.getenv("IAC_AGENT_PROVIDER_SCHEMA_CACHE", ".iac_agent/provider_schemas")
+
+# accepted on every resource / data source regardless of the provider schema
+META_ARGUMENTS = frozenset({"count", "for_each", "provider", "depends_on"})
+META_BLOCKS = frozenset({"lifecycle", "provisioner", "connection", "dynamic", "timeouts"})
+
+# user request keywords -> resource types whose schema grounds the generation prompt
+KEYWORD_RESOURCE_TYPES: Dict[str, List[str]] = {
+    r"\b(ec2|instance|server|vm|virtual machine|web ?server|host)s?\b": [
+        "aws_instance", "aws_security_group", "aws_key_pair",
+    ],
+    r"\b(vpc|subnet|network|nat|internet gateway|route)s?\b": [
+        "aws_vpc", "aws_subnet", "aws_internet_gateway", "aws_route_table", "aws_route_table_association",
+        "aws_nat_gateway", "aws_eip",
+    ],
+    r"\b(s3|bucket|object storage)s?\b": [
+        "aws_s3_bucket", "aws_s3_bucket_versioning", "aws_s3_bucket_public_access_block",
+        "aws_s3_bucket_server_side_encryption_configuration",
+    ],
+    r"\b(rds|database|db|postgres(ql)?|mysql|mariadb)s?\b": [
+        "aws_db_instance", "aws_db_subnet_group", "aws_security_group",
+    ],
+    r"\b(iam|role|policy|permission)s?\b": [
+        "aws_iam_role", "aws_iam_policy", "aws_iam_role_policy_attachment", "aws_iam_instance_profile",
+    ],
+    r"\b(security group|firewall|ingress|ssh|port)s?\b": [
+        "aws_security_group", "aws_vpc_security_group_ingress_rule", "aws_vpc_security_group_egress_rule",
+    ],
+    r"\b(elastic ip|eip|static ip)s?\b": ["aws_eip"],
+}
+
+
+@dataclass(frozen=True)
+class BlockSchema:
+    """Configurable arguments and nested blocks of a resource or nested block.
+
+    Attributes:
+        attributes: Names of configurable arguments (computed-only ones excluded)
+        required: Names of required arguments
+        deprecated: Names of deprecated arguments
+        blocks: Nested block schemas by name; None means the nested block is
+            accepted without checking its content
+    """
+
+    attributes: FrozenSet[str]
+    required: FrozenSet[str]
+    deprecated: FrozenSet[str]
+    blocks: Dict[str, Optional["BlockSchema"]]
+
+    def describe(self) -> str:
+        """One-line summary used in prompts: required args starred, deprecated args marked."""
+        arguments = [
+            f"{name}*" if name in self.required else f"{name} (deprecated)" if name in self.deprecated else name
+            for name in sorted(self.attributes)
+            if name != "tags_all"
+        ]
+        parts = [", ".join(arguments)]
+        for name in sorted(self.blocks):
+            nested = self.blocks[name]
+            parts.append(f"{name} {{ {nested.describe()} }}" if nested else f"{name} {{ ... }}")
+        return "; ".join(part for part in parts if part)
+
+
+@dataclass
+class SchemaViolation:
+    """An argument or block the provider schema does not accept."""
+
+    summary: str
+    detail: str
+    address: str
+    filename: str
+    line: int
+    block_kind: str = "resource"
+
+    def as_diagnostic(self) -> str:
+        """Render the violation in terraform's diagnostic layout so the fix loop can consume it."""
+        labels = self.address.split(".")
+        if self.block_kind != "resource":
+            labels = labels[1:]
+        quoted = " ".join(f'"{label}"' for label in labels)
+        return (
+            f"Error: {self.summary}\n"
+            f"  on {self.filename} line {self.line}, in {self.block_kind} {quoted}:\n"
+            f"{self.detail}\n"
+        )
+
+
+def _compile_terraform_block(block: Dict[str, Any]) -> BlockSchema:
+    """Compile a block of ``terraform providers schema -json`` output."""
+    attributes, required, deprecated = set(), set(), set()
+    for name, spec in (block.get("attributes") or {}).items():
+        if spec.get("computed") and not spec.get("optional") and not spec.get("required"):
+            continue
+        attributes.add(name)
+        if spec.get("required"):
+            required.add(name)
+        if spec.get("deprecated"):
+            deprecated.add(name)
+    blocks = {
+        name: _compile_terraform_block(spec.get("block") or {})
+        for name, spec in (block.get("block_types") or {}).items()
+    }
+    return BlockSchema(frozenset(attributes), frozenset(required), frozenset(deprecated), blocks)
+
+
+def _compile_compact_block(block: Dict[str, Any]) -> BlockSchema:
+    """Compile a block of the vendored snapshot format."""
+    attributes = block.get("attributes") or {}
+    blocks = {
+        name: _compile_compact_block(nested) if nested is not None else None
+        for name, nested in (block.get("blocks") or {}).items()
+    }
+    return BlockSchema(
+        frozenset(attributes),
+        frozenset(name for name, flags in attributes.items() if "required" in flags),
+        frozenset(name for name, flags in attributes.items() if "deprecated" in flags),
+        blocks,
+    )
+
+
+class ProviderSchemaIndex:
+    """Resource and data source schemas indexed by type."""
+
+    def __init__(
+        self,
+        resources: Dict[str, BlockSchema],
+        data_sources: Dict[str, BlockSchema],
+        source: str = "",
+        complete: bool = False,
+    ):
+        self.resources = resources
+        self.data_sources = data_sources
+        self.source = source
+        # built from terraform's full schema output, so its violations are authoritative
+        self.complete = complete
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], source: str = "") -> "ProviderSchemaIndex":
+        """Build the index from terraform's schema JSON or the vendored snapshot format."""
+        resources: Dict[str, BlockSchema] = {}
+        data_sources: Dict[str, BlockSchema] = {}
+        complete = "provider_schemas" in data
+        if complete:
+            for provider in data["provider_schemas"].values():
+                for name, schema in (provider.get("resource_schemas") or {}).items():
+                    resources[name] = _compile_terraform_block(schema.get("block") or {})
+                for name, schema in (provider.get("data_source_schemas") or {}).items():
+                    data_sources[name] = _compile_terraform_block(schema.get("block") or {})
+        else:
+            for name, schema in (data.get("resource_schemas") or {}).items():
+                resources[name] = _compile_compact_block(schema)
+            for name, schema in (data.get("data_source_schemas") or {}).items():
+                data_sources[name] = _compile_compact_block(schema)
+        return cls(resources, data_sources, source, complete)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "ProviderSchemaIndex":
+        """Load the index from a schema JSON file, the vendored snapshot by default."""
+        schema_path = Path(path) if path else SNAPSHOT_PATH
+        with open(schema_path, encoding="utf-8") as schema_file:
+            index = cls.from_json(json.load(schema_file), source=str(schema_path))
+        logger.info(
+            f"Loaded provider schema index from {schema_path}: "
+            f"{len(index.resources)} resource types, {len(index.data_sources)} data sources"
+        )
+        return index
+
+    @classmethod
+    def from_terraform(cls, working_dir: str, timeout: float = 120) -> "ProviderSchemaIndex":
+        """Build the index by running ``terraform providers schema -json`` in an initialized directory."""
+        return cls.from_json(
+            json.loads(_terraform_schema_json(working_dir, timeout)),
+            source=f"terraform providers schema ({working_dir})",
+        )
+
+    def schema_for(self, block: Block) -> Optional[BlockSchema]:
+        """Schema of a top-level ``resource`` or ``data`` block, None when the type is unknown."""
+        if not block.labels:
+            return None
+        if block.kind == "resource":
+            return self.resources.get(block.labels[0])
+        if block.kind == "data":
+            return self.data_sources.get(block.labels[0])
+        return None
+
+    def check(self, blocks: Iterable[Block]) -> List[SchemaViolation]:
+        """Check parsed blocks against the schemas of their types.
+
+        Types missing from the index are skipped, so a partial snapshot never
+        rejects valid configuration it does not know about.
+
+        Args:
+            blocks: Top-level blocks of a Terraform stack
+
+        Returns:
+            List[SchemaViolation]: Unsupported arguments/blocks and missing
+                required arguments, ordered by file and line
+        """
+        violations: List[SchemaViolation] = []
+        for block in blocks:
+            schema = self.schema_for(block)
+            if schema is not None:
+                self._check_body(block, block.body, schema, "", violations, top_level=True)
+        return sorted(violations, key=lambda violation: (violation.filename, violation.line))
+
+    def check_files(self, terraform_files: Dict[str, str]) -> List[SchemaViolation]:
+        """Parse and check a Terraform stack."""
+        blocks, _ = parse_terraform_files(terraform_files)
+        return self.check(blocks)
+
+    def _check_body(
+        self,
+        block: Block,
+        body: Dict[str, Any],
+        schema: BlockSchema,
+        path: str,
+        violations: List[SchemaViolation],
+        top_level: bool = False,
+    ) -> None:
+        allowed_arguments = schema.attributes | META_ARGUMENTS if top_level else schema.attributes
+        allowed_blocks = set(schema.blocks) | META_BLOCKS if top_level else set(schema.blocks) | {"dynamic"}
+        for name, value in body.items():
+            is_block = isinstance(value, list) and value and all(isinstance(item, Block) for item in value)
+            if is_block:
+                if name in allowed_blocks or name in schema.attributes:
+                    nested_schema = schema.blocks.get(name)
+                    if nested_schema is not None:
+                        for nested in value:
+                            self._check_body(block, nested.body, nested_schema, f"{path}{name}.", violations)
+                    continue
+                candidates = sorted(allowed_blocks)
+                violations.append(SchemaViolation(
+                    "Unsupported block type",
+                    f'Blocks of type "{path}{name}" are not expected here.{self._suggestion(name, candidates)}',
+                    block.address, block.filename, block.line, block.kind,
+                ))
+            elif name not in allowed_arguments:
+                candidates = sorted(allowed_arguments)
+                hint = (
+                    f' Did you mean to define a block of type "{name}"?' if name in schema.blocks
+                    else self._suggestion(name, candidates)
+                )
+                violations.append(SchemaViolation(
+                    "Unsupported argument",
+                    f'An argument named "{path}{name}" is not expected here.{hint}',
+                    block.address, block.filename, block.line, block.kind,
+                ))
+        for name in sorted(schema.required - set(body)):
+            violations.append(SchemaViolation(
+                "Missing required argument",
+                f'The argument "{path}{name}" is required, but no definition was found.',
+                block.address, block.filename, block.line, block.kind,
+            ))
+
+    @staticmethod
+    def _suggestion(name: str, candidates: List[str]) -> str:
+        matches = difflib.get_close_matches(name, candidates, n=1)
+        return f' Did you mean "{matches[0]}"?' if matches else ""
+
+    def relevant_types(self, user_input: str) -> List[str]:
+        """Resource types a request is likely to need, based on its keywords."""
+        types: List[str] = []
+        for pattern, resource_types in KEYWORD_RESOURCE_TYPES.items():
+            if re.search(pattern, user_input, re.IGNORECASE):
+                types.extend(name for name in resource_types if name in self.resources and name not in types)
+        return types
+
+    def types_in_files(self, terraform_files: Dict[str, str]) -> List[str]:
+        """Known resource types used by a Terraform stack."""
+        found = re.findall(r'^\s*resource\s+"([^"]+)"', "\n".join(terraform_files.values()), re.MULTILINE)
+        return sorted({name for name in found if name in self.resources})
+
+    def describe(self, resource_types: Iterable[str]) -> str:
+        """Compact schema text of the given resource types for a prompt."""
+        lines = [
+            f"- {name}: {self.resources[name].describe()}"
+            for name in resource_types
+            if name in self.resources
+        ]
+        if not lines:
+            return "(no provider schemas available for these resources)"
+        return "\n".join(lines)
+
+
+def _terraform_schema_json(working_dir: str, timeout: float) -> str:
+    result = subprocess.run(
+        ["terraform", "providers", "schema", "-json"],
+        cwd=working_dir,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"terraform providers schema failed: {result.stderr}")
+    return result.stdout
+
+
+def provider_versions(working_dir: str) -> str:
+    """Provider versions locked by ``terraform init`` in a directory, e.g. ``hashicorp/aws 5.94.1``; empty if none."""
+    try:
+        lock_file = (Path(working_dir) / ".terraform.lock.hcl").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
+    locked = re.findall(r'provider\s+"(?:[^"/]+/)?([^"]+)"\s*\{\s*version\s*=\s*"([^"]+)"', lock_file)
+    return ", ".join(f"{name} {version}" for name, version in sorted(locked))
+
+
+_shared_index: Optional[ProviderSchemaIndex] = None
+_shared_lock = threading.Lock()
+# provider version sets whose terraform schema was loaded or failed to load
+_refreshed_versions: Dict[str, Optional[ProviderSchemaIndex]] = {}
+
+
+def get_provider_schema_index() -> ProviderSchemaIndex:
+    """Return the process-wide schema index, loading it on first use."""
+    global _shared_index
+    if _shared_index is None:
+        with _shared_lock:
+            if _shared_index is None:
+                _shared_index = ProviderSchemaIndex.load(DEFAULT_PROVIDER_SCHEMA or None)
+    return _shared_index
+
+
+def refresh_from_terraform(working_dir: str, timeout: float = 120) -> Optional[ProviderSchemaIndex]:
+    """Make the complete schema of an initialized directory's providers the process-wide index.
+
+    Runs ``terraform providers schema -json`` once per provider version set;
+    the output is cached in ``SCHEMA_CACHE_DIR`` so other processes and
+    restarts skip it. An explicitly configured ``IAC_AGENT_PROVIDER_SCHEMA``
+    is kept. Failures are logged and leave the current index in place.
+
+    Args:
+        working_dir: Directory ``terraform init`` succeeded in
+        timeout: Seconds ``terraform providers schema`` may take
+
+    Returns:
+        Optional[ProviderSchemaIndex]: The complete index, None if it could not be built
+    """
+    global _shared_index
+    versions = provider_versions(working_dir)
+    if DEFAULT_PROVIDER_SCHEMA or not versions:
+        return None
+    with _shared_lock:
+        if versions in _refreshed_versions:
+            index = _refreshed_versions[versions]
+            if index is not None:
+                _shared_index = index
+            return index
+        # claimed before the slow part so concurrent validations do not run it twice
+        _refreshed_versions[versions] = None
+    cache_path = Path(SCHEMA_CACHE_DIR) / f"{hashlib.sha256(versions.encode('utf-8')).hexdigest()[:16]}.json"
+    try:
+        if not cache_path.exists():
+            schema_json = _terraform_schema_json(working_dir, timeout)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(schema_json, encoding="utf-8")
+            os.replace(tmp_path, cache_path)
+        index = ProviderSchemaIndex.load(str(cache_path))
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not load the provider schema of {versions}, keeping {get_provider_schema_index().source}: {e}")
+        return None
+    if not index.complete:
+        logger.warning(f"Provider schema cache {cache_path} is not terraform's schema output, ignoring it")
+        return None
+    with _shared_lock:
+        _refreshed_versions[versions] = index
+        _shared_index = index
+    logger.info(f"Provider schema check now uses the complete schema of {versions}")
+    return index
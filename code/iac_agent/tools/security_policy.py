@@ -0,0 +1,258 @@
+"""In-process security policy engine for generated Terraform.
+
+Implements the "No Secrets/Public Buckets" security check of the workflow
+without an external scanner. Rules are indexed by resource type so a scan only
+evaluates the rules that apply to the resources actually present, and it is
+cheap enough to run alongside ``terraform validate``.
+
+Exposure rules (open ports, public buckets) only block a stack when the user
+did not ask for that exposure: if the stated requirements call for it, the
+finding is downgraded to a warning that is shown with the result.
+"""
+
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from iac_agent.tools.hcl_parser import Block, Expression, parse_terraform_files
+
+SECRET_NAME = re.compile(r"(?i)(password|passwd|secret|private_key|access_key|api_key|token)$")
+SECRET_VALUE = re.compile(r"(AKIA|ASIA)[0-9A-Z]{16}|-----BEGIN [A-Z ]*PRIVATE KEY-----")
+OPEN_CIDRS = {"0.0.0.0/0", "::/0"}
+SENSITIVE_PORTS = {
+    22: "SSH",
+    3389: "RDP",
+    3306: "MySQL",
+    5432: "PostgreSQL",
+    1433: "SQL Server",
+    1521: "Oracle",
+    27017: "MongoDB",
+    6379: "Redis",
+    9200: "Elasticsearch",
+}
+PUBLIC_ACLS = {"public-read", "public-read-write", "authenticated-read"}
+# requirement phrases that ask for access from the whole internet or for a public bucket
+OPEN_ACCESS_REQUESTED = re.compile(r"(?i)\banywhere\b|0\.0\.0\.0/0|::/0|\bthe internet\b|\beveryone\b|\ball ips\b")
+PUBLIC_BUCKET_REQUESTED = re.compile(
+    r"(?i)\bpublic(ly)?[- ](read|readable|accessible|access|bucket|website)|static website|website hosting"
+)
+
+
+@dataclass
+class SecurityFinding:
+    """A policy violation found in a Terraform block."""
+
+    rule_id: str
+    severity: str
+    message: str
+    address: str
+    filename: str
+    line: int
+    block_kind: str = "resource"
+    # services an exposure finding opens to the internet, e.g. ("SSH",); ("public bucket",) for S3
+    exposes: Tuple[str, ...] = ()
+
+    def as_diagnostic(self) -> str:
+        """Render the finding in terraform's diagnostic layout so the fix loop can consume it."""
+        labels = self.address.split(".")
+        if self.block_kind != "resource":
+            labels = labels[1:]
+        quoted = " ".join(f'"{label}"' for label in labels)
+        return (
+            f"{self.severity.title()}: Security policy {self.rule_id}: {self.message}\n"
+            f"  on {self.filename} line {self.line}, in {self.block_kind} {quoted}:\n"
+        )
+
+
+Rule = Callable[[Block], Iterator[SecurityFinding]]
+
+
+def _finding(
+    block: Block, rule_id: str, message: str, severity: str = "error", exposes: Tuple[str, ...] = ()
+) -> SecurityFinding:
+    return SecurityFinding(rule_id, severity, message, block.address, block.filename, block.line, block.kind, exposes)
+
+
+def exposure_requested(finding: SecurityFinding, requirements: str) -> bool:
+    """Whether the user's requirements explicitly ask for the exposure a finding reports."""
+    if not finding.exposes or not requirements:
+        return False
+    if finding.exposes == ("public bucket",):
+        return bool(PUBLIC_BUCKET_REQUESTED.search(requirements))
+    if not OPEN_ACCESS_REQUESTED.search(requirements):
+        return False
+    ports = {service: port for port, service in SENSITIVE_PORTS.items()}
+    # every exposed service must be named, by name or port, e.g. "SSH (22) from anywhere"
+    return all(
+        re.search(rf"(?i)\b{re.escape(service)}\b|\b{ports[service]}\b", requirements)
+        for service in finding.exposes
+    )
+
+
+def _port_range(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _open_cidrs(body: Dict[str, Any]) -> bool:
+    """Whether the literal CIDR lists of a rule include the whole internet."""
+    cidrs = []
+    for name in ("cidr_blocks", "ipv6_cidr_blocks"):
+        value = body.get(name)
+        if isinstance(value, list):
+            cidrs.extend(value)
+    return bool(OPEN_CIDRS.intersection(cidrs))
+
+
+def _exposed_ports(from_port: Any, to_port: Any, protocol: Any) -> List[str]:
+    """Sensitive services reachable through a port range."""
+    low, high = _port_range(from_port), _port_range(to_port)
+    if low is None or high is None:
+        return []
+    if str(protocol) in ("-1", "all") or (low == 0 and high in (0, 65535)):
+        return list(SENSITIVE_PORTS.values())
+    return [service for port, service in SENSITIVE_PORTS.items() if low <= port <= high]
+
+
+class SecurityPolicyEngine:
+    """Rule engine that evaluates security policies over parsed Terraform blocks.
+
+    Rules registered for a resource type only run on resources of that type;
+    global rules run on every block (resources, providers and variables).
+    """
+
+    def __init__(self):
+        self.rules_by_type: Dict[str, List[Rule]] = {}
+        self.global_rules: List[Rule] = []
+
+    @classmethod
+    def default(cls) -> "SecurityPolicyEngine":
+        """Create an engine with the built-in policies."""
+        engine = cls()
+        engine.global_rules.append(check_hardcoded_secrets)
+        engine.register("aws_security_group", check_security_group_ingress)
+        engine.register("aws_security_group_rule", check_security_group_rule)
+        engine.register("aws_vpc_security_group_ingress_rule", check_vpc_ingress_rule)
+        engine.register("aws_s3_bucket", check_s3_acl)
+        engine.register("aws_s3_bucket_acl", check_s3_acl)
+        engine.register("aws_s3_bucket_public_access_block", check_s3_public_access_block)
+        engine.register("aws_db_instance", check_rds_encryption)
+        engine.register("aws_rds_cluster", check_rds_encryption)
+        return engine
+
+    def register(self, resource_type: str, rule: Rule) -> None:
+        """Register a rule for a resource type."""
+        self.rules_by_type.setdefault(resource_type, []).append(rule)
+
+    def scan(self, terraform_files: Dict[str, str], requirements: str = "") -> List[SecurityFinding]:
+        """Scan a Terraform stack for policy violations.
+
+        Args:
+            terraform_files: Mapping of filename to content
+            requirements: The user's requirements; exposures they ask for are
+                reported as warnings instead of errors
+
+        Returns:
+            List[SecurityFinding]: Findings ordered by file and line
+        """
+        blocks, _ = parse_terraform_files(terraform_files)
+        return self.scan_blocks(blocks, requirements)
+
+    def scan_blocks(self, blocks: List[Block], requirements: str = "") -> List[SecurityFinding]:
+        """Scan already parsed blocks for policy violations, see ``scan``."""
+        findings: List[SecurityFinding] = []
+        for block in blocks:
+            for rule in self.global_rules:
+                findings.extend(rule(block))
+            if block.kind == "resource" and block.labels:
+                for rule in self.rules_by_type.get(block.labels[0], ()):
+                    findings.extend(rule(block))
+        findings = [
+            replace(finding, severity="warning", message=f"{finding.message} (requested in the requirements)")
+            if finding.severity == "error" and exposure_requested(finding, requirements) else finding
+            for finding in findings
+        ]
+        return sorted(findings, key=lambda finding: (finding.filename, finding.line))
+
+
+def _walk_literals(body: Dict[str, Any], path: str = "") -> Iterator[tuple]:
+    for name, value in body.items():
+        if isinstance(value, list) and value and all(isinstance(item, Block) for item in value):
+            for nested in value:
+                yield from _walk_literals(nested.body, f"{path}{name}.")
+        elif isinstance(value, dict):
+            yield from _walk_literals(value, f"{path}{name}.")
+        else:
+            yield f"{path}{name}", name, value
+
+
+def check_hardcoded_secrets(block: Block) -> Iterator[SecurityFinding]:
+    """Flag literal credentials in resources, providers and variable defaults."""
+    if block.kind not in ("resource", "provider", "variable", "data", "module"):
+        return
+    if block.kind == "variable":
+        default = block.body.get("default")
+        if block.labels and SECRET_NAME.search(block.labels[0]) and isinstance(default, str) \
+                and not isinstance(default, Expression) and default:
+            yield _finding(block, "SEC001", f'variable "{block.labels[0]}" has a hard-coded secret default value')
+        return
+    for path, name, value in _walk_literals(block.body):
+        if not isinstance(value, str) or isinstance(value, Expression) or not value:
+            continue
+        if SECRET_NAME.search(name):
+            yield _finding(block, "SEC001", f'"{path}" is set to a hard-coded secret, use a variable or secrets manager')
+        elif SECRET_VALUE.search(value):
+            yield _finding(block, "SEC001", f'"{path}" contains a hard-coded credential')
+
+
+def check_security_group_ingress(block: Block) -> Iterator[SecurityFinding]:
+    """Flag inline ingress rules that open sensitive ports to the internet."""
+    for ingress in block.blocks("ingress"):
+        if not _open_cidrs(ingress.body):
+            continue
+        services = _exposed_ports(ingress.body.get("from_port"), ingress.body.get("to_port"), ingress.body.get("protocol"))
+        if services:
+            yield _finding(block, "SEC002", f"ingress allows {', '.join(services)} from 0.0.0.0/0", exposes=tuple(services))
+
+
+def check_security_group_rule(block: Block) -> Iterator[SecurityFinding]:
+    """Flag standalone ingress rules that open sensitive ports to the internet."""
+    if block.body.get("type") != "ingress":
+        return
+    if _open_cidrs(block.body):
+        services = _exposed_ports(block.body.get("from_port"), block.body.get("to_port"), block.body.get("protocol"))
+        if services:
+            yield _finding(block, "SEC002", f"ingress allows {', '.join(services)} from 0.0.0.0/0", exposes=tuple(services))
+
+
+def check_vpc_ingress_rule(block: Block) -> Iterator[SecurityFinding]:
+    """Flag ``aws_vpc_security_group_ingress_rule`` resources open to the internet."""
+    if block.body.get("cidr_ipv4") in OPEN_CIDRS or block.body.get("cidr_ipv6") in OPEN_CIDRS:
+        services = _exposed_ports(block.body.get("from_port"), block.body.get("to_port"), block.body.get("ip_protocol"))
+        if services:
+            yield _finding(block, "SEC002", f"ingress allows {', '.join(services)} from 0.0.0.0/0", exposes=tuple(services))
+
+
+def check_s3_acl(block: Block) -> Iterator[SecurityFinding]:
+    """Flag public canned ACLs on S3 buckets."""
+    acl = block.body.get("acl")
+    if isinstance(acl, str) and acl in PUBLIC_ACLS:
+        yield _finding(block, "SEC003", f'S3 bucket uses the public ACL "{acl}"', exposes=("public bucket",))
+
+
+def check_s3_public_access_block(block: Block) -> Iterator[SecurityFinding]:
+    """Flag public access blocks that leave public ACLs or policies enabled."""
+    disabled = [
+        setting for setting in ("block_public_acls", "block_public_policy", "ignore_public_acls", "restrict_public_buckets")
+        if block.body.get(setting) is False
+    ]
+    if disabled:
+        yield _finding(
+            block, "SEC003", f"S3 public access block disables {', '.join(disabled)}", exposes=("public bucket",)
+        )
+
+
+def check_rds_encryption(block: Block) -> Iterator[SecurityFinding]:
+    """Flag RDS instances and clusters without storage encryption."""
+    encrypted = block.body.get("storage_encrypted")
+    if encrypted is False or encrypted is None:
+        yield _finding(block, "SEC004", "database storage is not encrypted, set storage_encrypted = true")
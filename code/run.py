@@ -2,28 +2,66 @@ import logging
 logging.basicConfig(level=logging.INFO)
 import os
 import sys
+import signal
 import argparse
+import functools
 
 # Add the project root to Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(project_root)
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Run infrastructure as code AI Assistant')
-parser.add_argument('--week', type=str, choices=['project'], default='project', 
-                    help="type project to be able to run the project ('project')")
-parser.add_argument('--mode', type=str, choices=['part1', 'part2', 'part3'], 
-                    default='part1', help='Which part of the selected week to run')
-parser.add_argument('--solution', action='store_true',
-                    help='Run solution code instead of student code')
-args = parser.parse_args()
+from iac_agent.core.worker_pool import DEFAULT_DRAIN_TIMEOUT, DEFAULT_WORKERS, WorkerPool
+
+
+def parse_args():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Run infrastructure as code AI Assistant')
+    parser.add_argument('--week', type=str, choices=['project'], default='project',
+                        help="type project to be able to run the project ('project')")
+    parser.add_argument('--mode', type=str, choices=['part1', 'part2', 'part3'],
+                        default='part1', help='Which part of the selected week to run')
+    parser.add_argument('--solution', action='store_true',
+                        help='Run solution code instead of student code')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Worker processes serving requests (1 serves them in this process)')
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT,
+                        help='Seconds running requests get to finish on shutdown')
+    return parser.parse_args()
 
-# Import and run the app
-from iac_agent.app import create_demo
 
 if __name__ == "__main__":
+    # workers are spawned and re-import this module, only the front end parses arguments and imports Gradio
+    args = parse_args()
+    from iac_agent.agents.factory import ProjectIteration, create_chat_implementation
+    if args.mode == ProjectIteration.DEEP_RESEARCH.value:
+        from iac_agent.agents.part3 import check_research_configuration
+        try:
+            check_research_configuration()
+        except RuntimeError as e:
+            # every message would fail, refuse to start instead
+            sys.exit(f"Configuration error: {e}")
+    from iac_agent.app import create_demo
+
     # Convert week to int if it's '1', '2', or '3', else keep as string
     week = args.week
-    
-    demo = create_demo(week=week, mode_str=args.mode, use_solution=args.solution)
-    demo.launch()
\ No newline at end of file
+
+    pool = None
+    if args.workers > 1:
+        pool = WorkerPool(functools.partial(create_chat_implementation, ProjectIteration(args.mode)), args.workers)
+        pool.start()
+    demo = create_demo(week=week, mode_str=args.mode, use_solution=args.solution, chat_interface=pool)
+
+    def shutdown(signum, frame):
+        """Drain the workers on SIGTERM while the server keeps streaming the running requests."""
+        logging.info(f"Received {signal.Signals(signum).name}, shutting down")
+        if pool is not None:
+            pool.drain(args.drain_timeout)
+        demo.close()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        demo.launch()
+    finally:
+        if pool is not None:
+            pool.drain(args.drain_timeout)